@@ -0,0 +1,290 @@
+"""Computations behind the dashboard views, free of Streamlit and Plotly.
+
+Every function takes a DatasetSnapshot (or one of its parts) plus the
+selections a view offers, and returns plain data: DataFrames, Series, numbers
+and dicts. The views render these, charts.py plots them, and batch jobs and
+benchmarks import them without starting a UI. SciPy is imported only by the
+functions that need it.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional, TypedDict
+
+import numpy as np
+import pandas as pd
+
+from associations import TEST_METHODS, contingency_statistics
+from regression import RegressionStats, regression_by_group, regression_table
+
+if TYPE_CHECKING:
+    from cube import AggregateCube
+    from dataset import DatasetSnapshot
+
+Filters = dict[str, object]
+
+# Thresholds on |r| for describing a correlation in words
+WEAK_CORRELATION = 0.2
+STRONG_CORRELATION = 0.6
+
+
+class HeaderMetrics(TypedDict):
+    students: int
+    avg_score: float
+    a_grade_pct: float
+    avg_attendance: float
+
+
+class GradeInsights(TypedDict):
+    students: int
+    most_common_grade: Optional[str]
+    ab_rate: float
+
+
+class StressCorrelation(TypedDict):
+    metric: str
+    r: float
+    strength: str
+
+
+class DemographicCounts(TypedDict):
+    primary: pd.Series
+    pairs: Optional[pd.Series]
+    students: int
+
+
+class AssociationResult(TypedDict):
+    chi2: float
+    p: float
+    dof: int
+    cramers_v: float
+    mutual_info: float
+    students: int
+    method: str
+
+
+class ProgressSummary(TypedDict):
+    avg_improvement: float
+    improved_pct: float
+    max_improvement: float
+
+
+def accumulate_header_totals(totals: dict[str, float], df: pd.DataFrame) -> dict[str, float]:
+    """Adds a frame's contribution to the running sums behind the header metrics"""
+    totals['students'] = totals.get('students', 0) + len(df)
+    totals['score_sum'] = totals.get('score_sum', 0.0) + float(df['Total_Score'].sum())
+    totals['score_n'] = totals.get('score_n', 0) + int(df['Total_Score'].count())
+    totals['a_grades'] = totals.get('a_grades', 0) + int((df['Grade'] == 'A').sum())
+    totals['attendance_sum'] = totals.get('attendance_sum', 0.0) + float(df['Attendance (%)'].sum())
+    totals['attendance_n'] = totals.get('attendance_n', 0) + int(df['Attendance (%)'].count())
+    return totals
+
+
+def header_metrics(totals: dict[str, float]) -> HeaderMetrics:
+    """Turns running header totals into the four dashboard metrics"""
+    students = totals.get('students', 0)
+    return {
+        'students': students,
+        'avg_score': totals['score_sum'] / totals['score_n'] if totals.get('score_n') else np.nan,
+        'a_grade_pct': totals['a_grades'] / students * 100 if students else np.nan,
+        'avg_attendance': totals['attendance_sum'] / totals['attendance_n'] if totals.get('attendance_n') else np.nan,
+    }
+
+
+def group_counts(df: pd.DataFrame, cube: AggregateCube, by: list[str]) -> pd.Series:
+    """Returns student counts per combination of the by columns, skipping missing values"""
+    if cube.covers(by):
+        return cube.counts(by)
+    counts = df.groupby(by, observed=True).size()
+    return counts[counts > 0].rename('Count')
+
+
+def select_rows(df: pd.DataFrame, mask: Optional[np.ndarray], columns: list[str]) -> pd.DataFrame:
+    """Returns only the needed columns, restricted to mask when one is given"""
+    if mask is None:
+        return df[columns]
+    return df.loc[mask, columns]
+
+
+def grade_counts_table(cube: AggregateCube, filters: Filters) -> pd.DataFrame:
+    grade_counts = cube.counts(['Grade'], filters).reset_index()
+    grade_counts.columns = ['Grade', 'Count']
+    return grade_counts.sort_values(by='Grade')
+
+
+def grade_summary_table(cube: AggregateCube, filters: Filters) -> pd.DataFrame:
+    """Returns count, share of students and average total score per grade"""
+    summary = grade_counts_table(cube, filters)
+    summary['Percentage'] = (summary['Count'] / summary['Count'].sum() * 100).round(1)
+    grade_means = cube.stats('Total_Score', ['Grade'], filters)['mean']
+    summary['Avg Score'] = summary['Grade'].map(grade_means).astype('float64').round(1)
+    return summary.reset_index(drop=True)
+
+
+def grade_insights(cube: AggregateCube, filters: Filters) -> GradeInsights:
+    """Returns the number of matching students, their most common grade and their A/B rate"""
+    students = cube.total(filters)
+    if students == 0:
+        return {'students': 0, 'most_common_grade': None, 'ab_rate': np.nan}
+    grade_counts = grade_counts_table(cube, filters)
+    return {
+        'students': students,
+        'most_common_grade': grade_counts.loc[grade_counts['Count'].idxmax(), 'Grade'],
+        'ab_rate': cube.total({**filters, 'Grade': ['A', 'B']}) / students * 100,
+    }
+
+
+def sleep_stats_table(data: DatasetSnapshot, grades: Optional[list[str]] = None,
+                      filters: Optional[Filters] = None) -> pd.DataFrame:
+    """Returns average, median, min and max nightly sleep per grade, for the given grades or all.
+
+    Read from the per-grade sketches, so every value is within
+    data.sketches.error_bound('Sleep_Hours_per_Night') of the exact one.
+    """
+    where = {**(filters or {}), **({} if grades is None else {'Grade': list(grades)})}
+    stats = data.sketches.summary('Sleep_Hours_per_Night', ['Grade'], where)
+    stats_df = stats[['Grade', 'mean', 'median', 'min', 'max']].set_axis(
+        ['Grade', 'Average', 'Median', 'Min', 'Max'], axis=1)
+    return stats_df.round({'Average': 2, 'Median': 2, 'Min': 2, 'Max': 2})
+
+
+def study_trends_by_grade(data: DatasetSnapshot, study_range: tuple[float, float],
+                          attendance_threshold: float) -> pd.DataFrame:
+    """Returns the total score trendline on weekly study hours per grade, for the study habits filters"""
+    mask = data.engine.mask({
+        'Study_Hours_per_Week': study_range,
+        'Attendance (%)': (attendance_threshold, None),
+    })
+    study_df = select_rows(data.frame, mask, ['Study_Hours_per_Week', 'Total_Score', 'Grade'])
+    trends = regression_table(regression_by_group(study_df['Study_Hours_per_Week'], study_df['Total_Score'],
+                                                  study_df['Grade']))
+    columns = ['n', 'slope', 'intercept', 'r', 'r2', 'slope_se']
+    if trends.empty:
+        return pd.DataFrame(columns=['Grade'] + columns)
+    trends = trends[columns].astype('float64').round(3).astype({'n': 'int64'})
+    return trends.rename_axis('Grade').reset_index()
+
+
+def cube_stress_trend(cube: AggregateCube, metric: str, filters: Optional[Filters] = None) -> RegressionStats:
+    """Returns the regression of a performance metric on stress level, from the cube's moments per stress level"""
+    sliced = cube.slice(['Stress_Level (1-10)'], filters)
+    stress = sliced.index.to_numpy(dtype='float64')
+    n = sliced[f"{metric}__n"].to_numpy(dtype='float64')
+    total = sliced[f"{metric}__sum"].to_numpy(dtype='float64')
+    return RegressionStats.from_sums(n.sum(), (stress * n).sum(), total.sum(), (stress * stress * n).sum(),
+                                     sliced[f"{metric}__sumsq"].sum(), (stress * total).sum())
+
+
+def stress_trend(data: DatasetSnapshot, metric: str, filters: Optional[Filters] = None) -> RegressionStats:
+    """Returns the regression of a performance metric on stress level"""
+    return cube_stress_trend(data.cube, metric, filters)
+
+
+def correlation_strength(r: float) -> str:
+    if abs(r) < WEAK_CORRELATION:
+        return "weak"
+    if abs(r) < STRONG_CORRELATION:
+        return "moderate"
+    return "strong"
+
+
+def stress_correlation(data: DatasetSnapshot, metric: str) -> StressCorrelation:
+    """Returns the correlation between stress level and a performance metric, described in words"""
+    r = float(stress_trend(data, metric).fit()['r'])
+    return {'metric': metric, 'r': r, 'strength': correlation_strength(r)}
+
+
+def demographic_factors(df: pd.DataFrame) -> list[str]:
+    """Returns the categorical columns offered as demographic factors, most common ones first"""
+    # Get available categorical columns dynamically
+    categorical_cols = df.select_dtypes(include=['object', 'category', 'string']).columns.tolist()
+    # Remove columns that are not useful for demographic analysis
+    exclude_cols = ['Student_ID', 'Grade', 'Department']
+    available_factors = [col for col in categorical_cols if col not in exclude_cols]
+
+    # Add commonly expected demographic columns if they exist
+    potential_factors = ["Family_Income_Level", "Internet_Access_at_Home", "Gender", "Transport_Mode"]
+    final_factors = [factor for factor in potential_factors if factor in df.columns]
+
+    # Add any other categorical columns not in the potential list
+    for factor in available_factors:
+        if factor not in final_factors:
+            final_factors.append(factor)
+    return final_factors
+
+
+def demographic_counts(data: DatasetSnapshot, primary_factor: str, secondary_factor: str) -> DemographicCounts:
+    """Returns counts per primary factor value (largest first) and, unless secondary is "None", per pair"""
+    primary = group_counts(data.frame, data.cube, [primary_factor]).sort_values(ascending=False)
+    if secondary_factor == "None":
+        return {'primary': primary, 'pairs': None, 'students': int(primary.sum())}
+    pairs = group_counts(data.frame, data.cube, [primary_factor, secondary_factor])
+    return {'primary': primary, 'pairs': pairs, 'students': int(pairs.sum())}
+
+
+def contingency_test(table: pd.DataFrame) -> Optional[AssociationResult]:
+    """Tests a contingency table for independence, exactly or by permutation when it is sparse.
+
+    Returns None if the table has fewer than two rows or columns.
+    """
+    if table.shape[0] < 2 or table.shape[1] < 2:
+        return None
+    return contingency_statistics(table.to_numpy())
+
+
+def association_test(data: DatasetSnapshot, primary_factor: str, secondary_factor: str) -> Optional[AssociationResult]:
+    """Returns the association statistics of two factors, from the per-version counts when both are covered"""
+    associations = data.associations
+    if primary_factor in associations.columns and secondary_factor in associations.columns:
+        return associations.pair(primary_factor, secondary_factor)
+    pairs = group_counts(data.frame, data.cube, [primary_factor, secondary_factor])
+    return contingency_test(pairs.unstack(fill_value=0))
+
+
+def strongest_associations(data: DatasetSnapshot, limit: Optional[int] = None) -> pd.DataFrame:
+    """Returns categorical factor pairs ranked by Cramér's V, with their test results"""
+    ranking = data.associations.ranking()
+    ranking['method'] = ranking['method'].map(TEST_METHODS)
+    return ranking if limit is None else ranking.head(limit)
+
+
+def correlation_matrix(data: DatasetSnapshot, variables: list[str], method: str,
+                       department: str = 'All', filters: Optional[Filters] = None) -> pd.DataFrame:
+    """Returns the correlation matrix of variables for a department and filters, from the cached partials"""
+    return data.correlations.matrix(method, list(variables), where={'Department': department, **(filters or {})})
+
+
+def term_summary_table(grade_counts: pd.DataFrame) -> pd.DataFrame:
+    """Returns students, average total score and A-grade rate per term and campus.
+
+    grade_counts is DatasetCatalog.aggregate(['Grade'], 'Total_Score', ...).
+    """
+    weighted = grade_counts.assign(Score=grade_counts['Mean'] * grade_counts['Measured'],
+                                   A=grade_counts['Count'].where(grade_counts['Grade'] == 'A', 0))
+    summary = weighted.groupby(['Term', 'Campus'], sort=False)[['Count', 'Measured', 'Score', 'A']].sum()
+    return pd.DataFrame({
+        'Students': summary['Count'],
+        'Avg Score': (summary['Score'] / summary['Measured']).round(1),
+        'A Grade Rate (%)': (summary['A'] / summary['Count'] * 100).round(1),
+    }).reset_index()
+
+
+def progress_frame(data: DatasetSnapshot, department: str, filters: Optional[Filters] = None) -> pd.DataFrame:
+    """Returns midterm, final and improvement per student of a department ('All' for everyone) and filters"""
+    progress_df = select_rows(data.frame, data.engine.mask({'Department': department, **(filters or {})}),
+                              ['Student_ID', 'Department', 'Grade', 'Midterm_Score', 'Final_Score'])
+
+    # Calculate improvement metrics
+    improvement = progress_df['Final_Score'] - progress_df['Midterm_Score']
+    return progress_df.assign(
+        Improvement=improvement,
+        Improvement_Percentage=(improvement / progress_df['Midterm_Score'] * 100).round(1)
+    )
+
+
+def progress_summary(progress_df: pd.DataFrame) -> ProgressSummary:
+    """Returns the average and maximum improvement and the share of students who improved"""
+    return {
+        'avg_improvement': float(progress_df['Improvement'].mean()),
+        'improved_pct': float((progress_df['Improvement'] > 0).mean() * 100),
+        'max_improvement': float(progress_df['Improvement'].max()),
+    }
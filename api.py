@@ -0,0 +1,279 @@
+"""Serves the dashboard's aggregates over a local HTTP API, as JSON or Arrow IPC.
+
+Endpoints take the same filters as the dashboard widgets and return what the
+views show, computed by the same analytics functions:
+
+    GET /version
+    GET /options
+    GET /header?department=&gender=&income=
+    GET /grades?department=&gender=&income=
+    GET /correlation?variables=Total_Score,Final_Score&method=pearson&department=
+    GET /progress?department=
+    GET /associations?limit=10
+
+Omitted filters mean 'All'. Add format=arrow (or send Accept:
+application/vnd.apache.arrow.stream) for an Arrow IPC stream instead of JSON.
+Every response carries an ETag derived from the dataset version and the
+request, so unchanged results are answered with 304 without recomputing, and
+bodies are cached per version in the shared cache backend:
+
+    python api.py --port 8600 --cache memory
+    curl 'localhost:8600/grades?department=Engineering&format=json'
+"""
+import argparse
+import json
+import logging
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from analytics import (accumulate_header_totals, correlation_matrix, grade_summary_table,
+                       header_metrics, progress_frame, progress_summary, select_rows, strongest_associations)
+from charts import CORRELATION_METHODS, CORRELATION_VARIABLES, DEFAULT_CORRELATION_VARIABLES
+from dataset import DELTA_DIR, StudentDataset
+from datastore import DATA_PATH, CACHE_DIR
+from shared_cache import content_key, open_cache
+
+API_PORT = 8600
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+# Seconds between checks for appended rows and delta files
+REFRESH_SECONDS = 5.0
+
+# Dashboard widget names of the filterable dimensions
+FILTER_PARAMS = {'department': 'Department', 'gender': 'Gender', 'income': 'Family_Income_Level'}
+
+HEADER_COLUMNS = ['Total_Score', 'Grade', 'Attendance (%)']
+
+logger = logging.getLogger('dashboard.api')
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _param(params, name, default=None):
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _filters(snapshot, params, names=FILTER_PARAMS):
+    """Returns the cube/engine filter dict for the filter parameters, checking each value exists"""
+    where = {}
+    for name in names:
+        column = FILTER_PARAMS[name]
+        value = _param(params, name, 'All')
+        if value != 'All' and value not in snapshot.engine.options(column):
+            raise ApiError(400, f"Unknown {name} '{value}'")
+        where[column] = value
+    return where
+
+
+def version_endpoint(snapshot, params):
+    return {'version': snapshot.version, 'rows': len(snapshot.frame)}
+
+
+def options_endpoint(snapshot, params):
+    """The values each filter parameter accepts besides 'All'"""
+    return pd.DataFrame([(name, value) for name, column in FILTER_PARAMS.items()
+                         for value in snapshot.engine.options(column)], columns=['filter', 'value'])
+
+
+def header_endpoint(snapshot, params):
+    """The four header metrics, over the students matching the filters"""
+    rows = select_rows(snapshot.frame, snapshot.engine.mask(_filters(snapshot, params)), HEADER_COLUMNS)
+    return dict(header_metrics(accumulate_header_totals({}, rows)))
+
+
+def grades_endpoint(snapshot, params):
+    """Students, percentage and average score per grade, over the students matching the filters"""
+    return grade_summary_table(snapshot.cube, _filters(snapshot, params))
+
+
+def correlation_endpoint(snapshot, params):
+    variables = _param(params, 'variables')
+    variables = variables.split(',') if variables else DEFAULT_CORRELATION_VARIABLES
+    unknown = [v for v in variables if v not in CORRELATION_VARIABLES]
+    if unknown or len(variables) < 2:
+        raise ApiError(400, f"variables must name at least two of {', '.join(CORRELATION_VARIABLES)}")
+    method = _param(params, 'method', 'pearson')
+    if method not in CORRELATION_METHODS:
+        raise ApiError(400, f"method must be one of {', '.join(CORRELATION_METHODS)}")
+    department = _filters(snapshot, params, ['department'])['Department']
+    return correlation_matrix(snapshot, variables, method, department).rename_axis('Variable').reset_index()
+
+
+def progress_endpoint(snapshot, params):
+    department = _filters(snapshot, params, ['department'])['Department']
+    return dict(progress_summary(progress_frame(snapshot, department)))
+
+
+def associations_endpoint(snapshot, params):
+    limit = _param(params, 'limit')
+    if limit is not None and not limit.isdigit():
+        raise ApiError(400, "limit must be a non-negative integer")
+    return strongest_associations(snapshot, None if limit is None else int(limit))
+
+
+ENDPOINTS = {
+    '/version': version_endpoint,
+    '/options': options_endpoint,
+    '/header': header_endpoint,
+    '/grades': grades_endpoint,
+    '/correlation': correlation_endpoint,
+    '/progress': progress_endpoint,
+    '/associations': associations_endpoint,
+}
+
+
+def _json_value(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+def encode_json(version, result):
+    if isinstance(result, pd.DataFrame):
+        # pandas writes NaN as null and NumPy scalars as plain numbers
+        data = json.loads(result.to_json(orient='records'))
+    else:
+        data = {key: _json_value(value) for key, value in result.items()}
+    return json.dumps({'version': version, 'data': data}).encode()
+
+
+def encode_arrow(version, result):
+    frame = result if isinstance(result, pd.DataFrame) else pd.DataFrame([result])
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'dataset_version': version.encode()})
+    sink = pa.BufferOutputStream()
+    with ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+FORMATS = {'json': ('application/json', encode_json), 'arrow': (ARROW_MEDIA_TYPE, encode_arrow)}
+
+
+class AggregateApi:
+    """Answers API requests from the current dataset snapshot, caching encoded bodies per version"""
+
+    def __init__(self, dataset, cache):
+        self.dataset = dataset
+        self.cache = cache
+
+    def respond(self, path, params, accept='', if_none_match=None):
+        """Returns (status, headers, body) for a GET request"""
+        endpoint = ENDPOINTS.get(path)
+        if endpoint is None:
+            raise ApiError(404, f"Unknown endpoint '{path}'; available: {', '.join(ENDPOINTS)}")
+        fmt = _param(params, 'format') or ('arrow' if ARROW_MEDIA_TYPE in accept else 'json')
+        if fmt not in FORMATS:
+            raise ApiError(400, f"format must be one of {', '.join(FORMATS)}")
+        media_type, encode = FORMATS[fmt]
+
+        # Read the snapshot once so the body, ETag and version header agree
+        snapshot = self.dataset.current
+        request = {name: values for name, values in params.items() if name != 'format'}
+        key = content_key('api', snapshot.version, path, request, fmt)
+        etag = f'"{key[:32]}"'
+        headers = {'ETag': etag, 'X-Dataset-Version': snapshot.version, 'Cache-Control': 'no-cache'}
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return 304, headers, b''
+
+        body = self.cache.get_or_compute(key, lambda: encode(snapshot.version, endpoint(snapshot, params)))
+        return 200, {**headers, 'Content-Type': media_type}, body
+
+    def refresh_periodically(self, interval=REFRESH_SECONDS):
+        """Folds in new rows every interval seconds on a background thread"""
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.dataset.refresh()
+                except Exception:
+                    # Keep serving the last good snapshot
+                    logger.exception("Refresh failed; serving the last loaded version")
+
+        threading.Thread(target=loop, daemon=True, name='api-refresh').start()
+
+
+def serve_api(api, port=API_PORT, host='127.0.0.1'):
+    """Returns a threading HTTP server answering with api; call serve_forever on it"""
+
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive lets clients reuse connections; every response has a Content-Length
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are separate writes; without TCP_NODELAY each response stalls on delayed ACKs
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            try:
+                status, headers, body = api.respond(url.path.rstrip('/') or '/', parse_qs(url.query),
+                                                    self.headers.get('Accept', ''),
+                                                    self.headers.get('If-None-Match'))
+            except ApiError as e:
+                status, headers, body = e.status, {'Content-Type': 'application/json'}, \
+                    json.dumps({'error': str(e)}).encode()
+            except Exception:
+                # Answer rather than drop the connection, so clients see what failed
+                logger.exception("Request %s failed", self.path)
+                status, headers, body = 500, {'Content-Type': 'application/json'}, \
+                    json.dumps({'error': "Internal server error"}).encode()
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1', help="interface to listen on (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=API_PORT, help="port to listen on (default: %(default)s)")
+    parser.add_argument('--csv', default=DATA_PATH, help="source CSV (default: %(default)s)")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="columnar cache directory (default: %(default)s)")
+    parser.add_argument('--delta-dir', default=DELTA_DIR, help="delta CSV directory (default: %(default)s)")
+    parser.add_argument('--cache', default=None,
+                        help="response cache backend: sqlite, sqlite:<path> or memory (default: $DASHBOARD_CACHE or sqlite)")
+    parser.add_argument('--refresh-seconds', type=float, default=REFRESH_SECONDS,
+                        help="interval between checks for new rows, 0 to disable (default: %(default)s)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    cache = open_cache(args.cache)
+    dataset = StudentDataset(args.csv, args.cache_dir, delta_dir=args.delta_dir, shared_cache=cache)
+    dataset.refresh()
+    api = AggregateApi(dataset, cache)
+    if args.refresh_seconds > 0:
+        api.refresh_periodically(args.refresh_seconds)
+    server = serve_api(api, args.port, args.host)
+    print(f"Serving {len(dataset.current.frame):,} students (version {dataset.current.version[:12]}) "
+          f"on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Measures the throughput and latency of a running aggregate API.
+
+Worker threads each keep one HTTP/1.1 connection open and cycle through a
+mix of requests covering every endpoint and filter combination the
+dashboard offers. With --conditional, each worker revalidates with the ETag
+it last saw for a URL, as a polling client would:
+
+    python api.py --cache memory &
+    python api_bench.py --requests 5000 --concurrency 8 --format arrow
+"""
+import argparse
+import http.client
+import itertools
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+from api import API_PORT
+
+
+def request_mix(base_url, fmt='json'):
+    """Returns request paths covering each endpoint with every filter value the server lists"""
+    connection = _connect(base_url)
+    connection.request('GET', '/options?format=json')
+    response = connection.getresponse()
+    body = json.loads(response.read())
+    connection.close()
+    if response.status != 200:
+        raise RuntimeError(f"API answered {response.status}: {body}")
+    options = {}
+    for row in body['data']:
+        options.setdefault(row['filter'], ['All']).append(row['value'])
+
+    paths = ['/version', '/options', '/associations?limit=10']
+    for department in options['department']:
+        paths.append(f"/progress?{urlencode({'department': department})}")
+        for method in ('pearson', 'spearman'):
+            paths.append(f"/correlation?{urlencode({'department': department, 'method': method})}")
+        for gender, income in itertools.product(options['gender'], options['income']):
+            where = {'department': department, 'gender': gender, 'income': income}
+            paths.append(f"/header?{urlencode(where)}")
+            paths.append(f"/grades?{urlencode(where)}")
+    return [f"{path}{'&' if '?' in path else '?'}format={fmt}" for path in paths]
+
+
+def _connect(base_url):
+    url = urlsplit(base_url)
+    return http.client.HTTPConnection(url.hostname, url.port or API_PORT, timeout=30)
+
+
+def run_benchmark(base_url, paths, requests, concurrency, conditional=False):
+    """Sends requests spread over concurrency connections; returns latency and status statistics"""
+    counter = itertools.count()
+    local = threading.local()
+    lock = threading.Lock()
+    latencies, statuses, received = [], {}, [0]
+
+    def send(_):
+        if not hasattr(local, 'connection'):
+            local.connection, local.etags = _connect(base_url), {}
+        path = paths[next(counter) % len(paths)]
+        headers = {'If-None-Match': local.etags[path]} if conditional and path in local.etags else {}
+        start = time.perf_counter()
+        local.connection.request('GET', path, headers=headers)
+        response = local.connection.getresponse()
+        body = response.read()
+        elapsed = time.perf_counter() - start
+        if response.getheader('ETag'):
+            local.etags[path] = response.getheader('ETag')
+        with lock:
+            latencies.append(elapsed)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+            received[0] += len(body)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, range(requests)))
+    wall = time.perf_counter() - start
+
+    p50, p95, p99 = np.quantile(latencies, [0.5, 0.95, 0.99])
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'distinct_urls': len(paths),
+        'seconds': wall,
+        'requests_per_second': requests / wall,
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'p50_ms': p50 * 1000,
+        'p95_ms': p95 * 1000,
+        'p99_ms': p99 * 1000,
+        'statuses': statuses,
+        'bytes': received[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default=f"http://127.0.0.1:{API_PORT}", help="API base URL (default: %(default)s)")
+    parser.add_argument('--requests', type=int, default=2000, help="requests to send (default: %(default)s)")
+    parser.add_argument('--concurrency', type=int, default=8, help="parallel connections (default: %(default)s)")
+    parser.add_argument('--format', default='json', choices=['json', 'arrow'], help="response format (default: %(default)s)")
+    parser.add_argument('--conditional', action='store_true', help="revalidate with If-None-Match")
+    parser.add_argument('--out', help="also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    paths = request_mix(args.url, args.format)
+    result = run_benchmark(args.url, paths, args.requests, args.concurrency, args.conditional)
+    print(f"{result['requests']} requests over {result['distinct_urls']} URLs with {result['concurrency']} connections "
+          f"in {result['seconds']:.2f}s: {result['requests_per_second']:.0f} req/s")
+    print(f"latency mean {result['mean_ms']:.2f} ms, p50 {result['p50_ms']:.2f} ms, "
+          f"p95 {result['p95_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+    print(f"statuses {result['statuses']}, {result['bytes'] / 2**20:.1f} MiB received")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,55 @@
+import os
+import threading
+
 import pandas as pd
-import numpy as np
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
-st.set_page_config(
-    page_title="🎓 Student Performance Analytics",
-    layout="wide",
-    initial_sidebar_state="expanded",
-    page_icon="📊"
-)
+from analytics import (accumulate_header_totals, header_metrics, grade_summary_table, grade_insights,
+                       sleep_stats_table, stress_correlation, demographic_factors, demographic_counts,
+                       association_test, strongest_associations, term_summary_table, progress_frame,
+                       progress_summary, study_trends_by_grade)
+from archive import ArchiveEngine
+from associations import TEST_METHODS
+from catalog import DatasetCatalog, entry_label
+from charts import (SLEEP_DISPLAYS, STRESS_VISUALIZATIONS, PERFORMANCE_METRICS, SECONDARY_FACTORS,
+                    DEMOGRAPHIC_PLOT_TYPES, CORRELATION_VARIABLES, DEFAULT_CORRELATION_VARIABLES,
+                    CORRELATION_METHODS, PROGRESS_VIEWS, cached_chart, term_grade_figure)
+from datastore import DATA_PATH, CACHE_DIR, PII_COLUMNS, bytes_per_row
+from dataset import StudentDataset, DELTA_DIR
+from figure_cache import FigureCache, FigureStore
+from panels import PanelScheduler, panel_pool
+from profiling import (METRICS, METRICS_PORT_ENV, start_rerun, finish_rerun, stage, section,
+                       serve_metrics, logger as profile_logger)
+from regression import regression_table
+from rendering import MAX_RENDERED_POINTS, LARGE_PLOT_MODES, SAMPLED
+from shared_cache import open_cache
+from table_view import RAW_PAGE_SIZES, RawTableView
 
-def format_field_name(field_name):
-    """Format field names by replacing underscores with spaces and title casing"""
-    return field_name.replace('_', ' ').title()
+# Built figures kept per server process across reruns and sessions
+FIGURE_CACHE_SIZE = 256
 
-# Keep CSS styling for visual appeal
-st.markdown("""
+# Datasets kept loaded per server process; the live export plus recently viewed terms
+LOADED_DATASETS = 4
+LIVE_SOURCE = "Live export"
+
+# The loaded frame is shared by every session, so views must never mutate it.
+# Copy-on-Write (always on from pandas 3) turns column selections into views.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+
+def configure_page():
+    """Sets the page layout and styling; runs once per rerun, before any other element"""
+    st.set_page_config(
+        page_title="🎓 Student Performance Analytics",
+        layout="wide",
+        initial_sidebar_state="expanded",
+        page_icon="📊"
+    )
+
+    # Keep CSS styling for visual appeal
+    st.markdown("""
 <style>
     /* All your existing styles remain here */
     /* I've kept your comprehensive styling for visual consistency */
@@ -98,22 +130,149 @@ st.markdown("""
         color: white;
     }
 </style>
-""", unsafe_allow_html=True)
+    """, unsafe_allow_html=True)
+
+
+def format_field_name(field_name):
+    """Format field names by replacing underscores with spaces and title casing"""
+    return field_name.replace('_', ' ').title()
+
+
+class BackgroundLoad:
+    """Loads the dataset on a worker thread, keeping running header totals of the chunks parsed so far"""
+
+    def __init__(self, csv_path=DATA_PATH, cache_dir=CACHE_DIR, delta_dir=DELTA_DIR, shared_cache=None):
+        self.csv_path = csv_path
+        self.cache_dir = cache_dir
+        self.delta_dir = delta_dir
+        self.shared_cache = shared_cache
+        self.lock = threading.Lock()
+        self.totals = {}
+        self.bytes_read = 0
+        self.total_bytes = 0
+        self.dataset = None
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _on_chunk(self, chunk, bytes_read, total_bytes):
+        if self.dataset is not None:
+            return
+        with self.lock:
+            accumulate_header_totals(self.totals, chunk)
+            self.bytes_read, self.total_bytes = bytes_read, total_bytes
+
+    def _run(self):
+        try:
+            self.dataset = StudentDataset(self.csv_path, self.cache_dir, delta_dir=self.delta_dir,
+                                          progress=self._on_chunk, shared_cache=self.shared_cache)
+        except Exception as e:
+            self.error = e
+
+
+@st.cache_resource
+def get_shared_cache():
+    # One on-disk store per host, shared by every server replica and the warm-up worker
+    return open_cache()
+
+
+@st.cache_resource(max_entries=LOADED_DATASETS)
+def load_data(csv_path=DATA_PATH, cache_dir=CACHE_DIR, delta_dir=DELTA_DIR):
+    # Parsed once into a typed columnar cache; later loads are memory-mapped reads.
+    # cache_resource hands every session the same dataset instead of a pickled copy,
+    # together with its filter indexes and aggregate cube, which other replicas
+    # on the host have usually already computed into the shared cache.
+    # Catalog terms are only loaded once someone selects them.
+    return BackgroundLoad(csv_path, cache_dir, delta_dir, shared_cache=get_shared_cache())
+
+
+def dataset_sources(catalog):
+    """Returns {label: load_data arguments} of the live export and every catalog term"""
+    sources = {LIVE_SOURCE: (DATA_PATH, CACHE_DIR, DELTA_DIR)}
+    for entry in catalog.entries:
+        # Past terms are closed exports: no delta files apply to them
+        sources[entry_label(entry)] = (entry['path'], catalog.entry_cache_dir(entry), None)
+    return sources
+
 
+@st.cache_resource
+def get_panel_pool():
+    # Shared by every session; panel work is mostly NumPy/pandas, which releases the GIL
+    return panel_pool()
 
-@st.cache_data
-def load_data():
-    df = pd.read_csv("Students_Grading_Dataset.csv")
-    df = df.replace("", np.nan)
-    numeric_cols = ['Attendance (%)', 'Midterm_Score', 'Final_Score', 'Assignments_Avg',
-                    'Quizzes_Avg', 'Participation_Score', 'Projects_Score', 'Total_Score',
-                    'Study_Hours_per_Week', 'Stress_Level (1-10)', 'Sleep_Hours_per_Night']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    return df
 
+@st.cache_resource(max_entries=4)
+def get_table_view(version, include_pii, _snapshot):
+    # One per dataset version, so sort orders, searches and describe() are shared by every session.
+    # Names and emails are only read from disk once someone asks to see them.
+    return RawTableView(_snapshot.with_columns(PII_COLUMNS) if include_pii else _snapshot)
 
-def display_header_metrics(df):
+
+@st.cache_resource
+def get_figure_cache():
+    # Backed by the shared store the warm-up worker fills before the server starts
+    return FigureCache(max_entries=FIGURE_CACHE_SIZE, store=FigureStore(get_shared_cache()))
+
+
+@st.cache_resource
+def start_metrics_server():
+    # One endpoint per server process, serving the stage timings of every session
+    port = os.environ.get(METRICS_PORT_ENV)
+    if not port:
+        return None
+    try:
+        return serve_metrics(int(port))
+    except OSError as e:
+        profile_logger.warning("Metrics endpoint not started on port %s: %s", port, e)
+        return None
+
+
+def session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
+def display_profile(profile, section_name):
+    """Shows this rerun's stage timings and the process-wide percentiles of the section"""
+    stages = pd.DataFrame(profile.records)
+    stages['ms'] = (stages.pop('seconds') * 1000).round(1)
+    for col in ('alloc_bytes', 'peak_bytes'):
+        if col in stages:
+            stages[col.replace('_bytes', ' MiB')] = (stages.pop(col) / 2**20).round(2)
+    st.caption(f"This rerun: {profile.total_seconds() * 1000:,.0f} ms across {len(stages)} stages")
+    st.dataframe(stages, use_container_width=True, hide_index=True)
+    
+    recent = pd.DataFrame([row for row in METRICS.summary() if row['section'] in (section_name, 'app')])
+    if len(recent):
+        st.caption("Recent reruns in this process (ms)")
+        recent = recent[['section', 'stage', 'count', 'p50', 'p95']]
+        recent[['p50', 'p95']] = (recent[['p50', 'p95']] * 1000).round(1)
+        st.dataframe(recent, use_container_width=True, hide_index=True)
+    
+    st.checkbox("Trace memory allocations", key='profile_memory',
+                help="Records allocated and peak memory per stage from the next rerun on. "
+                     "Tracing slows every session of this server and counts their allocations together.")
+
+
+@st.fragment(run_every=1)
+def display_load_progress(loader):
+    """Shows header metrics from the rows ingested so far until the dataset is ready"""
+    if loader.dataset is not None or loader.error is not None:
+        st.rerun()
+    with loader.lock:
+        metrics = header_metrics(loader.totals)
+        fraction = loader.bytes_read / loader.total_bytes if loader.total_bytes else 0.0
+    display_header_metrics(metrics)
+    st.progress(min(fraction, 1.0), text=f"⏳ Loading dataset… {metrics['students']:,} students ingested")
+
+
+def rendering_options():
+    """Returns the per-chart point budget and large scatter mode chosen in the sidebar"""
+    return (st.session_state.get('max_rendered_points', MAX_RENDERED_POINTS),
+            st.session_state.get('large_plot_mode', SAMPLED))
+
+
+def display_header_metrics(metrics):
     """Displays the header and key metrics at the top of the dashboard"""
     st.markdown("""
     <div class="main-header">
@@ -128,12 +287,12 @@ def display_header_metrics(df):
         st.markdown(f"""
         <div class="metric-card">
             <h3>📊 Total Students</h3>
-            <h2>{len(df)}</h2>
+            <h2>{metrics['students']}</h2>
         </div>
         """, unsafe_allow_html=True)
 
     with col2:
-        avg_score = df['Total_Score'].mean()
+        avg_score = metrics['avg_score']
         st.markdown(f"""
         <div class="metric-card">
             <h3>🎯 Average Score</h3>
@@ -142,7 +301,7 @@ def display_header_metrics(df):
         """, unsafe_allow_html=True)
 
     with col3:
-        top_grade_pct = (df['Grade'] == 'A').mean() * 100
+        top_grade_pct = metrics['a_grade_pct']
         st.markdown(f"""
         <div class="metric-card">
             <h3>🏆 A Grade Rate</h3>
@@ -151,7 +310,7 @@ def display_header_metrics(df):
         """, unsafe_allow_html=True)
 
     with col4:
-        avg_attendance = df['Attendance (%)'].mean()
+        avg_attendance = metrics['avg_attendance']
         st.markdown(f"""
         <div class="metric-card">
             <h3>📅 Avg Attendance</h3>
@@ -160,23 +319,25 @@ def display_header_metrics(df):
         """, unsafe_allow_html=True)
 
 
-def interactive_grade_distribution(df):
+def interactive_grade_distribution(data):
     """Creates an interactive grade distribution visualization with filters"""
+    figures = get_figure_cache()
+    engine, cube = data.engine, data.cube
     st.markdown("### 📊 Academic Performance Analysis")
     
     with st.container():
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            departments = ['All'] + sorted(df['Department'].unique().tolist())
+            departments = ['All'] + engine.options('Department')
             selected_dept = st.selectbox('Select Department:', departments, key='grade_dept_filter')
             
         with col2:
-            genders = ['All'] + sorted(df['Gender'].unique().tolist())
+            genders = ['All'] + engine.options('Gender')
             selected_gender = st.selectbox('Select Gender:', genders, key='grade_gender_filter')
             
         with col3:
-            income_levels = ['All'] + sorted(df['Family_Income_Level'].dropna().unique().tolist())
+            income_levels = ['All'] + engine.options('Family_Income_Level')
             selected_income = st.selectbox('Select Income Level:', income_levels, key='grade_income_filter')
         
         # Additional visualization options
@@ -185,102 +346,53 @@ def interactive_grade_distribution(df):
         st.markdown('</div>', unsafe_allow_html=True)
     
     # Filter data based on selections
-    filtered_df = df.copy()
-    if selected_dept != 'All':
-        filtered_df = filtered_df[filtered_df['Department'] == selected_dept]
-    if selected_gender != 'All':
-        filtered_df = filtered_df[filtered_df['Gender'] == selected_gender]
-    if selected_income != 'All':
-        filtered_df = filtered_df[filtered_df['Family_Income_Level'] == selected_income]
+    where = {
+        'Department': selected_dept,
+        'Gender': selected_gender,
+        'Family_Income_Level': selected_income,
+    }
+    with stage('aggregate'):
+        insights = grade_insights(cube, where)
     
     # Create visualization
-    grade_counts = filtered_df['Grade'].value_counts().reset_index()
-    grade_counts.columns = ['Grade', 'Count']
-    grade_counts = grade_counts.sort_values(by='Grade')
-    
-    if view_type == "Percentage":
-        total = grade_counts['Count'].sum()
-        grade_counts['Value'] = (grade_counts['Count'] / total) * 100
-        y_title = 'Percentage of Students (%)'
-        text_format = '.1f'
-        suffix = '%'
-    else:
-        grade_counts['Value'] = grade_counts['Count']
-        y_title = 'Number of Students'
-        text_format = ''
-        suffix = ''
-    
-    fig = px.bar(
-        grade_counts, 
-        x='Grade', 
-        y='Value',
-        color='Grade', 
-        text=grade_counts['Value'].round(1).astype(str) + suffix,
-        color_discrete_sequence=px.colors.qualitative.Bold,
-        title=f"Grade Distribution {f'for {selected_dept}' if selected_dept != 'All' else ''}"
-    )
-    
-    fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(size=12),
-        title_font_size=18,
-        height=500,
-        yaxis_title=y_title,
-        xaxis_title='Grade',
-        showlegend=False
-    )
+    with stage('figure'):
+        fig = cached_chart(figures, data, 'grade_distribution', filters=where, view_type=view_type)
     
-    st.plotly_chart(fig, use_container_width=True)
+    with stage('render'):
+        st.plotly_chart(fig, use_container_width=True)
     
     if show_details:
         st.markdown("#### Grade Distribution Details")
         
         # Create a summary table
-        # Always calculate total even if it's already calculated in "Percentage" view
-        total = grade_counts['Count'].sum()
-        
-        summary_df = pd.DataFrame({
-            'Grade': grade_counts['Grade'],
-            'Count': grade_counts['Count'],
-            'Percentage': ((grade_counts['Count'] / total) * 100).round(1).astype(str) + '%'
-        })
-        
-        # Add average scores for each grade - with error handling
-        avg_scores = []
-        for grade in summary_df['Grade']:
-            grade_filtered = filtered_df[filtered_df['Grade'] == grade]
-            if len(grade_filtered) > 0:
-                avg = grade_filtered['Total_Score'].mean()
-                avg_scores.append(f"{avg:.1f}")
-            else:
-                avg_scores.append("N/A")  # Handle case with no students in this grade
-        
-        summary_df['Avg Score'] = avg_scores
+        with stage('details'):
+            summary_df = grade_summary_table(cube, where)
+            summary_df['Percentage'] = summary_df['Percentage'].astype(str) + '%'
+            # Handle grades with no scored students
+            summary_df['Avg Score'] = summary_df['Avg Score'].map(lambda avg: f"{avg:.1f}" if pd.notna(avg) else "N/A")
         
         st.dataframe(summary_df, use_container_width=True, hide_index=True)
         
         # Display additional insights - but only if we have data
-        if len(filtered_df) > 0:
+        if insights['students'] > 0:
             with st.expander("📊 Statistical Analysis"):
                 col1, col2 = st.columns(2)
                 with col1:
-                    most_common_grade = grade_counts.loc[grade_counts['Count'].idxmax(), 'Grade']
-                    st.metric("Most Common Grade", most_common_grade)
+                    st.metric("Most Common Grade", insights['most_common_grade'])
                     
                 with col2:
-                    # Avoid division by zero
-                    if filtered_df.shape[0] > 0:
-                        a_b_rate = filtered_df[filtered_df['Grade'].isin(['A', 'B'])].shape[0] / filtered_df.shape[0] * 100
-                        st.metric("A&B Success Rate", f"{a_b_rate:.1f}%")
-                    else:
-                        st.metric("A&B Success Rate", "N/A")
+                    st.metric("A&B Success Rate", f"{insights['ab_rate']:.1f}%")
         else:
             st.warning("No data available for the selected filters")
 
 
-def interactive_performance_factors(df):
+def interactive_performance_factors(data):
     """Creates an interactive visualization for analyzing performance factors"""
+    figures = get_figure_cache()
+    engine = data.engine
+    max_points, large_mode = rendering_options()
+    # The tabs' charts and statistics are independent: compute them together, draw each when ready
+    panels = PanelScheduler(get_panel_pool())
     st.markdown("### 🧠 Performance Factors Analysis")
     
     with st.container():
@@ -292,7 +404,7 @@ def interactive_performance_factors(df):
             col1, col2 = st.columns(2)
             
             with col1:
-                min_study, max_study = int(df['Study_Hours_per_Week'].min()), int(df['Study_Hours_per_Week'].max())
+                min_study, max_study = (int(v) for v in engine.value_range('Study_Hours_per_Week'))
                 study_range = st.slider("Study Hours per Week:", min_study, max_study, (min_study, max_study))
             
             with col2:
@@ -300,66 +412,24 @@ def interactive_performance_factors(df):
                 
             show_trend = st.checkbox("Show Trendline", value=True)
             
-            # Filter data based on selections
-            study_df = df[(df['Study_Hours_per_Week'] >= study_range[0]) & 
-                          (df['Study_Hours_per_Week'] <= study_range[1]) &
-                          (df['Attendance (%)'] >= attendance_threshold)]
-            
-            # Create scatter plot of study hours vs. scores
-            fig = px.scatter(
-                study_df,
-                x='Study_Hours_per_Week',
-                y='Total_Score',
-                color='Grade',
-                hover_name='Student_ID',
-                hover_data=['Department', 'Attendance (%)', 'Gender'],
-                color_discrete_sequence=px.colors.qualitative.Bold,
-                opacity=0.7,
-                title=f"Study Hours vs. Performance (N={len(study_df)})"
+            study_chart = st.empty()
+            panels.submit(
+                'study',
+                lambda: cached_chart(
+                    figures, data, 'study_habits',
+                    study_range=study_range, attendance_threshold=attendance_threshold, show_trend=show_trend,
+                    max_points=max_points, large_mode=large_mode
+                ),
+                lambda fig: study_chart.plotly_chart(fig, use_container_width=True)
             )
             
-            if show_trend:
-                fig.update_layout(
-                    shapes=[{
-                        'type': 'line',
-                        'x0': study_df['Study_Hours_per_Week'].min(),
-                        'y0': np.polyval(np.polyfit(study_df['Study_Hours_per_Week'], study_df['Total_Score'], 1), 
-                                        study_df['Study_Hours_per_Week'].min()),
-                        'x1': study_df['Study_Hours_per_Week'].max(),
-                        'y1': np.polyval(np.polyfit(study_df['Study_Hours_per_Week'], study_df['Total_Score'], 1), 
-                                        study_df['Study_Hours_per_Week'].max()),
-                        'line': {
-                            'color': 'rgba(255,255,255,0.5)',
-                            'width': 2,
-                            'dash': 'dash',
-                        }
-                    }]
+            with st.expander("Trendline by Grade"):
+                study_trends = st.empty()
+                panels.submit(
+                    'study_trends',
+                    lambda: study_trends_by_grade(data, study_range, attendance_threshold),
+                    lambda trends_df: study_trends.dataframe(trends_df, use_container_width=True, hide_index=True)
                 )
-                
-                # Calculate correlation
-                corr = study_df['Study_Hours_per_Week'].corr(study_df['Total_Score']).round(3)
-                fig.add_annotation(
-                    x=study_df['Study_Hours_per_Week'].max() * 0.9,
-                    y=study_df['Total_Score'].max() * 0.9,
-                    text=f"Correlation: {corr}",
-                    showarrow=False,
-                    font=dict(color="white", size=14),
-                    bgcolor="rgba(0,0,0,0.5)",
-                    bordercolor="white",
-                    borderwidth=1,
-                    borderpad=4
-                )
-            
-            fig.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(size=12),
-                height=500,
-                xaxis_title="Weekly Study Hours",
-                yaxis_title="Total Score"
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
             
         with tab2:
             col1, col2 = st.columns(2)
@@ -367,87 +437,37 @@ def interactive_performance_factors(df):
             with col1:
                 sleep_display = st.radio(
                     "Display Option:",
-                    ["Sleep Hours Distribution", "Sleep vs Performance"],
+                    SLEEP_DISPLAYS,
                     horizontal=True
                 )
             
             with col2:
                 selected_grades = st.multiselect(
                     "Filter Grades:",
-                    options=sorted(df['Grade'].unique().tolist()),
-                    default=sorted(df['Grade'].unique().tolist())
-                )
-            
-            # Filter data based on selections
-            sleep_df = df[df['Grade'].isin(selected_grades)]
-            
-            if sleep_display == "Sleep Hours Distribution":
-                # Create sleep distribution by grade
-                sleep_bins = [0, 4, 5, 6, 7, 8, 9, 12]
-                sleep_labels = ['<4h', '4-5h', '5-6h', '6-7h', '7-8h', '8-9h', '9h+']
-                
-                sleep_df['Sleep_Group'] = pd.cut(
-                    sleep_df['Sleep_Hours_per_Night'],
-                    bins=sleep_bins,
-                    labels=sleep_labels,
-                    include_lowest=True
-                )
-                
-                sleep_grade = sleep_df.groupby(['Sleep_Group', 'Grade']).size().reset_index(name='Count')
-                
-                fig = px.bar(
-                    sleep_grade,
-                    x='Sleep_Group',
-                    y='Count',
-                    color='Grade',
-                    title="Sleep Hours Distribution by Grade",
-                    barmode='stack',
-                    text_auto=True,
-                    color_discrete_sequence=px.colors.qualitative.Bold
-                )
-                
-            else:  # Sleep vs Performance
-                fig = px.box(
-                    sleep_df,
-                    x='Grade',
-                    y='Sleep_Hours_per_Night',
-                    color='Grade',
-                    notched=True,
-                    points="all",
-                    title="Sleep Hours vs Academic Performance",
-                    color_discrete_sequence=px.colors.qualitative.Bold
-                )
-                
-                fig.update_traces(
-                    jitter=0.3,
-                    pointpos=-1.8,
-                    marker=dict(size=8, opacity=0.6)
+                    options=engine.options('Grade'),
+                    default=engine.options('Grade')
                 )
             
-            fig.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(size=12),
-                height=500
+            sleep_chart = st.empty()
+            panels.submit(
+                'sleep',
+                lambda: cached_chart(
+                    figures, data, 'sleep_analysis',
+                    sleep_display=sleep_display, grades=set(selected_grades)
+                ),
+                lambda fig: sleep_chart.plotly_chart(fig, use_container_width=True)
             )
             
-            st.plotly_chart(fig, use_container_width=True)
-            
             # Show statistical summary
             with st.expander("Sleep Statistics by Grade"):
-                stats_df = sleep_df.groupby('Grade')['Sleep_Hours_per_Night'].agg([
-                    ('Average', 'mean'),
-                    ('Median', 'median'),
-                    ('Min', 'min'),
-                    ('Max', 'max')
-                ]).reset_index()
-                
-                stats_df['Average'] = stats_df['Average'].round(2)
-                stats_df['Median'] = stats_df['Median'].round(2)
-                stats_df['Min'] = stats_df['Min'].round(2)
-                stats_df['Max'] = stats_df['Max'].round(2)
-                
-                st.dataframe(stats_df, use_container_width=True, hide_index=True)
+                st.caption(f"Read from per-grade sketches: every value is within "
+                           f"±{data.sketches.error_bound('Sleep_Hours_per_Night'):g} hours of the exact one")
+                sleep_stats = st.empty()
+                panels.submit(
+                    'sleep_stats',
+                    lambda: sleep_stats_table(data, selected_grades),
+                    lambda stats_df: sleep_stats.dataframe(stats_df, use_container_width=True, hide_index=True)
+                )
         
         with tab3:
             col1, col2 = st.columns(2)
@@ -455,115 +475,44 @@ def interactive_performance_factors(df):
             with col1:
                 visualization_type = st.radio(
                     "Visualization Type:",
-                    ["Heatmap", "Scatter Plot"],
+                    STRESS_VISUALIZATIONS,
                     horizontal=True
                 )
                 
             with col2:
                 performance_metric = st.selectbox(
                     "Performance Metric:",
-                    ["Total_Score", "Final_Score", "Midterm_Score", "Assignments_Avg"]
+                    PERFORMANCE_METRICS
                 )
             
-            if visualization_type == "Heatmap":
-                # Create stress level heatmap
-                stress_grade = df.groupby(['Stress_Level (1-10)', 'Grade']).size().reset_index(name='Count')
-                stress_grade['Stress_Level (1-10)'] = stress_grade['Stress_Level (1-10)'].round().astype(int)
-                stress_pivot = stress_grade.pivot_table(
-                    index='Stress_Level (1-10)',
-                    columns='Grade',
-                    values='Count',
-                    aggfunc='sum',
-                    fill_value=0
-                )
-                
-                fig = px.imshow(
-                    stress_pivot,
-                    labels=dict(x="Grade", y="Stress Level (1-10)", color="Students"),
-                    x=stress_pivot.columns,
-                    y=stress_pivot.index,
-                    color_continuous_scale='RdYlBu_r',
-                    title="😰 Student Stress vs Academic Performance"
-                )
-                
-                # Add text annotations
-                for i, stress_level in enumerate(stress_pivot.index):
-                    for j, grade in enumerate(stress_pivot.columns):
-                        value = stress_pivot.iloc[i, j]
-                        if value > 0:
-                            text_color = 'white' if value > stress_pivot.values.max() * 0.6 else 'black'
-                            fig.add_annotation(
-                                x=j,
-                                y=i,
-                                text=str(value),
-                                showarrow=False,
-                                font=dict(color=text_color, size=11, family='Arial Bold')
-                            )
-            else:
-                # Create scatter plot of stress vs performance
-                fig = px.scatter(
-                    df,
-                    x='Stress_Level (1-10)',
-                    y=performance_metric,
-                    color='Grade',
-                    title=f"Stress Level vs {performance_metric.replace('_', ' ')}",
-                    color_discrete_sequence=px.colors.qualitative.Bold
-                )
-                
-                fig.update_traces(marker=dict(size=12, opacity=0.7), selector=dict(mode='markers'))
-                
-                # Add manual trendline using numpy
-                stress_clean = df['Stress_Level (1-10)'].dropna()
-                performance_clean = df[performance_metric].dropna()
-                
-                # Filter to matching indices
-                valid_indices = stress_clean.index.intersection(performance_clean.index)
-                if len(valid_indices) > 1:
-                    x_vals = df.loc[valid_indices, 'Stress_Level (1-10)']
-                    y_vals = df.loc[valid_indices, performance_metric]
-                    
-                    # Calculate trendline
-                    z = np.polyfit(x_vals, y_vals, 1)
-                    p = np.poly1d(z)
-                    
-                    x_range = np.linspace(x_vals.min(), x_vals.max(), 100)
-                    y_range = p(x_range)
-                    
-                    # Add trendline
-                    fig.add_trace(go.Scatter(
-                        x=x_range,
-                        y=y_range,
-                        mode='lines',
-                        name='Trend Line',
-                        line=dict(color='rgba(255,255,255,0.8)', width=2, dash='dash')
-                    ))
-            
-            fig.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font=dict(size=12),
-                height=500
+            stress_chart = st.empty()
+            panels.submit(
+                'stress',
+                lambda: cached_chart(
+                    figures, data, 'stress_impact',
+                    visualization_type=visualization_type,
+                    metric=performance_metric if visualization_type == "Scatter Plot" else None,
+                    rendering=(max_points, large_mode) if visualization_type == "Scatter Plot" else None
+                ),
+                lambda fig: stress_chart.plotly_chart(fig, use_container_width=True)
             )
             
-            st.plotly_chart(fig, use_container_width=True)
-            
             # Add analytical insights
-            stress_corr = df['Stress_Level (1-10)'].corr(df[performance_metric])
-            
-            if abs(stress_corr) < 0.2:
-                correlation_strength = "weak"
-            elif abs(stress_corr) < 0.6:
-                correlation_strength = "moderate"
-            else:
-                correlation_strength = "strong"
-                
-            st.info(f"📊 **Analysis:** There is a **{correlation_strength}** correlation ({stress_corr:.3f}) between stress level and {performance_metric.replace('_', ' ')}.")
+            stress_info = st.empty()
+            panels.submit(
+                'stress_trend',
+                lambda: stress_correlation(data, performance_metric),
+                lambda stress: stress_info.info(f"📊 **Analysis:** There is a **{stress['strength']}** correlation ({stress['r']:.3f}) between stress level and {performance_metric.replace('_', ' ')}.")
+            )
             
+        panels.run()
         st.markdown('</div>', unsafe_allow_html=True)
 
 
-def interactive_demographic_analysis(df):
+def interactive_demographic_analysis(data):
     """Creates an interactive visualization for analyzing demographic factors"""
+    figures = get_figure_cache()
+    df = data.frame
     st.markdown("### 👨‍👩‍👧‍👦 Demographic Factors Analysis")
     
     with st.container():
@@ -571,24 +520,7 @@ def interactive_demographic_analysis(df):
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            # Get available categorical columns dynamically
-            categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
-            # Remove columns that are not useful for demographic analysis
-            exclude_cols = ['Student_ID', 'Grade', 'Department']
-            available_factors = [col for col in categorical_cols if col not in exclude_cols]
-            
-            # Add commonly expected demographic columns if they exist
-            potential_factors = ["Family_Income_Level", "Internet_Access_at_Home", "Gender", "Transport_Mode"]
-            final_factors = []
-            
-            for factor in potential_factors:
-                if factor in df.columns:
-                    final_factors.append(factor)
-            
-            # Add any other categorical columns not in the potential list
-            for factor in available_factors:
-                if factor not in final_factors:
-                    final_factors.append(factor)
+            final_factors = demographic_factors(df)
             
             if not final_factors:
                 st.error("No demographic factors available for analysis.")
@@ -606,14 +538,14 @@ def interactive_demographic_analysis(df):
         with col2:
             secondary_factor = st.selectbox(
                 "Secondary Factor (Color):",
-                ["Grade", "Department", "None"],
+                SECONDARY_FACTORS,
                 key='secondary_factor'
             )
             
         with col3:
             plot_type = st.selectbox(
                 "Plot Type:",
-                ["Bar Chart", "Pie Chart", "Grouped Bar Chart"],
+                DEMOGRAPHIC_PLOT_TYPES,
                 key='demographic_plot_type'
             )
         
@@ -621,177 +553,76 @@ def interactive_demographic_analysis(df):
         normalize = st.checkbox("Show Percentages", value=False, key='normalize_chart')
         show_stats = st.checkbox("Show Statistical Summary", value=False, key='show_stats')
         
-        # Filter and prepare data
-        demo_df = df.copy()
-        demo_df = demo_df.dropna(subset=[primary_factor])
+        # Aggregate counts, from the cube when both factors are cube dimensions
+        with stage('aggregate'):
+            counts = demographic_counts(data, primary_factor, secondary_factor)
         
         # Check if we have data for the selected factor
-        if len(demo_df[primary_factor].unique()) == 0:
+        if len(counts['primary']) == 0:
             st.error(f"No data available for {primary_factor_labels[primary_factor]}. Please select another factor.")
             return
-
-        if secondary_factor != "None":
-            demo_df = demo_df.dropna(subset=[secondary_factor])
             
         # Show data availability info
-        st.info(f"📊 Analyzing {len(demo_df)} students with available {primary_factor_labels[primary_factor]} data")
+        st.info(f"📊 Analyzing {counts['students']} students with available {primary_factor_labels[primary_factor]} data")
         
-        # Create the visualization based on selections
-        if plot_type == "Bar Chart":
-            if secondary_factor == "None" or normalize:
-                if normalize:
-                    # Create percentage stacked bar chart
-                    temp_df = demo_df.groupby(primary_factor)[secondary_factor].value_counts(normalize=True).mul(100).reset_index(name='Percentage')
-                    fig = px.bar(
-                        temp_df,
-                        x=primary_factor,
-                        y='Percentage',
-                        color=secondary_factor,
-                        text=temp_df['Percentage'].round(1).astype(str) + '%',
-                        title=f"Distribution by {primary_factor.replace('_', ' ')}",
-                        color_discrete_sequence=px.colors.qualitative.Bold
-                    )
-                    fig.update_traces(textposition='inside')
-                    fig.update_layout(yaxis_title='Percentage (%)')
-                else:
-                    # Create simple count bar chart
-                    counts = demo_df[primary_factor].value_counts().reset_index()
-                    counts.columns = [primary_factor, 'Count']
-                    fig = px.bar(
-                        counts,
-                        x=primary_factor,
-                        y='Count',
-                        text='Count',
-                        title=f"Distribution by {primary_factor.replace('_', ' ')}",
-                        color=primary_factor,
-                        color_discrete_sequence=px.colors.qualitative.Bold
-                    )
-                    fig.update_layout(showlegend=False)
-            else:
-                # Create grouped bar chart
-                grouped = demo_df.groupby([primary_factor, secondary_factor]).size().reset_index(name='Count')
-                fig = px.bar(
-                    grouped,
-                    x=primary_factor,
-                    y='Count',
-                    color=secondary_factor,
-                    text='Count',
-                    barmode='group',
-                    title=f"{secondary_factor.replace('_', ' ')} Distribution by {primary_factor.replace('_', ' ')}",
-                    color_discrete_sequence=px.colors.qualitative.Bold
-                )
-                
-        elif plot_type == "Pie Chart":
-            if secondary_factor != "None":
-                # Create a donut chart with secondary factor as inner ring
-                primary_counts = demo_df[primary_factor].value_counts()
-                
-                fig = go.Figure()
-                
-                # Add pie chart for primary factor
-                fig.add_trace(go.Pie(
-                    labels=primary_counts.index,
-                    values=primary_counts.values,
-                    name=primary_factor.replace('_', ' '),
-                    hole=0.5,
-                    textinfo='label+percent',
-                    marker_colors=px.colors.qualitative.Bold[:len(primary_counts)]
-                ))
-                
-                # Add annotation in the center
-                fig.update_layout(
-                    annotations=[dict(
-                        text=primary_factor.replace('_', ' '),
-                        x=0.5, y=0.5,
-                        font_size=15,
-                        showarrow=False
-                    )]
-                )
-            else:
-                # Simple pie chart
-                primary_counts = demo_df[primary_factor].value_counts().reset_index()
-                primary_counts.columns = [primary_factor, 'Count']
-                
-                fig = px.pie(
-                    primary_counts,
-                    values='Count',
-                    names=primary_factor,
-                    title=f"Distribution by {primary_factor.replace('_', ' ')}",
-                    color_discrete_sequence=px.colors.qualitative.Bold
-                )
-                fig.update_traces(textposition='inside', textinfo='percent+label')
-                
-        elif plot_type == "Grouped Bar Chart":
-            if secondary_factor == "None":
-                st.warning("Please select a secondary factor for grouped bar chart")
-                return
-                
-            # Create grouped bar chart
-            grouped = demo_df.groupby([primary_factor, secondary_factor]).size().reset_index(name='Count')
-            
-            if normalize:
-                # Calculate percentages within each primary factor group
-                total = grouped.groupby(primary_factor)['Count'].transform('sum')
-                grouped['Percentage'] = (grouped['Count'] / total) * 100
-                
-                fig = px.bar(
-                    grouped,
-                    x=primary_factor,
-                    y='Percentage',
-                    color=secondary_factor,
-                    text=grouped['Percentage'].round(1).astype(str) + '%',
-                    title=f"{secondary_factor.replace('_', ' ')} Distribution by {primary_factor.replace('_', ' ')}",
-                    color_discrete_sequence=px.colors.qualitative.Bold
-                )
-                fig.update_layout(yaxis_title='Percentage (%)')
-            else:
-                fig = px.bar(
-                    grouped,
-                    x=primary_factor,
-                    y='Count',
-                    color=secondary_factor,
-                    text='Count',
-                    title=f"{secondary_factor.replace('_', ' ')} Distribution by {primary_factor.replace('_', ' ')}",
-                    color_discrete_sequence=px.colors.qualitative.Bold
-                )
+        if plot_type == "Grouped Bar Chart" and secondary_factor == "None":
+            st.warning("Please select a secondary factor for grouped bar chart")
+            return
         
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(size=12),
-            height=500
-        )
+        with stage('figure'):
+            fig = cached_chart(
+                figures, data, 'demographics',
+                primary_factor=primary_factor, secondary_factor=secondary_factor,
+                plot_type=plot_type, normalize=normalize
+            )
         
-        st.plotly_chart(fig, use_container_width=True)
+        with stage('render'):
+            st.plotly_chart(fig, use_container_width=True)
         
         # Statistical summary if requested
-        if show_stats and secondary_factor != "None":
+        if show_stats:
             st.markdown("#### Statistical Summary")
             
-            # Create a contingency table
-            cont_table = pd.crosstab(demo_df[primary_factor], demo_df[secondary_factor])
-            st.dataframe(cont_table, use_container_width=True)
-            
-            # Check if table is suitable for chi-square test (no empty cells, sufficient observations)
-            if cont_table.shape[0] > 1 and cont_table.shape[1] > 1 and (cont_table < 5).sum().sum() == 0:
+            if secondary_factor != "None":
+                # Create a contingency table
+                cont_table = counts['pairs'].unstack(fill_value=0)
+                st.dataframe(cont_table, use_container_width=True)
+                
                 try:
-                    # Run chi-square test to see if there's a significant relationship
-                    from scipy.stats import chi2_contingency
-                    chi2, p, dof, expected = chi2_contingency(cont_table)
-                    
-                    if p < 0.05:
-                        st.success(f"📊 There is a statistically significant relationship between {primary_factor.replace('_', ' ')} and {secondary_factor.replace('_', ' ')} (p={p:.4f})")
-                    else:
-                        st.info(f"📊 No statistically significant relationship found between {primary_factor.replace('_', ' ')} and {secondary_factor.replace('_', ' ')} (p={p:.4f})")
+                    # Test for a significant relationship; sparse tables get an exact or permutation test
+                    with stage('association'):
+                        test = association_test(data, primary_factor, secondary_factor)
                 except Exception as e:
                     st.warning(f"Cannot perform statistical test: {e}")
-            else:
-                st.warning("⚠️ Not enough data for a valid statistical test. Some categories have fewer than 5 observations.")
+                else:
+                    if test is None:
+                        st.warning("⚠️ Not enough categories for a statistical test.")
+                    else:
+                        method = TEST_METHODS[test['method']]
+                        if test['p'] < 0.05:
+                            st.success(f"📊 There is a statistically significant relationship between {primary_factor.replace('_', ' ')} and {secondary_factor.replace('_', ' ')} (p={test['p']:.4f}, {method} test)")
+                        else:
+                            st.info(f"📊 No statistically significant relationship found between {primary_factor.replace('_', ' ')} and {secondary_factor.replace('_', ' ')} (p={test['p']:.4f}, {method} test)")
+                        st.caption(f"Cramér's V {test['cramers_v']:.3f} · mutual information {test['mutual_info']:.4f} bits · {test['students']:,} students")
+            
+            with st.expander("🔗 Strongest Associations Between Categorical Factors"):
+                with stage('ranking'):
+                    ranking = strongest_associations(data)
+                st.dataframe(
+                    ranking.rename(columns={
+                        'factor_a': "Factor", 'factor_b': "Other Factor", 'cramers_v': "Cramér's V",
+                        'mutual_info': "Mutual Information (bits)", 'chi2': "Chi-square", 'dof': "DoF",
+                        'p': "p-value", 'method': "Test", 'students': "Students"
+                    }),
+                    use_container_width=True, hide_index=True
+                )
 
 # Add a new function after interactive_demographic_analysis
 
-def correlation_analysis(df):
+def correlation_analysis(data):
     """Creates an interactive correlation heatmap of performance metrics"""
+    figures = get_figure_cache()
+    engine = data.engine
     st.markdown("### 🔄 Performance Correlation Analysis")
     
     with st.container():
@@ -802,21 +633,24 @@ def correlation_analysis(df):
         with col1:
             correlation_vars = st.multiselect(
                 "Select Variables:",
-                options=['Total_Score', 'Midterm_Score', 'Final_Score', 'Assignments_Avg', 
-                         'Quizzes_Avg', 'Participation_Score', 'Projects_Score', 
-                         'Study_Hours_per_Week', 'Stress_Level (1-10)', 'Sleep_Hours_per_Night', 
-                         'Attendance (%)'],
-                default=['Total_Score', 'Midterm_Score', 'Final_Score', 'Study_Hours_per_Week'],
+                options=CORRELATION_VARIABLES,
+                default=DEFAULT_CORRELATION_VARIABLES,
                 format_func=lambda x: format_field_name(x)
             )
         
         with col2:
             correlation_method = st.selectbox(
                 "Correlation Method:",
-                options=["pearson", "spearman"],
+                options=CORRELATION_METHODS,
                 format_func=lambda x: "Pearson (linear)" if x == "pearson" else "Spearman (rank-based)"
             )
             
+            correlation_dept = st.selectbox(
+                "Department:",
+                options=['All'] + engine.options('Department'),
+                key='correlation_dept'
+            )
+            
             show_values = st.checkbox("Show Correlation Values", value=True)
         
         if len(correlation_vars) < 2:
@@ -824,34 +658,16 @@ def correlation_analysis(df):
             st.markdown('</div>', unsafe_allow_html=True)
             return
             
-        # Calculate correlation matrix
-        corr_df = df[correlation_vars].corr(method=correlation_method)
-        
-        # Set up mask to hide upper triangle (redundant data)
-        mask = np.triu(np.ones_like(corr_df, dtype=bool))
-        
-        # Create heatmap
-        fig = px.imshow(
-            corr_df,
-            color_continuous_scale='RdBu_r',
-            zmin=-1, zmax=1,
-            text_auto='.2f' if show_values else None,
-            labels=dict(color="Correlation"),
-            title=f"Correlation Matrix ({correlation_method.capitalize()})"
-        )
-        
-        # Update layout
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(size=12),
-            height=600,
-            xaxis_title="",
-            yaxis_title=""
-        )
+        with stage('figure'):
+            fig = cached_chart(
+                figures, data, 'correlation',
+                variables=correlation_vars, method=correlation_method, show_values=show_values,
+                department=correlation_dept
+            )
         
         # Display heatmap
-        st.plotly_chart(fig, use_container_width=True)
+        with stage('render'):
+            st.plotly_chart(fig, use_container_width=True)
         
         # Add interpretation guide
         with st.expander("📊 How to Interpret Correlations"):
@@ -867,10 +683,158 @@ def correlation_analysis(df):
             
         st.markdown('</div>', unsafe_allow_html=True)
 
+def term_comparison(catalog):
+    """Compares grade distributions and scores across the terms registered in the catalog"""
+    st.markdown("### 🗓️ Term Comparison")
+    
+    if not catalog.entries:
+        st.info("No term exports are registered yet. Add one with "
+                "`python catalog.py add <export.csv> --term <term> --campus <campus>`.")
+        return
+    
+    with st.container():
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            terms = st.multiselect("Terms:", catalog.terms(), default=catalog.terms(), key='compare_terms')
+        
+        with col2:
+            campus = st.selectbox("Campus:", ['All'] + catalog.campuses(), key='compare_campus')
+        campuses = None if campus == 'All' else [campus]
+        
+        with col3:
+            # Reads only the Department column of each selected term, once per export
+            with stage('departments'):
+                departments = catalog.aggregate(['Department'], terms=terms, campuses=campuses)['Department']
+            compare_dept = st.selectbox("Department:", ['All'] + sorted(departments.unique()), key='compare_dept')
+        
+        view_type = st.radio("View Type:", ["Count", "Percentage"], horizontal=True, key='compare_view_type')
+        
+        if not terms:
+            st.warning("Please select at least one term")
+            return
+        
+        with stage('aggregate'):
+            grade_counts = catalog.aggregate(['Grade'], 'Total_Score', where={'Department': compare_dept},
+                                             terms=terms, campuses=campuses)
+        if len(grade_counts) == 0:
+            st.warning("No data available for the selected filters")
+            return
+        
+        with stage('figure'):
+            fig = term_grade_figure(grade_counts, view_type)
+        
+        with stage('render'):
+            st.plotly_chart(fig, use_container_width=True)
+        
+        st.dataframe(term_summary_table(grade_counts), use_container_width=True, hide_index=True)
+        
+        if st.toggle("Archive-Wide Statistics", value=False, key='compare_archive',
+                     help="Streams every selected export from disk, so the archive need not fit in memory"):
+            archive_statistics(catalog, terms, campuses, compare_dept)
+
+
+def archive_statistics(catalog, terms, campuses, department):
+    """Shows exact statistics over all selected terms, merged from per-partition aggregates"""
+    where = {'Department': department}
+    engine = ArchiveEngine.from_catalog(catalog, terms, campuses)
+    with stage('archive'):
+        summary = engine.summary()
+    if summary is None or summary.cube.total(where) == 0:
+        st.warning("No data available for the selected filters")
+        return
+    
+    metrics = summary.header(where)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Students", f"{metrics['students']:,}")
+    col2.metric("Average Score", f"{metrics['avg_score']:.1f}")
+    col3.metric("A Grade Rate", f"{metrics['a_grade_pct']:.1f}%")
+    col4.metric("Avg Attendance", f"{metrics['avg_attendance']:.1f}%")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### Grades")
+        st.dataframe(summary.grade_summary(where), use_container_width=True, hide_index=True)
+    with col2:
+        st.markdown("#### Sleep by Grade")
+        st.dataframe(summary.sleep_stats(where), use_container_width=True, hide_index=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### Stress Trends")
+        trends = regression_table({metric: summary.stress_trend(metric, where) for metric in PERFORMANCE_METRICS})
+        st.dataframe(trends[['n', 'slope', 'r', 'r2']].astype('float64').round(3), use_container_width=True)
+    with col2:
+        st.markdown("#### Progress")
+        progress = summary.progress_summary(where)
+        st.metric("Avg. Improvement", f"{progress['avg_improvement']:.2f}")
+        st.metric("Students Improved", f"{progress['improved_pct']:.1f}%")
+        st.metric("Max Improvement", f"{progress['max_improvement']:.2f}")
+    
+    st.markdown("#### Correlations")
+    method = st.radio("Method:", CORRELATION_METHODS, horizontal=True, key='archive_correlation_method',
+                      help="Spearman ranks every value and takes two more passes over the archive")
+    with stage('correlation'):
+        matrix = summary.correlation(CORRELATION_VARIABLES, where) if method == 'pearson' \
+            else engine.spearman(CORRELATION_VARIABLES, where)
+    st.dataframe(matrix.round(3), use_container_width=True)
+    
+    st.markdown("#### Strongest Associations")
+    st.dataframe(summary.associations().head(10), use_container_width=True, hide_index=True)
+
+
+@st.fragment
+def raw_data_viewer(snapshot):
+    """Shows one page of the raw dataset; paging, sorting and searching rerun only this table"""
+    st.markdown("### 🗂️ Raw Dataset")
+    include_pii = st.toggle("Show Names and Emails", value=False, key='raw_show_pii')
+    view = get_table_view(snapshot.version, include_pii, snapshot)
+    columns = list(view.frame.columns)
+    
+    col1, col2, col3, col4 = st.columns([2, 3, 2, 1])
+    with col1:
+        search_column = st.selectbox("Search Column:", columns, format_func=format_field_name, key='raw_search_column')
+    with col2:
+        search_text = st.text_input("Search:", key='raw_search_text',
+                                    placeholder="Text to find, or a number / range like 10..20")
+    with col3:
+        sort_column = st.selectbox("Sort By:", [None] + columns, key='raw_sort_column',
+                                   format_func=lambda c: "Original order" if c is None else format_field_name(c))
+    with col4:
+        descending = st.toggle("Descending", value=False, key='raw_sort_descending')
+    
+    try:
+        rows = view.rows((search_column, search_text), sort_column, not descending)
+    except ValueError as e:
+        st.warning(str(e))
+        return
+    
+    page_size = st.session_state.get('raw_page_size', RAW_PAGE_SIZES[0])
+    n_pages = max(1, -(-len(rows) // page_size))
+    # A narrower search can leave fewer pages than the one shown
+    if st.session_state.get('raw_page', 1) > n_pages:
+        st.session_state['raw_page'] = n_pages
+    page = st.session_state.get('raw_page', 1)
+    # Only this window of rows is serialized to the browser
+    st.dataframe(view.page(rows, page - 1, page_size), use_container_width=True)
+    
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        st.number_input("Page:", min_value=1, max_value=n_pages, key='raw_page')
+    with col2:
+        st.selectbox("Rows per page:", RAW_PAGE_SIZES, key='raw_page_size')
+    with col3:
+        first = (page - 1) * page_size
+        st.caption(f"Rows {min(first + 1, len(rows)):,}–{min(first + page_size, len(rows)):,} of "
+                   f"{len(rows):,} matching ({len(view.frame):,} students)")
+
 # Add another function for student progress analysis
 
-def student_progress_analysis(df):
+def student_progress_analysis(data):
     """Creates an interactive visualization of student progress from midterm to final"""
+    figures = get_figure_cache()
+    engine = data.engine
+    max_points, large_mode = rendering_options()
     st.markdown("### 📈 Student Progress Analysis")
     
     with st.container():
@@ -879,153 +843,178 @@ def student_progress_analysis(df):
         col1, col2 = st.columns(2)
         
         with col1:
-            departments = ['All'] + sorted(df['Department'].unique().tolist())
+            departments = ['All'] + engine.options('Department')
             progress_dept = st.selectbox('Department:', departments, key='progress_dept')
             
         with col2:
             view_type = st.radio(
                 "View Type:",
-                ["Improvement Distribution", "Midterm vs Final Comparison"],
+                PROGRESS_VIEWS,
                 horizontal=True,
                 key='progress_view_type'
             )
         
-        # Filter data based on selection
-        if progress_dept != 'All':
-            progress_df = df[df['Department'] == progress_dept].copy()
-        else:
-            progress_df = df.copy()
-            
-        # Calculate improvement metrics
-        progress_df['Improvement'] = progress_df['Final_Score'] - progress_df['Midterm_Score']
-        progress_df['Improvement_Percentage'] = (progress_df['Improvement'] / progress_df['Midterm_Score'] * 100).round(1)
-        
-        # Create visualization based on selected view type
-        if view_type == "Improvement Distribution":
-            # Create improvement distribution chart
-            fig = px.histogram(
-                progress_df,
-                x='Improvement',
-                color='Grade',
-                marginal="box",
-                histnorm='percent',
-                title=f"Score Improvement Distribution {f'for {progress_dept}' if progress_dept != 'All' else ''}",
-                color_discrete_sequence=px.colors.qualitative.Bold,
-                labels={"Improvement": "Final Score - Midterm Score", "count": "Percentage of Students"}
-            )
-            
-            # Add a vertical line at zero improvement
-            fig.add_vline(x=0, line_dash="dash", line_color="red")
-            
-        else:  # Midterm vs Final Comparison
-            # Create scatter plot comparing midterm to final scores
-            fig = px.scatter(
-                progress_df,
-                x='Midterm_Score',
-                y='Final_Score',
-                color='Grade',
-                hover_name='Student_ID',
-                hover_data=['Department', 'Improvement'],
-                color_discrete_sequence=px.colors.qualitative.Bold,
-                opacity=0.7,
-                title=f"Midterm vs Final Performance {f'for {progress_dept}' if progress_dept != 'All' else ''}",
-                labels={"Midterm_Score": "Midterm Score", "Final_Score": "Final Score"}
-            )
-            
-            # Add diagonal line (y=x) representing no change
-            max_score = max(progress_df['Midterm_Score'].max(), progress_df['Final_Score'].max())
-            fig.add_trace(
-                go.Scatter(
-                    x=[0, max_score],
-                    y=[0, max_score],
-                    mode='lines',
-                    line=dict(color='gray', dash='dash'),
-                    name='No Change'
-                )
-            )
-        
-        # Update layout
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(size=12),
-            height=500
-        )
+        # The chart and the summary metrics are computed together and drawn as each is ready
+        panels = PanelScheduler(get_panel_pool())
         
         # Display visualization
-        st.plotly_chart(fig, use_container_width=True)
+        progress_chart = st.empty()
+        panels.submit(
+            'figure',
+            lambda: cached_chart(
+                figures, data, 'progress',
+                department=progress_dept, view_type=view_type,
+                rendering=(max_points, large_mode) if view_type == "Midterm vs Final Comparison" else None
+            ),
+            lambda fig: progress_chart.plotly_chart(fig, use_container_width=True)
+        )
         
         # Display summary statistics
         col1, col2, col3 = st.columns(3)
         
-        with col1:
-            avg_improvement = progress_df['Improvement'].mean()
-            improvement_color = "green" if avg_improvement > 0 else "red"
-            st.metric(
+        def show_summary(summary):
+            avg_improvement = summary['avg_improvement']
+            col1.metric(
                 "Average Improvement",
                 f"{avg_improvement:.2f} points",
                 delta=f"{avg_improvement:.1f}"
             )
-            
-        with col2:
-            improved_pct = (progress_df['Improvement'] > 0).mean() * 100
-            st.metric(
+            col2.metric(
                 "Students Improved",
-                f"{improved_pct:.1f}%",
+                f"{summary['improved_pct']:.1f}%",
                 delta=None
             )
-            
-        with col3:
-            most_improved = progress_df.loc[progress_df['Improvement'].idxmax()]
-            st.metric(
+            col3.metric(
                 "Max Improvement",
-                f"{most_improved['Improvement']:.2f} points",
+                f"{summary['max_improvement']:.2f} points",
                 delta=None
             )
-            
+        
+        # Filter data and calculate improvement metrics
+        panels.submit('summary', lambda: progress_summary(progress_frame(data, progress_dept)), show_summary)
+        
+        panels.run()
         st.markdown('</div>', unsafe_allow_html=True)
 
 # Update the main function to include new visualizations
 
 def main():
+    configure_page()
+    start_metrics_server()
+    profile = start_rerun(session_id(), trace_memory=st.session_state.get('profile_memory', False))
+    try:
+        dashboard(profile)
+    finally:
+        # Reruns cut short by st.stop() or an error release memory tracing too
+        profile.close()
+
+
+def dashboard(profile):
+    # The catalog file is small and re-read every rerun, so newly registered terms appear
+    catalog = DatasetCatalog(shared_cache=get_shared_cache())
+    sources = dataset_sources(catalog)
+    # Kept outside the widget's own state, which is dropped on reruns that stop while loading
+    if st.session_state.get('dataset_source') not in sources:
+        st.session_state['dataset_source'] = LIVE_SOURCE
+    
     # Load the data
-    df = load_data()
+    with stage('load'):
+        loader = load_data(*sources[st.session_state['dataset_source']])
+        
+        # A warm cache loads in well under a second; otherwise stream progress
+        loader.thread.join(timeout=0.5)
+    if loader.error is not None:
+        # Drop the failed load so the next rerun tries again instead of showing a stale error
+        load_data.clear(*sources[st.session_state['dataset_source']])
+        st.error(f"Could not load the dataset: {loader.error}")
+        st.stop()
+    if loader.dataset is None:
+        display_load_progress(loader)
+        st.stop()
+    data = loader.dataset
+    
+    # Fold in rows the SIS appended or corrected since the last rerun
+    with stage('refresh'):
+        upserted = data.refresh()
+    if upserted:
+        st.toast(f"🔄 {upserted} student records updated")
+    
+    snapshot = data.current
+    df = snapshot.frame
+    table_view = get_table_view(snapshot.version, False, snapshot)
     
     # Display header and metrics
-    display_header_metrics(df)
+    with stage('header'):
+        display_header_metrics(header_metrics(accumulate_header_totals({}, df)))
     
     # Sidebar for global filters and navigation
     st.sidebar.title("Dashboard Controls")
     
+    if len(sources) > 1:
+        source_labels = list(sources)
+        st.sidebar.selectbox(
+            "Dataset:", source_labels, index=source_labels.index(st.session_state['dataset_source']),
+            key='dataset_choice', help="Terms registered in the catalog are loaded the first time they are selected",
+            on_change=lambda: st.session_state.update(dataset_source=st.session_state['dataset_choice'])
+        )
+    
     # Data Overview
     with st.sidebar.expander("📋 Data Overview", expanded=False):
-        st.dataframe(df.describe(), use_container_width=True)
+        with stage('overview'):
+            st.dataframe(table_view.describe(), use_container_width=True)
+        
+        row_bytes = bytes_per_row(df)
+        st.caption(f"💾 {row_bytes:.0f} bytes/student in memory "
+                   f"(≈ {row_bytes * 1_000_000 / 2**20:,.0f} MiB per 1M students)")
         
-        if st.button("View Raw Dataset"):
-            st.dataframe(df, use_container_width=True)
+        figure_stats = get_figure_cache().stats()
+        st.caption(f"🧩 Figure cache: {figure_stats['hits']} hits / {figure_stats['store_hits']} precomputed / "
+                   f"{figure_stats['misses']} built ({figure_stats['entries']} cached)")
+        
+        shared_stats = get_shared_cache().stats()
+        st.caption(f"🗄️ Shared cache ({shared_stats['backend']}): {shared_stats['entries']} entries"
+                   + (f", {shared_stats['bytes'] / 2**20:,.1f} MiB" if 'bytes' in shared_stats else ""))
+        
+        show_raw = st.toggle("View Raw Dataset", value=False, key='show_raw_data')
+    
+    # Filled in once the section has run, so it shows this rerun's stages
+    profile_panel = st.sidebar.expander("⏱️ Profiling", expanded=False)
+    
+    # Large scatter and box plots are downsampled or binned above this many points
+    with st.sidebar.expander("🖥️ Rendering", expanded=False):
+        st.number_input("Max points per chart:", min_value=1000, max_value=1_000_000,
+                        value=MAX_RENDERED_POINTS, step=1000, key='max_rendered_points')
+        st.radio("Large scatter plots:", LARGE_PLOT_MODES, horizontal=True, key='large_plot_mode')
     
     # Navigation through key sections
     analysis_type = st.sidebar.radio(
         "Select Analysis Section:",
         ["Academic Performance", "Performance Factors", "Demographic Analysis", 
-         "Correlation Analysis", "Progress Analysis"]
+         "Correlation Analysis", "Progress Analysis", "Term Comparison"]
     )
     
+    if show_raw:
+        raw_data_viewer(snapshot)
+    
     # Display selected analysis
-    if analysis_type == "Academic Performance":
-        interactive_grade_distribution(df)
+    with section(analysis_type):
+        if analysis_type == "Academic Performance":
+            interactive_grade_distribution(snapshot)
         
-    elif analysis_type == "Performance Factors":
-        interactive_performance_factors(df)
+        elif analysis_type == "Performance Factors":
+            interactive_performance_factors(snapshot)
         
-    elif analysis_type == "Demographic Analysis":
-        interactive_demographic_analysis(df)
+        elif analysis_type == "Demographic Analysis":
+            interactive_demographic_analysis(snapshot)
     
-    elif analysis_type == "Correlation Analysis":
-        correlation_analysis(df)
+        elif analysis_type == "Correlation Analysis":
+            correlation_analysis(snapshot)
+        
+        elif analysis_type == "Progress Analysis":
+            student_progress_analysis(snapshot)
         
-    elif analysis_type == "Progress Analysis":
-        student_progress_analysis(df)
+        elif analysis_type == "Term Comparison":
+            term_comparison(catalog)
     
     # Footer
     st.markdown("---")
@@ -1035,6 +1024,10 @@ def main():
         <p>Interactive Educational Data Analysis • Built with Streamlit and Plotly</p>
     </div>
     """, unsafe_allow_html=True)
+    
+    finish_rerun(profile)
+    with profile_panel:
+        display_profile(profile, analysis_type)
 
 
 if __name__ == "__main__":
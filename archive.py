@@ -0,0 +1,328 @@
+"""Exact dashboard statistics over archives too large to load, computed out of core.
+
+The archive is every columnar partition of the catalog's exports (or any
+list of CSVs). Partitions are streamed one record batch at a time, each batch
+is reduced to mergeable partial aggregates, and the partials are merged:
+
+    - an AggregateCube: counts and score, attendance and improvement moments
+      per combination of the chart dimensions
+    - correlation partials: pairwise counts, sums and cross-products
+    - exact value histograms of nightly sleep and extrema of the
+      midterm-to-final improvement per combination of ARCHIVE_DIMENSIONS
+
+Merging is exact, so grades, factors, demographics, associations, Pearson
+correlations and progress equal the in-memory results up to the order of
+floating-point summation. Memory is bounded by one batch plus the partials,
+whose size grows with the number of groups and distinct values, not rows.
+Spearman needs ranks and takes two streaming passes. With a shared cache,
+each partition's partials are stored under its content hash:
+
+    python archive.py --terms 2024-Fall 2025-Spring --department Engineering
+    python archive.py --csv exports/2023.csv --csv exports/2024.csv
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics import cube_stress_trend, grade_summary_table, header_metrics
+from associations import MAX_ASSOCIATION_LEVELS, contingency_statistics
+from catalog import DatasetCatalog
+from correlation import CORRELATION_DIMENSIONS, CorrelationService, correlation_from_sums, pairwise_sums
+from cube import CUBE_DIMENSIONS, CUBE_MEASURES, AggregateCube
+from datastore import CACHE_DIR, NUMERIC_COLUMNS, SCHEMA, ensure_columnar, normalize_where, scan_columnar
+from shared_cache import content_key
+
+# Bump when the pickled layout of ArchiveSummary or the meaning of cached archive results changes
+ARCHIVE_FORMAT_VERSION = 2
+
+# Dimensions the histograms and extrema are kept per; archive filters may use these
+ARCHIVE_DIMENSIONS = CORRELATION_DIMENSIONS
+
+ARCHIVE_MEASURES = CUBE_MEASURES + ['Attendance (%)', 'Improvement', 'Improved']
+
+# Columns with an exact value histogram, for medians
+HISTOGRAM_COLUMNS = ['Sleep_Hours_per_Night']
+
+# Every column a partition summary reads
+ARCHIVE_COLUMNS = [col for col in SCHEMA
+                   if col in CUBE_DIMENSIONS + CUBE_MEASURES + NUMERIC_COLUMNS + ARCHIVE_DIMENSIONS]
+
+
+def _keys(frame):
+    """Casts dimension columns to object so partials with different categories concatenate"""
+    return frame.astype({dim: object for dim in ARCHIVE_DIMENSIONS})
+
+
+def _where_mask(frame, where):
+    mask = np.ones(len(frame), dtype=bool)
+    for col, selected in normalize_where(where).items():
+        mask &= frame[col].isin(selected).to_numpy()
+    return mask
+
+
+def _average_ranks(counts):
+    """Returns the distinct values and their average ranks, from value counts"""
+    counts = counts.sort_index()
+    n = counts.to_numpy(dtype='float64')
+    return counts.index.to_numpy(dtype='float64'), np.cumsum(n) - n + (n + 1) / 2
+
+
+def _ranks(x, values, value_ranks):
+    """Looks up the average rank of every value of x; missing values stay NaN"""
+    if len(values) == 0:
+        return np.full(len(x), np.nan)
+    positions = np.searchsorted(values, x).clip(max=len(values) - 1)
+    return np.where(np.isnan(x), np.nan, value_ranks[positions])
+
+
+def _median(values, counts):
+    """The median of values repeated counts times, averaging the middle pair like Series.median"""
+    total = counts.sum()
+    if total == 0:
+        return np.nan
+    cumulative = np.cumsum(counts)
+    lower = values[np.searchsorted(cumulative, (total - 1) // 2, side='right')]
+    upper = values[np.searchsorted(cumulative, total // 2, side='right')]
+    return (lower + upper) / 2
+
+
+class ArchiveSummary:
+    """Mergeable partial aggregates of a set of student rows.
+
+    Build one per batch with from_frame and combine them with merge; the
+    result answers the dashboard's aggregate queries for any filter on
+    ARCHIVE_DIMENSIONS (cube-backed queries accept any cube dimension).
+    """
+
+    def __init__(self, cube, correlations, histograms, extrema):
+        self.cube = cube
+        self.correlations = correlations
+        self.histograms = histograms
+        self.extrema = extrema
+
+    @classmethod
+    def from_frame(cls, df):
+        improvement = df['Final_Score'] - df['Midterm_Score']
+        df = df.assign(Improvement=improvement, Improved=(improvement > 0).astype('float32'))
+        keys = [df[dim] for dim in ARCHIVE_DIMENSIONS]
+        histograms = {
+            col: _keys(df.groupby(keys + [df[col].rename('value')], observed=True, dropna=False)
+                       .size().rename('count').reset_index())
+            for col in HISTOGRAM_COLUMNS
+        }
+        extrema = _keys(df.groupby(keys, observed=True, dropna=False)['Improvement']
+                        .agg(['min', 'max']).astype('float64').reset_index())
+        correlations = CorrelationService(df)
+        correlations.frame = None
+        return cls(AggregateCube(df, measures=ARCHIVE_MEASURES), correlations, histograms, extrema)
+
+    def merge(self, other):
+        """Returns the summary of both summaries' rows together; neither is modified"""
+        histograms = {
+            col: pd.concat([self.histograms[col], other.histograms[col]], ignore_index=True)
+            .groupby(ARCHIVE_DIMENSIONS + ['value'], dropna=False, sort=False)['count'].sum().reset_index()
+            for col in self.histograms
+        }
+        extrema = pd.concat([self.extrema, other.extrema], ignore_index=True) \
+            .groupby(ARCHIVE_DIMENSIONS, dropna=False, sort=False).agg({'min': 'min', 'max': 'max'}).reset_index()
+        return ArchiveSummary(self.cube.merge(other.cube), self.correlations.merge(other.correlations),
+                              histograms, extrema)
+
+    @property
+    def students(self):
+        return self.cube.total()
+
+    def header(self, where=None):
+        """The four header metrics over the students matching where"""
+        totals = self.cube.totals(where)
+        return header_metrics({
+            'students': int(totals['count']),
+            'score_sum': totals['Total_Score__sum'],
+            'score_n': int(totals['Total_Score__n']),
+            'a_grades': int(self.cube.counts(['Grade'], where).get('A', 0)),
+            'attendance_sum': totals['Attendance (%)__sum'],
+            'attendance_n': int(totals['Attendance (%)__n']),
+        })
+
+    def grade_summary(self, where=None):
+        return grade_summary_table(self.cube, where or {})
+
+    def demographic_counts(self, primary_factor, secondary_factor, where=None):
+        """Counts per primary factor value and, unless secondary is "None", per pair, as analytics returns them"""
+        primary = self.cube.counts([primary_factor], where).sort_values(ascending=False)
+        if secondary_factor == "None":
+            return {'primary': primary, 'pairs': None, 'students': int(primary.sum())}
+        pairs = self.cube.counts([primary_factor, secondary_factor], where)
+        return {'primary': primary, 'pairs': pairs, 'students': int(pairs.sum())}
+
+    def sleep_stats(self, where=None, grades=None):
+        """Average, median, min and max nightly sleep per grade, exact from the value histogram"""
+        histogram = self.histograms['Sleep_Hours_per_Night']
+        selected = {**(where or {}), **({} if grades is None else {'Grade': list(grades)})}
+        histogram = histogram[_where_mask(histogram, selected) & histogram['Grade'].notna().to_numpy()]
+        rows = []
+        for grade, group in histogram.groupby('Grade', sort=True):
+            counts = group[group['value'].notna()].groupby('value')['count'].sum().sort_index()
+            values, n = counts.index.to_numpy(dtype='float64'), counts.to_numpy()
+            rows.append({
+                'Grade': grade,
+                'Average': (values * n).sum() / n.sum() if n.sum() else np.nan,
+                'Median': _median(values, n),
+                'Min': values.min() if len(values) else np.nan,
+                'Max': values.max() if len(values) else np.nan,
+            })
+        stats = pd.DataFrame(rows, columns=['Grade', 'Average', 'Median', 'Min', 'Max'])
+        return stats.round({'Average': 2, 'Median': 2, 'Min': 2, 'Max': 2})
+
+    def stress_trend(self, metric, where=None):
+        """The regression of a metric on stress level, from the cube's moments per stress level"""
+        return cube_stress_trend(self.cube, metric, where)
+
+    def correlation(self, variables, where=None):
+        return self.correlations.pearson(list(variables), where)
+
+    def progress_summary(self, where=None):
+        """Average and maximum improvement and the share of students who improved"""
+        totals = self.cube.totals(where)
+        extrema = self.extrema[_where_mask(self.extrema, where)]
+        return {
+            'avg_improvement': totals['Improvement__sum'] / totals['Improvement__n']
+            if totals['Improvement__n'] else np.nan,
+            'improved_pct': totals['Improved__sum'] / totals['count'] * 100 if totals['count'] else np.nan,
+            'max_improvement': float(extrema['max'].max()),
+        }
+
+    def associations(self):
+        """Every categorical factor pair ranked by Cramér's V, from the cube's contingency tables"""
+        cells = self.cube.cells
+        columns = [col for col in SCHEMA if col in self.cube.dimensions
+                   and isinstance(cells[col].dtype, pd.CategoricalDtype)
+                   and 1 < len(cells[col].cat.categories) <= MAX_ASSOCIATION_LEVELS]
+        rows = [{'factor_a': a, 'factor_b': b, **contingency_statistics(self.cube.crosstab(a, b).to_numpy())}
+                for k, a in enumerate(columns) for b in columns[k + 1:]]
+        table = pd.DataFrame(rows, columns=['factor_a', 'factor_b', 'cramers_v', 'mutual_info', 'chi2', 'dof',
+                                            'p', 'method', 'students'])
+        return table.sort_values('cramers_v', ascending=False, na_position='last').reset_index(drop=True)
+
+
+class ArchiveEngine:
+    """Streams columnar partitions into an ArchiveSummary, one record batch at a time.
+
+    partitions is a list of (data_path, meta) pairs as ensure_columnar
+    returns them. Partitions with no rows contribute nothing.
+    """
+
+    def __init__(self, partitions, shared_cache=None):
+        self.partitions = list(partitions)
+        self.shared_cache = shared_cache
+
+    @classmethod
+    def from_catalog(cls, catalog, terms=None, campuses=None):
+        """The engine over the catalog exports of the given terms and campuses (all when None)"""
+        return cls([catalog.partition(entry) for entry in catalog.find(terms, campuses)], catalog.shared_cache)
+
+    @classmethod
+    def from_csvs(cls, csv_paths, cache_dir=CACHE_DIR, shared_cache=None):
+        return cls([ensure_columnar(path, cache_dir) for path in csv_paths], shared_cache)
+
+    def _cached(self, key, compute):
+        if self.shared_cache is None:
+            return compute()
+        return self.shared_cache.get_or_compute(key, compute)
+
+    def _scan(self, columns, where=None):
+        for data_path, meta in self.partitions:
+            yield from scan_columnar(data_path, columns, where, meta['batches'])
+
+    def _partition_summary(self, data_path, meta):
+        summary = None
+        for frame in scan_columnar(data_path, ARCHIVE_COLUMNS, batches=meta['batches']):
+            part = ArchiveSummary.from_frame(frame)
+            summary = part if summary is None else summary.merge(part)
+        return summary
+
+    def summary(self):
+        """Returns the merged summary of every partition, or None if they hold no rows"""
+        merged = None
+        for data_path, meta in self.partitions:
+            part = self._cached(content_key('archive', ARCHIVE_FORMAT_VERSION, meta['sha256']),
+                                lambda: self._partition_summary(data_path, meta))
+            if part is not None:
+                merged = part if merged is None else merged.merge(part)
+        return merged
+
+    def spearman(self, columns=None, where=None):
+        """Returns the exact Spearman matrix of columns over the rows matching where, in two passes.
+
+        As in DataFrame.corr('spearman'), each pair is ranked over the rows
+        where both columns are present. The first pass counts every distinct
+        value of each column over the rows where each other column is present
+        too, which fixes its average ranks for that pair; the second sums the
+        rank cross-products pair by pair, batch by batch. Memory grows with
+        the number of distinct values, not rows. where takes any column, as in
+        datastore.normalize_where.
+        """
+        columns = list(columns or NUMERIC_COLUMNS)
+        key = content_key('archive_spearman', ARCHIVE_FORMAT_VERSION, [meta['sha256'] for _, meta in self.partitions],
+                          columns, normalize_where(where))
+        return self._cached(key, lambda: self._spearman(columns, where))
+
+    def _spearman(self, columns, where):
+        k = len(columns)
+        # counts[i][j]: value counts of column i over the rows where column j is present
+        counts = [[pd.Series(dtype='float64') for _ in columns] for _ in columns]
+        for frame in self._scan(columns, where):
+            present = frame[columns].notna()
+            plain = [frame[col].value_counts() for col in columns]
+            for i, col in enumerate(columns):
+                for j, other in enumerate(columns):
+                    pair = plain[i] if present[other].all() else frame.loc[present[other], col].value_counts()
+                    counts[i][j] = counts[i][j].add(pair, fill_value=0)
+        ranks = [[_average_ranks(pair) for pair in row] for row in counts]
+
+        sums = {(i, j): np.zeros((4, 2, 2)) for i in range(k) for j in range(i + 1, k)}
+        for frame in self._scan(columns, where):
+            values = [frame[col].to_numpy(dtype='float64', na_value=np.nan) for col in columns]
+            for (i, j), pair_sums in sums.items():
+                pair_sums += pairwise_sums(np.column_stack([_ranks(values[i], *ranks[i][j]),
+                                                            _ranks(values[j], *ranks[j][i])]))
+
+        r = np.full((k, k), np.nan)
+        for (i, j), pair_sums in sums.items():
+            r[i, j] = r[j, i] = correlation_from_sums(pair_sums)[0, 1]
+        for i in range(k):
+            r[i, i] = 1.0 if len(ranks[i][i][0]) > 1 else np.nan
+        return pd.DataFrame(r, index=columns, columns=columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--catalog', default=None, help="catalog file (default: the dashboard's)")
+    parser.add_argument('--terms', nargs='*', help="catalog terms to include (default: all)")
+    parser.add_argument('--campuses', nargs='*', help="catalog campuses to include (default: all)")
+    parser.add_argument('--csv', action='append', help="summarize these exports instead of the catalog (repeatable)")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="columnar cache directory for --csv (default: %(default)s)")
+    parser.add_argument('--department', default='All', help="restrict the tables to a department (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.csv:
+        engine = ArchiveEngine.from_csvs(args.csv, args.cache_dir)
+    else:
+        engine = ArchiveEngine.from_catalog(DatasetCatalog(args.catalog), args.terms, args.campuses)
+    summary = engine.summary()
+    if summary is None:
+        parser.error("the selected partitions hold no students")
+    where = {'Department': args.department}
+    with pd.option_context('display.width', 120, 'display.max_columns', 20):
+        print(f"{len(engine.partitions)} partitions, {summary.students:,} students", end=os.linesep * 2)
+        print(pd.Series(summary.header(where)).to_string(), end=os.linesep * 2)
+        print(summary.grade_summary(where).to_string(index=False), end=os.linesep * 2)
+        print(summary.sleep_stats(where).to_string(index=False), end=os.linesep * 2)
+        print(pd.Series(summary.progress_summary(where)).to_string(), end=os.linesep * 2)
+        print(summary.associations().head(5).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
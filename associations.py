@@ -0,0 +1,240 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Categorical columns with more levels than this (IDs, e-mails) are not paired
+MAX_ASSOCIATION_LEVELS = 50
+
+# Below this smallest expected cell count the chi-square approximation is not trusted
+MIN_EXPECTED_COUNT = 5
+
+# Random tables drawn for the Monte-Carlo permutation test of a sparse pair
+PERMUTATIONS = 9999
+PERMUTATION_SEED = 0
+
+# Rows turned into indicator columns at a time while counting
+COUNT_CHUNK_ROWS = 1 << 18
+
+# How each p-value was obtained, in words
+TEST_METHODS = {'chi_square': "Chi-square", 'fisher_exact': "Fisher's exact",
+                'monte_carlo': "Monte-Carlo permutation", 'none': "Not testable"}
+
+
+def association_columns(df, max_levels=MAX_ASSOCIATION_LEVELS):
+    """Returns the categorical columns of df with between 2 and max_levels levels"""
+    return [col for col in df.columns
+            if isinstance(df[col].dtype, pd.CategoricalDtype) and 1 < len(df[col].cat.categories) <= max_levels]
+
+
+def _pair_statistics(counts, offsets):
+    """Chi-square, Cramér's V and mutual information of every column pair at once.
+
+    counts is the symmetric matrix of co-occurrence counts between all levels
+    of all columns (block [i, j] is the contingency table of columns i and j),
+    and offsets holds the first level of each column. Levels with no
+    students in a pair are left out of that pair's table, as pd.crosstab does.
+    Returns a dict of column x column arrays.
+    """
+    counts = counts.astype('float64')
+    column_of = np.repeat(np.arange(len(offsets)), np.diff(np.append(offsets, len(counts))))
+    # margins[a, j]: students at level a among those with a value in column j
+    margins = np.add.reduceat(counts, offsets, axis=1)
+    n = np.add.reduceat(margins, offsets, axis=0)
+    row_margins = margins[:, column_of]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        expected = row_margins * row_margins.T / n[np.ix_(column_of, column_of)]
+    present = expected > 0
+    levels = np.add.reduceat((margins > 0).astype(np.int64), offsets, axis=0)
+    dof = (levels - 1) * (levels.T - 1)
+
+    def per_pair(values):
+        return np.add.reduceat(np.add.reduceat(values, offsets, axis=0), offsets, axis=1)
+
+    deviation = np.abs(counts - expected)
+    # Yates' continuity correction on 2x2 tables, as chi2_contingency applies by default
+    corrected = np.where(dof[np.ix_(column_of, column_of)] == 1, np.maximum(deviation - 0.5, 0), deviation)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        chi2_raw = per_pair(np.where(present, deviation ** 2 / expected, 0.0))
+        chi2 = per_pair(np.where(present, corrected ** 2 / expected, 0.0))
+        mutual_info = per_pair(np.where(counts > 0, counts * np.log(counts / expected), 0.0)) / n / np.log(2)
+        smaller = np.minimum(levels, levels.T) - 1
+        cramers_v = np.sqrt(chi2_raw / (n * smaller))
+    cramers_v[smaller < 1] = np.nan
+    min_expected = np.minimum.reduceat(np.minimum.reduceat(np.where(present, expected, np.inf),
+                                                           offsets, axis=0), offsets, axis=1)
+    return {'n': n.astype(np.int64), 'dof': dof, 'chi2': chi2, 'chi2_raw': chi2_raw,
+            'cramers_v': cramers_v, 'mutual_info': mutual_info, 'min_expected': min_expected}
+
+
+def _pearson_chi2(tables):
+    """Uncorrected chi-square statistic of each table in a (..., rows, cols) stack"""
+    n = tables.sum(axis=(-2, -1), keepdims=True)
+    expected = tables.sum(axis=-1, keepdims=True) * tables.sum(axis=-2, keepdims=True) / n
+    return ((tables - expected) ** 2 / expected).sum(axis=(-2, -1))
+
+
+def exact_p_value(table, permutations=PERMUTATIONS, seed=PERMUTATION_SEED):
+    """Returns the p-value of a sparse table from an exact or permutation test, and the method used.
+
+    2x2 tables get Fisher's exact test. Larger ones are compared against
+    random tables with the same margins, which is what permuting one
+    column's values across students produces.
+    """
+    from scipy.stats import fisher_exact, random_table
+
+    table = np.asarray(table, dtype=np.int64)
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+    if table.shape == (2, 2):
+        return float(fisher_exact(table).pvalue), 'fisher_exact'
+    samples = random_table(table.sum(axis=1), table.sum(axis=0), seed=seed).rvs(permutations)
+    observed = _pearson_chi2(table.astype('float64'))
+    # Tolerance so tables tied with the observed one count as at least as extreme
+    extreme = np.count_nonzero(_pearson_chi2(samples.astype('float64')) >= observed * (1 - 1e-12))
+    return float((extreme + 1) / (permutations + 1)), 'monte_carlo'
+
+
+def contingency_statistics(table):
+    """Returns chi2, p, dof, Cramér's V, mutual information, n and method for one contingency table"""
+    table = np.asarray(table, dtype=np.int64)
+    r, c = table.shape
+    counts = np.zeros((r + c, r + c), dtype=np.int64)
+    counts[:r, r:] = table
+    counts[r:, :r] = table.T
+    stats = _pair_statistics(counts, np.array([0, r]))
+    return _result(stats, 0, 1, lambda: table)
+
+
+def _result(stats, i, j, table):
+    dof = int(stats['dof'][i, j])
+    result = {'chi2': float(stats['chi2'][i, j]), 'dof': dof, 'cramers_v': float(stats['cramers_v'][i, j]),
+              'mutual_info': float(stats['mutual_info'][i, j]), 'students': int(stats['n'][i, j])}
+    if dof < 1:
+        # One factor takes a single value among these students: nothing to test
+        result.update(p=1.0, method='none')
+    elif stats['min_expected'][i, j] < MIN_EXPECTED_COUNT:
+        p, method = exact_p_value(table())
+        result.update(p=p, method=method)
+    else:
+        from scipy.special import chdtrc
+        result.update(p=float(chdtrc(dof, stats['chi2'][i, j])), method='chi_square')
+    return result
+
+
+class AssociationService:
+    """Association statistics between every pair of categorical columns.
+
+    The contingency tables of all pairs are blocks of one level x level
+    co-occurrence matrix, counted with a single indicator-matrix product
+    over the rows (in chunks, so memory stays bounded). Chi-square, Cramér's
+    V and mutual information of every pair then come from that matrix in a
+    handful of array operations. Pairs whose expected counts are too small
+    for the chi-square approximation get an exact or Monte-Carlo p-value,
+    computed on first use and kept for the dataset version. New or corrected
+    rows are folded in through apply_delta.
+    """
+
+    def __init__(self, df, columns=None):
+        self.columns = list(columns) if columns is not None else association_columns(df)
+        self._count(df)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock'], state['_stats'], state['_results']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset_results()
+
+    def _reset_results(self):
+        self._lock = threading.Lock()
+        self._stats = None
+        self._results = {}
+
+    def _count(self, df):
+        self.levels = {col: list(df[col].cat.categories) for col in self.columns}
+        sizes = [len(self.levels[col]) for col in self.columns]
+        self.offsets = np.cumsum([0] + sizes[:-1]).astype(np.int64)
+        self.counts = self._cooccurrence(df)
+        self._reset_results()
+
+    def _codes(self, df):
+        """Returns each row's indicator column per association column (-1 when missing), or None for an unknown level"""
+        codes = np.empty((len(df), len(self.columns)), dtype=np.int64)
+        for k, col in enumerate(self.columns):
+            column_codes = pd.Categorical(df[col], categories=self.levels[col]).codes.astype(np.int64)
+            if ((column_codes < 0) & df[col].notna().to_numpy()).any():
+                return None
+            codes[:, k] = np.where(column_codes >= 0, column_codes + self.offsets[k], -1)
+        return codes
+
+    def _cooccurrence(self, df):
+        size = int(self.offsets[-1] + len(self.levels[self.columns[-1]])) if self.columns else 0
+        counts = np.zeros((size, size), dtype=np.int64)
+        codes = self._codes(df)
+        for start in range(0, len(df), COUNT_CHUNK_ROWS):
+            chunk = codes[start:start + COUNT_CHUNK_ROWS]
+            indicators = np.zeros((len(chunk), size), dtype=np.float32)
+            rows, cols = np.nonzero(chunk >= 0)
+            indicators[rows, chunk[rows, cols]] = 1
+            # float32 sums are exact below 2**24, far above the chunk size
+            counts += (indicators.T @ indicators).astype(np.int64)
+        return counts
+
+    def apply_delta(self, frame, removed_rows=None, added_rows=None):
+        """Subtracts the old and adds the new rows' counts; frame is the updated dataset.
+
+        A delta that introduces a new level changes the matrix layout, so the
+        counts are then rebuilt from frame. Cached results belong to the old
+        version and are dropped.
+        """
+        changes = [(rows, sign) for rows, sign in ((added_rows, 1), (removed_rows, -1))
+                   if rows is not None and len(rows)]
+        if any(self._codes(rows) is None for rows, _ in changes):
+            self._count(frame)
+            return
+        counts = self.counts.copy()
+        for rows, sign in changes:
+            counts += sign * self._cooccurrence(rows)
+        self.counts = counts
+        self._reset_results()
+
+    def _statistics(self):
+        with self._lock:
+            if self._stats is None:
+                self._stats = _pair_statistics(self.counts, self.offsets)
+            return self._stats
+
+    def _index(self, col):
+        if col not in self.columns:
+            raise KeyError(f"No association statistics for '{col}'")
+        return self.columns.index(col)
+
+    def crosstab(self, row, col):
+        """Returns the row x col contingency table, without levels that have no students"""
+        i, j = self._index(row), self._index(col)
+        block = self.counts[self.offsets[i]:self.offsets[i] + len(self.levels[row]),
+                            self.offsets[j]:self.offsets[j] + len(self.levels[col])]
+        table = pd.DataFrame(block, index=pd.Index(self.levels[row], name=row),
+                             columns=pd.Index(self.levels[col], name=col))
+        return table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0]
+
+    def pair(self, a, b):
+        """Returns chi2, p, dof, Cramér's V, mutual information (bits), students and the test method of a pair"""
+        key = tuple(sorted((self._index(a), self._index(b))))
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+        result = _result(self._statistics(), *key, table=lambda: self.crosstab(a, b).to_numpy())
+        with self._lock:
+            self._results[key] = result
+        return result
+
+    def ranking(self):
+        """Returns every column pair with its statistics, strongest association (Cramér's V) first"""
+        rows = [{'factor_a': a, 'factor_b': b, **self.pair(a, b)}
+                for k, a in enumerate(self.columns) for b in self.columns[k + 1:]]
+        table = pd.DataFrame(rows, columns=['factor_a', 'factor_b', 'cramers_v', 'mutual_info', 'chi2', 'dof',
+                                            'p', 'method', 'students'])
+        return table.sort_values('cramers_v', ascending=False, na_position='last').reset_index(drop=True)
@@ -0,0 +1,280 @@
+"""Writes static reports for every Department x Gender x Family_Income_Level combination.
+
+Each combination gets the grade distribution, sleep and stress statistics,
+correlation matrix and progress metrics the dashboard shows, built by the same
+chart and table functions without Streamlit. Combinations are fanned out over
+a process pool whose workers load the dataset once from the columnar and
+shared caches:
+
+    python batch_report.py --out reports --formats html,csv,png --workers 8
+
+With --archive the reports cover every cataloged export (or the selected
+terms and campuses) instead, with tables only. They are merged from
+per-partition aggregates streamed off disk, so the archive never has to fit
+in memory:
+
+    python batch_report.py --archive --terms 2023-Fall,2024-Fall --out archive_reports
+"""
+import argparse
+import importlib.util
+import itertools
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from analytics import (correlation_matrix, grade_summary_table, progress_frame, progress_summary,
+                       sleep_stats_table, stress_trend)
+from archive import ArchiveEngine
+from catalog import DatasetCatalog
+from charts import CORRELATION_VARIABLES, PERFORMANCE_METRICS, SLEEP_DISPLAYS, PROGRESS_VIEWS, build_chart
+from dataset import DELTA_DIR, open_snapshot
+from datastore import DATA_PATH, CACHE_DIR
+from regression import regression_table
+from shared_cache import open_cache
+
+REPORT_DIMENSIONS = ['Department', 'Gender', 'Family_Income_Level']
+REPORT_FORMATS = ['html', 'csv', 'png']
+
+# Per-worker state, set up once by _init_worker
+_snapshot = None
+_options = None
+
+
+def report_combinations(snapshot, dimensions=REPORT_DIMENSIONS):
+    """Yields a filter dict for every combination of dimension values that has students"""
+    cube = snapshot.cube
+    for values in itertools.product(*(snapshot.engine.options(dim) for dim in dimensions)):
+        where = dict(zip(dimensions, values))
+        if cube.total(where) > 0:
+            yield where
+
+
+def report_name(where):
+    return '__'.join(re.sub(r'[^A-Za-z0-9]+', '-', str(value)).strip('-') for value in where.values())
+
+
+def report_content(data, where=None):
+    """Returns the (figures, tables) of one report for the students of a snapshot matching where.
+
+    Everything is read from the snapshot's cube, sketches, correlation
+    partials and filter indexes, so the cost follows the report's size
+    rather than that of re-deriving them for the selected students.
+    """
+    where = where or {}
+    grades = set(data.engine.options('Grade'))
+    figures = {
+        'grade_distribution': build_chart(data, 'grade_distribution', filters=where, view_type="Count"),
+        'sleep_distribution': build_chart(data, 'sleep_analysis', sleep_display=SLEEP_DISPLAYS[0], grades=grades,
+                                          where=where),
+        'stress_heatmap': build_chart(data, 'stress_impact', visualization_type="Heatmap",
+                                      metric=None, rendering=None, where=where),
+        'correlation': build_chart(data, 'correlation', variables=CORRELATION_VARIABLES, method='pearson',
+                                   show_values=True, department='All', where=where),
+        'improvement': build_chart(data, 'progress', department='All', view_type=PROGRESS_VIEWS[0],
+                                   rendering=None, where=where),
+    }
+    progress_df = progress_frame(data, 'All', where)
+    tables = {
+        'grade_distribution': grade_summary_table(data.cube, where),
+        'sleep_by_grade': sleep_stats_table(data, filters=where),
+        'stress_trends': regression_table({metric: stress_trend(data, metric, where)
+                                           for metric in PERFORMANCE_METRICS}).rename_axis('Metric').reset_index(),
+        'correlation': correlation_matrix(data, CORRELATION_VARIABLES, 'pearson', filters=where)
+                       .rename_axis('Variable').reset_index(),
+        'progress': pd.DataFrame([progress_summary(progress_df)]),
+    }
+    return figures, tables
+
+
+def _report_html(title, figures, tables, include_plotlyjs):
+    parts = [f"<html><head><meta charset='utf-8'><title>{title}</title></head><body><h1>{title}</h1>"]
+    for i, fig in enumerate(figures.values()):
+        parts.append(fig.to_html(full_html=False, include_plotlyjs=include_plotlyjs if i == 0 else False))
+    for name, table in tables.items():
+        parts.append(f"<h2>{name.replace('_', ' ').capitalize()}</h2>")
+        parts.append(table.to_html(index=False, float_format=lambda v: f"{v:.3f}", na_rep='N/A'))
+    parts.append("</body></html>")
+    return '\n'.join(parts)
+
+
+def write_report(snapshot, where, out_dir, formats=('html', 'csv'), include_plotlyjs='cdn'):
+    """Builds and writes one combination's report; returns its row counts and stage timings"""
+    timings = {}
+    start = time.perf_counter()
+    figures, tables = report_content(snapshot, where)
+    title = ' / '.join(str(value) for value in where.values())
+    for fig in figures.values():
+        fig.update_layout(title_text=f"{title}: {fig.layout.title.text}")
+    timings['compute'] = time.perf_counter() - start
+
+    report_dir = os.path.join(out_dir, report_name(where))
+    os.makedirs(report_dir, exist_ok=True)
+    if 'csv' in formats:
+        start = time.perf_counter()
+        for name, table in tables.items():
+            table.to_csv(os.path.join(report_dir, f"{name}.csv"), index=False)
+        timings['csv'] = time.perf_counter() - start
+    if 'html' in formats:
+        start = time.perf_counter()
+        with open(os.path.join(report_dir, 'report.html'), 'w', encoding='utf-8') as f:
+            f.write(_report_html(title, figures, tables, include_plotlyjs))
+        timings['html'] = time.perf_counter() - start
+    if 'png' in formats:
+        start = time.perf_counter()
+        for name, fig in figures.items():
+            fig.write_image(os.path.join(report_dir, f"{name}.png"), width=1000, height=fig.layout.height or 500)
+        timings['png'] = time.perf_counter() - start
+
+    return {**where, 'students': snapshot.cube.total(where), 'directory': report_dir, 'timings': timings}
+
+
+def _init_worker(csv_path, cache_dir, delta_dir, cache_spec, options):
+    global _snapshot, _options
+    # The columnar cache and the derived structures are already stored, so this only reads
+    _snapshot = open_snapshot(csv_path, cache_dir, delta_dir, open_cache(cache_spec))
+    _options = options
+
+
+def _write(where):
+    return _snapshot.version, write_report(_snapshot, where, **_options)
+
+
+def batch_report(out_dir, csv_path=DATA_PATH, cache_dir=CACHE_DIR, delta_dir=DELTA_DIR, cache_spec=None,
+                 workers=None, formats=('html', 'csv'), include_plotlyjs='cdn'):
+    """Writes a report per combination into out_dir; returns a throughput summary of the run"""
+    start = time.perf_counter()
+    # Parse the CSV and derive the indexes once here rather than once per worker
+    snapshot = open_snapshot(csv_path, cache_dir, delta_dir, open_cache(cache_spec))
+    load_seconds = time.perf_counter() - start
+    combinations = list(report_combinations(snapshot))
+    os.makedirs(out_dir, exist_ok=True)
+
+    options = dict(out_dir=out_dir, formats=tuple(formats), include_plotlyjs=include_plotlyjs)
+    reports, stage_seconds = [], {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(csv_path, cache_dir, delta_dir, cache_spec, options)) as pool:
+        for version, report in pool.map(_write, combinations):
+            if version != snapshot.version:
+                raise RuntimeError("The dataset changed while writing reports; run the batch again")
+            for stage, seconds in report.pop('timings').items():
+                stage_seconds[stage] = stage_seconds.get(stage, 0.0) + seconds
+            reports.append(report)
+
+    index = pd.DataFrame(reports, columns=REPORT_DIMENSIONS + ['students', 'directory'])
+    index.to_csv(os.path.join(out_dir, 'index.csv'), index=False)
+    total_seconds = time.perf_counter() - start
+    return {
+        'version': snapshot.version,
+        'rows': len(snapshot.frame),
+        'reports': len(reports),
+        'students': int(index['students'].sum()),
+        'load_seconds': load_seconds,
+        'total_seconds': total_seconds,
+        'reports_per_second': len(reports) / total_seconds,
+        'stage_seconds': stage_seconds,
+    }
+
+
+def archive_report_tables(summary, where):
+    """Returns the tables of one report, computed from an archive summary"""
+    return {
+        'grade_distribution': summary.grade_summary(where),
+        'sleep_by_grade': summary.sleep_stats(where),
+        'stress_trends': regression_table({metric: summary.stress_trend(metric, where)
+                                           for metric in PERFORMANCE_METRICS}).rename_axis('Metric').reset_index(),
+        'correlation': summary.correlation(CORRELATION_VARIABLES, where).rename_axis('Variable').reset_index(),
+        'progress': pd.DataFrame([summary.progress_summary(where)]),
+    }
+
+
+def archive_report(out_dir, catalog_path=None, terms=None, campuses=None, cache_spec=None, formats=('html', 'csv')):
+    """Writes a table-only report per combination over the cataloged exports; returns a run summary"""
+    start = time.perf_counter()
+    catalog = DatasetCatalog(catalog_path, shared_cache=open_cache(cache_spec))
+    engine = ArchiveEngine.from_catalog(catalog, terms, campuses)
+    summary = engine.summary()
+    if summary is None:
+        raise ValueError("No cataloged exports match the selected terms and campuses")
+    load_seconds = time.perf_counter() - start
+
+    counts = summary.cube.counts(REPORT_DIMENSIONS)
+    os.makedirs(out_dir, exist_ok=True)
+    reports = []
+    for values, students in counts.items():
+        where = dict(zip(REPORT_DIMENSIONS, values))
+        tables = archive_report_tables(summary, where)
+        report_dir = os.path.join(out_dir, report_name(where))
+        os.makedirs(report_dir, exist_ok=True)
+        if 'csv' in formats:
+            for name, table in tables.items():
+                table.to_csv(os.path.join(report_dir, f"{name}.csv"), index=False)
+        if 'html' in formats:
+            title = ' / '.join(str(value) for value in where.values())
+            with open(os.path.join(report_dir, 'report.html'), 'w', encoding='utf-8') as f:
+                f.write(_report_html(title, {}, tables, include_plotlyjs=False))
+        reports.append({**where, 'students': int(students), 'directory': report_dir})
+
+    index = pd.DataFrame(reports, columns=REPORT_DIMENSIONS + ['students', 'directory'])
+    index.to_csv(os.path.join(out_dir, 'index.csv'), index=False)
+    total_seconds = time.perf_counter() - start
+    return {
+        'partitions': len(engine.partitions),
+        'rows': summary.students,
+        'reports': len(reports),
+        'students': int(index['students'].sum()),
+        'load_seconds': load_seconds,
+        'total_seconds': total_seconds,
+        'reports_per_second': len(reports) / total_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', default='reports', help="output directory (default: %(default)s)")
+    parser.add_argument('--formats', default='html,csv',
+                        help=f"comma-separated output formats among {', '.join(REPORT_FORMATS)} (default: %(default)s)")
+    parser.add_argument('--embed-plotlyjs', action='store_true',
+                        help="embed plotly.js in every HTML report so it opens offline")
+    parser.add_argument('--csv', default=DATA_PATH, help="source CSV (default: %(default)s)")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="columnar cache directory (default: %(default)s)")
+    parser.add_argument('--delta-dir', default=DELTA_DIR, help="delta CSV directory (default: %(default)s)")
+    parser.add_argument('--cache', default=None,
+                        help="shared cache backend: sqlite, sqlite:<path> or memory (default: $DASHBOARD_CACHE or sqlite)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument('--archive', action='store_true',
+                        help="report over the cataloged exports, streamed from disk (tables only)")
+    parser.add_argument('--catalog', default=None, help="catalog file for --archive (default: $DASHBOARD_CATALOG)")
+    parser.add_argument('--terms', default=None, help="comma-separated terms for --archive (default: all)")
+    parser.add_argument('--campuses', default=None, help="comma-separated campuses for --archive (default: all)")
+    args = parser.parse_args()
+
+    formats = [f.strip() for f in args.formats.split(',') if f.strip()]
+    unknown = set(formats) - set(REPORT_FORMATS)
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(sorted(unknown))}")
+    if args.archive:
+        if 'png' in formats:
+            parser.error("archive reports have no figures; use html and/or csv")
+        split = lambda text: [t.strip() for t in text.split(',') if t.strip()] if text else None
+        summary = archive_report(args.out, args.catalog, split(args.terms), split(args.campuses), args.cache, formats)
+        print(f"Wrote {summary['reports']} archive reports covering {summary['students']:,} of {summary['rows']:,} "
+              f"students from {summary['partitions']} exports to {args.out} in {summary['total_seconds']:.1f}s, "
+              f"load {summary['load_seconds']:.1f}s, {summary['reports_per_second']:.1f} reports/s")
+        return
+    if 'png' in formats and importlib.util.find_spec('kaleido') is None:
+        parser.error("PNG output needs the kaleido package (pip install kaleido)")
+
+    summary = batch_report(args.out, args.csv, args.cache_dir, args.delta_dir, args.cache, args.workers,
+                           formats, include_plotlyjs=True if args.embed_plotlyjs else 'cdn')
+    print(f"Wrote {summary['reports']} reports covering {summary['students']:,} of {summary['rows']:,} students "
+          f"(version {summary['version'][:12]}) to {args.out} in {summary['total_seconds']:.1f}s, "
+          f"load {summary['load_seconds']:.1f}s, {summary['reports_per_second']:.1f} reports/s")
+    for stage, seconds in sorted(summary['stage_seconds'].items()):
+        print(f"  {stage:<8} {seconds:7.2f}s across workers, {seconds / max(summary['reports'], 1):.3f}s per report")
+
+
+if __name__ == "__main__":
+    main()
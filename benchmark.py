@@ -0,0 +1,236 @@
+"""Benchmarks loading and every dashboard section on synthetic datasets of increasing size.
+
+For each size a synthetic CSV is generated once (and kept for later runs),
+then load, derived-structure builds, filters, group-bys, correlations,
+trendlines, the chi-square test and figure construction and serialization
+are timed per section. Results are written as JSON; with --baseline, the run
+fails when an operation got slower than the tolerance allows:
+
+    python benchmark.py --sizes 10k,100k,1M,10M --out bench.json
+    python benchmark.py --sizes 10k,100k --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import analytics
+from charts import CORRELATION_VARIABLES, build_chart, default_chart_states
+from associations import AssociationService
+from correlation import CorrelationService
+from cube import AggregateCube
+from dataset import DatasetSnapshot
+from datastore import load_dataset
+from filter_engine import FilterEngine
+from regression import RegressionStats
+from sketches import QuantileSketches
+from synthetic import fit_profile, write_synthetic_csv
+
+BENCH_DIR = os.path.join('.cache', 'bench')
+DEFAULT_SIZES = '10k,100k,1M,10M'
+DEFAULT_REPEAT = 3
+
+# What the grade view reads when loading one department through the pushdown path
+PROJECTED_COLUMNS = ['Grade', 'Department', 'Gender', 'Family_Income_Level', 'Total_Score']
+
+# A baseline operation at least this long is compared; shorter ones are timer noise
+MIN_COMPARED_SECONDS = 0.005
+
+
+def parse_size(text):
+    """Parses a row count such as 10000, 10k or 1M"""
+    text = text.strip().lower()
+    scale = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def time_call(fn, repeat=DEFAULT_REPEAT):
+    """Runs fn repeat times; returns the timings and the last result"""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - start)
+    return runs, result
+
+
+def section_operations(data):
+    """Returns (section, operation, fn) for the hot path of every dashboard section"""
+    df, engine, cube = data.frame, data.engine, data.cube
+    department = engine.options('Department')[0]
+    where = {'Department': department, 'Gender': engine.options('Gender')[0],
+             'Family_Income_Level': engine.options('Family_Income_Level')[0]}
+    study_mask = engine.mask({'Study_Hours_per_Week': (10, 25), 'Attendance (%)': (60, None)})
+    counts = analytics.demographic_counts(data, 'Family_Income_Level', 'Grade')['pairs'].unstack(fill_value=0)
+
+    def uncached_spearman():
+        # Ranks are cached per filter; time what a new filter costs
+        data.correlations._reset_rank_cache()
+        return analytics.correlation_matrix(data, CORRELATION_VARIABLES, 'spearman', department)
+
+    def uncached_associations():
+        # Statistics are cached per dataset version; time the first request after a change
+        data.associations._reset_results()
+        return analytics.strongest_associations(data)
+
+    return [
+        ('academic', 'filter', lambda: engine.mask(where)),
+        ('academic', 'groupby', lambda: analytics.grade_summary_table(cube, where)),
+        ('academic', 'groupby_raw', lambda: df[engine.mask(where)].groupby('Grade', observed=True)
+            ['Total_Score'].agg(['size', 'mean'])),
+        ('factors', 'filter', lambda: engine.mask({'Study_Hours_per_Week': (10, 25), 'Attendance (%)': (60, None)})),
+        ('factors', 'trendline', lambda: RegressionStats.from_arrays(
+            df.loc[study_mask, 'Study_Hours_per_Week'], df.loc[study_mask, 'Total_Score']).fit()),
+        ('factors', 'groupby', lambda: analytics.sleep_stats_table(data)),
+        ('factors', 'stress_correlation', lambda: analytics.stress_correlation(data, 'Total_Score')),
+        ('demographics', 'groupby', lambda: analytics.demographic_counts(data, 'Family_Income_Level', 'Grade')),
+        # Age is not a cube dimension, so this groups the raw rows
+        ('demographics', 'groupby_raw', lambda: analytics.group_counts(df, cube, ['Age', 'Grade'])),
+        ('demographics', 'chi_square', lambda: analytics.contingency_test(counts)),
+        ('demographics', 'association_ranking', uncached_associations),
+        ('correlation', 'pearson', lambda: analytics.correlation_matrix(data, CORRELATION_VARIABLES, 'pearson')),
+        ('correlation', 'pearson_department', lambda: analytics.correlation_matrix(
+            data, CORRELATION_VARIABLES, 'pearson', department)),
+        ('correlation', 'spearman_department', uncached_spearman),
+        ('progress', 'filter', lambda: analytics.progress_frame(data, department)),
+        ('progress', 'summary', lambda: analytics.progress_summary(analytics.progress_frame(data, 'All'))),
+    ]
+
+
+def figure_operations(data):
+    """Returns (section, view, state) for the first default figure of every view"""
+    sections = {'grade_distribution': 'academic', 'study_habits': 'factors', 'sleep_analysis': 'factors',
+                'stress_impact': 'factors', 'demographics': 'demographics', 'correlation': 'correlation',
+                'progress': 'progress'}
+    seen = set()
+    for view, state in default_chart_states(data):
+        key = (view, state.get('sleep_display'), state.get('visualization_type'), state.get('view_type'))
+        if key not in seen:
+            seen.add(key)
+            yield sections[view], view, state
+
+
+def benchmark_size(csv_path, n_rows, repeat=DEFAULT_REPEAT, log=print):
+    """Times every stage on one dataset; returns a list of result records"""
+    import plotly.io as pio
+
+    results = []
+
+    def record(section, operation, runs, **extra):
+        results.append({'rows': n_rows, 'section': section, 'operation': operation,
+                        'seconds': statistics.median(runs), 'min_seconds': min(runs), 'runs': runs, **extra})
+        log(f"  {n_rows:>10,} {section:<13} {operation:<34} {statistics.median(runs) * 1000:10.2f} ms")
+
+    # A cold load parses the CSV into the columnar cache; later loads map it
+    cache_dir = os.path.join(os.path.dirname(csv_path), f"cache_{n_rows}")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    start = time.perf_counter()
+    frame = load_dataset(csv_path, cache_dir)
+    record('load', 'csv_to_columnar', [time.perf_counter() - start])
+    runs, frame = time_call(lambda: load_dataset(csv_path, cache_dir), repeat)
+    record('load', 'columnar_cache', runs, bytes_per_row=frame.memory_usage(deep=True).sum() / len(frame))
+    where = {'Department': frame['Department'].cat.categories[0]}
+    runs, projected = time_call(lambda: load_dataset(csv_path, cache_dir, columns=PROJECTED_COLUMNS, where=where),
+                                repeat)
+    record('load', 'columnar_projection', runs, rows_read=len(projected),
+           bytes=int(projected.memory_usage(deep=True).sum()))
+
+    runs, engine = time_call(lambda: FilterEngine(frame), 1)
+    record('load', 'filter_index', runs)
+    runs, cube = time_call(lambda: AggregateCube(frame), 1)
+    record('load', 'aggregate_cube', runs)
+    runs, correlations = time_call(lambda: CorrelationService(frame), 1)
+    record('load', 'correlation_partials', runs)
+    runs, associations = time_call(lambda: AssociationService(frame), 1)
+    record('load', 'association_counts', runs)
+    runs, sketches = time_call(lambda: QuantileSketches(frame), 1)
+    record('load', 'quantile_sketches', runs)
+    data = DatasetSnapshot(frame, frame.attrs['version'], engine, cube, correlations, associations, sketches)
+
+    for section, operation, fn in section_operations(data):
+        record(section, operation, time_call(fn, repeat)[0])
+
+    for section, view, state in figure_operations(data):
+        label = '/'.join([view] + [str(state[k]) for k in ('sleep_display', 'visualization_type', 'view_type', 'plot_type')
+                                   if state.get(k)])
+        runs, fig = time_call(lambda: build_chart(data, view, **state), repeat)
+        record(section, f"figure:{label}", runs)
+        runs, payload = time_call(lambda: pio.to_json(fig), repeat)
+        record(section, f"serialize:{label}", runs, json_bytes=len(payload))
+    return results
+
+
+def run_benchmarks(sizes, bench_dir=BENCH_DIR, seed=0, repeat=DEFAULT_REPEAT, log=print):
+    profile = None
+    results = []
+    for n_rows in sizes:
+        csv_path = os.path.join(bench_dir, f"students_{n_rows}_{seed}.csv")
+        if not os.path.exists(csv_path):
+            profile = profile or fit_profile()
+            start = time.perf_counter()
+            write_synthetic_csv(csv_path, n_rows, seed, profile)
+            log(f"Generated {n_rows:,} students in {time.perf_counter() - start:.1f}s")
+        results.extend(benchmark_size(csv_path, n_rows, repeat, log))
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'environment': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+        },
+        'seed': seed,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Returns the operations whose median time exceeds the baseline's by more than tolerance"""
+    previous = {(r['rows'], r['section'], r['operation']): r['seconds'] for r in baseline['results']}
+    regressions = []
+    for r in report['results']:
+        before = previous.get((r['rows'], r['section'], r['operation']))
+        if before is not None and before >= MIN_COMPARED_SECONDS and r['seconds'] > before * tolerance:
+            regressions.append({**r, 'baseline_seconds': before, 'ratio': r['seconds'] / before})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="comma-separated row counts (default: %(default)s)")
+    parser.add_argument('--out', default='benchmark_results.json', help="JSON results file (default: %(default)s)")
+    parser.add_argument('--bench-dir', default=BENCH_DIR, help="where generated datasets are kept (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed of the generated data (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="runs per operation (default: %(default)s)")
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help="allowed slowdown factor against the baseline (default: %(default)s)")
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+    report = run_benchmarks(sizes, args.bench_dir, args.seed, args.repeat)
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} timings to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['rows']:,} {r['section']}/{r['operation']}: "
+                  f"{r['baseline_seconds'] * 1000:.2f} ms -> {r['seconds'] * 1000:.2f} ms ({r['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
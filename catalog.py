@@ -0,0 +1,191 @@
+"""A catalog of student exports, one CSV per term and campus, loaded lazily.
+
+Exports are registered with their term and campus in a small JSON file. A
+file is only parsed into its own columnar cache the first time a query or
+the dashboard needs it, and cross-term queries read just the partitions they
+select, the columns they group, filter and measure, and the record batches
+that can match their filter:
+
+    python catalog.py add exports/north_2024_fall.csv --term 2024-Fall --campus North
+    python catalog.py list
+    python catalog.py ingest          # build every columnar cache ahead of time
+    python catalog.py remove --term 2024-Fall --campus North
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+import pandas as pd
+
+from datastore import CACHE_DIR, ensure_columnar, read_columnar
+from shared_cache import content_key
+
+CATALOG_PATH = 'catalog.json'
+# Overrides the catalog file the dashboard and the CLI use
+CATALOG_ENV = 'DASHBOARD_CATALOG'
+
+# Each export gets its own cache directory, so files with the same name do not collide
+CATALOG_CACHE_DIR = os.path.join(CACHE_DIR, 'catalog')
+
+PARTITION_KEYS = ['Term', 'Campus']
+
+
+def _slug(text):
+    return re.sub(r'[^A-Za-z0-9]+', '-', str(text)).strip('-')
+
+
+def entry_label(entry):
+    return f"{entry['term']} · {entry['campus']}"
+
+
+class DatasetCatalog:
+    """Registered exports with their term and campus, each with a lazily built columnar cache.
+
+    Entries are kept in registration order, which is the order terms are
+    compared in. With a shared_cache backend, per-partition query results are
+    stored under the partition's content hash, so adding a term only
+    computes that term.
+    """
+
+    def __init__(self, path=None, cache_dir=CATALOG_CACHE_DIR, shared_cache=None):
+        self.path = path or os.environ.get(CATALOG_ENV, CATALOG_PATH)
+        self.cache_dir = cache_dir
+        self.shared_cache = shared_cache
+        self.entries = self._read()
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)['entries']
+        except FileNotFoundError:
+            return []
+
+    def _write(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'entries': self.entries}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def register(self, csv_path, term, campus):
+        """Adds an export, replacing any earlier one for the same term and campus"""
+        if not os.path.exists(csv_path):
+            raise FileNotFoundError(csv_path)
+        entry = {'term': str(term), 'campus': str(campus), 'path': csv_path}
+        self.entries = [e for e in self.entries if (e['term'], e['campus']) != (entry['term'], entry['campus'])]
+        self.entries.append(entry)
+        self._write()
+        return entry
+
+    def remove(self, term, campus):
+        """Drops an export from the catalog; returns whether it was registered"""
+        kept = [e for e in self.entries if (e['term'], e['campus']) != (str(term), str(campus))]
+        removed = len(kept) != len(self.entries)
+        self.entries = kept
+        self._write()
+        return removed
+
+    def find(self, terms=None, campuses=None):
+        """Returns the entries of the given terms and campuses (all when None)"""
+        return [e for e in self.entries
+                if (terms is None or e['term'] in terms) and (campuses is None or e['campus'] in campuses)]
+
+    def get(self, term, campus):
+        matches = self.find([term], [campus])
+        if not matches:
+            raise KeyError(f"No export registered for {term} / {campus}")
+        return matches[0]
+
+    def terms(self):
+        return list(dict.fromkeys(e['term'] for e in self.entries))
+
+    def campuses(self):
+        return list(dict.fromkeys(e['campus'] for e in self.entries))
+
+    def entry_cache_dir(self, entry):
+        return os.path.join(self.cache_dir, _slug(entry['term']), _slug(entry['campus']))
+
+    def partition(self, entry, progress=None):
+        """Builds the entry's columnar cache if needed; returns its data path and metadata"""
+        return ensure_columnar(entry['path'], self.entry_cache_dir(entry), progress)
+
+    def read(self, entry, columns, where=None):
+        """Returns only columns of an export's rows matching where; other columns are never read"""
+        data_path, meta = self.partition(entry)
+        return read_columnar(data_path, list(columns), where, meta['batches'])
+
+    def scan(self, columns, where=None, terms=None, campuses=None):
+        """Yields (entry, frame) per selected partition, as read() returns it"""
+        for entry in self.find(terms, campuses):
+            yield entry, self.read(entry, columns, where)
+
+    def _partition_aggregate(self, entry, by, measure, where):
+        df = self.read(entry, list(by) + ([measure] if measure else []), where)
+        grouped = df.groupby(list(by), observed=True)
+        result = grouped.size().rename('Count').to_frame()
+        if measure:
+            result['Measured'] = grouped[measure].count()
+            result['Mean'] = grouped[measure].mean().astype('float64')
+        return result.reset_index()
+
+    def aggregate(self, by, measure=None, where=None, terms=None, campuses=None):
+        """Returns student counts per Term, Campus and the by columns.
+
+        With a measure, also its non-missing count ('Measured') and 'Mean'.
+        where maps a column to a value, a list of values, a (low, high)
+        range or 'All'/None, as in datastore.normalize_where.
+        """
+        parts = []
+        for entry in self.find(terms, campuses):
+            def compute(entry=entry):
+                return self._partition_aggregate(entry, by, measure, where)
+
+            if self.shared_cache is None:
+                part = compute()
+            else:
+                # Keyed on the export's content, so a re-registered or changed file is recomputed
+                _, meta = self.partition(entry)
+                part = self.shared_cache.get_or_compute(
+                    content_key('catalog', meta['sha256'], list(by), measure, where or {}), compute)
+            parts.append(part.assign(Term=entry['term'], Campus=entry['campus']))
+        columns = PARTITION_KEYS + list(by) + ['Count'] + (['Measured', 'Mean'] if measure else [])
+        if not parts:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(parts, ignore_index=True)[columns]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--catalog', default=None, help=f"catalog file (default: ${CATALOG_ENV} or {CATALOG_PATH})")
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help="register an export")
+    add.add_argument('csv', help="CSV export")
+    add.add_argument('--term', required=True)
+    add.add_argument('--campus', required=True)
+    remove = commands.add_parser('remove', help="unregister an export")
+    remove.add_argument('--term', required=True)
+    remove.add_argument('--campus', required=True)
+    commands.add_parser('list', help="show the registered exports")
+    commands.add_parser('ingest', help="build the columnar cache of every export")
+    args = parser.parse_args()
+
+    catalog = DatasetCatalog(args.catalog)
+    if args.command == 'add':
+        entry = catalog.register(args.csv, args.term, args.campus)
+        print(f"Registered {entry_label(entry)}: {entry['path']}")
+    elif args.command == 'remove':
+        if not catalog.remove(args.term, args.campus):
+            parser.error(f"no export registered for {args.term} / {args.campus}")
+    elif args.command == 'list':
+        for entry in catalog.entries:
+            print(f"{entry['term']:<16} {entry['campus']:<16} {entry['path']}")
+    else:
+        for entry in catalog.entries:
+            start = time.perf_counter()
+            _, meta = catalog.partition(entry)
+            print(f"{entry_label(entry)}: {meta['rows']:,} rows in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
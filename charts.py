@@ -0,0 +1,500 @@
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+from analytics import (correlation_matrix, demographic_counts, demographic_factors, grade_counts_table,
+                       progress_frame, select_rows, stress_trend)
+from regression import RegressionStats
+from rendering import (MAX_RENDERED_POINTS, SAMPLED, HISTOGRAM_BINS, scatter_figure, box_figure, histogram_figure,
+                       heatmap_figure)
+
+# Figure builders for the dashboard views. They take a DatasetSnapshot and the
+# widget state that determines the figure, plot what analytics.py computes and
+# never touch Streamlit, so the views, the warm-up worker and batch reports all
+# build identical figures. Builders that take a `where` filter plot only the
+# matching students from the snapshot's indexes, without subsetting it.
+
+# Widget defaults the warm-up precomputes; the views use the same values
+SLEEP_DISPLAYS = ["Sleep Hours Distribution", "Sleep vs Performance"]
+STRESS_VISUALIZATIONS = ["Heatmap", "Scatter Plot"]
+PERFORMANCE_METRICS = ["Total_Score", "Final_Score", "Midterm_Score", "Assignments_Avg"]
+SECONDARY_FACTORS = ["Grade", "Department", "None"]
+DEMOGRAPHIC_PLOT_TYPES = ["Bar Chart", "Pie Chart", "Grouped Bar Chart"]
+CORRELATION_VARIABLES = ['Total_Score', 'Midterm_Score', 'Final_Score', 'Assignments_Avg',
+                         'Quizzes_Avg', 'Participation_Score', 'Projects_Score',
+                         'Study_Hours_per_Week', 'Stress_Level (1-10)', 'Sleep_Hours_per_Night',
+                         'Attendance (%)']
+DEFAULT_CORRELATION_VARIABLES = ['Total_Score', 'Midterm_Score', 'Final_Score', 'Study_Hours_per_Week']
+CORRELATION_METHODS = ["pearson", "spearman"]
+PROGRESS_VIEWS = ["Improvement Distribution", "Midterm vs Final Comparison"]
+
+LAYOUT = dict(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font=dict(size=12))
+
+
+def grade_distribution_figure(data, filters, view_type):
+    selected_dept = filters.get('Department', 'All')
+    grade_counts = grade_counts_table(data.cube, filters)
+
+    if view_type == "Percentage":
+        total = grade_counts['Count'].sum()
+        grade_counts['Value'] = (grade_counts['Count'] / total) * 100
+        y_title = 'Percentage of Students (%)'
+        suffix = '%'
+    else:
+        grade_counts['Value'] = grade_counts['Count']
+        y_title = 'Number of Students'
+        suffix = ''
+
+    fig = px.bar(
+        grade_counts,
+        x='Grade',
+        y='Value',
+        color='Grade',
+        text=grade_counts['Value'].round(1).astype(str) + suffix,
+        color_discrete_sequence=px.colors.qualitative.Bold,
+        title=f"Grade Distribution {f'for {selected_dept}' if selected_dept != 'All' else ''}"
+    )
+
+    fig.update_layout(
+        **LAYOUT,
+        title_font_size=18,
+        height=500,
+        yaxis_title=y_title,
+        xaxis_title='Grade',
+        showlegend=False
+    )
+    return fig
+
+
+def study_habits_figure(data, study_range, attendance_threshold, show_trend, max_points, large_mode):
+    # Filter data based on selections
+    study_mask = data.engine.mask({
+        'Study_Hours_per_Week': study_range,
+        'Attendance (%)': (attendance_threshold, None),
+    })
+    study_df = select_rows(data.frame, study_mask, ['Student_ID', 'Study_Hours_per_Week', 'Total_Score',
+                                                    'Grade', 'Department', 'Attendance (%)', 'Gender'])
+
+    # Create scatter plot of study hours vs. scores
+    fig = scatter_figure(
+        study_df,
+        x='Study_Hours_per_Week',
+        y='Total_Score',
+        max_points=max_points,
+        mode=large_mode,
+        color='Grade',
+        hover_name='Student_ID',
+        hover_data=['Department', 'Attendance (%)', 'Gender'],
+        color_discrete_sequence=px.colors.qualitative.Bold,
+        opacity=0.7,
+        title=f"Study Hours vs. Performance (N={len(study_df)})"
+    )
+
+    if show_trend:
+        # One NaN-aware pass gives both the trendline and the correlation
+        trend = RegressionStats.from_arrays(study_df['Study_Hours_per_Week'], study_df['Total_Score'])
+        x0, x1 = study_df['Study_Hours_per_Week'].min(), study_df['Study_Hours_per_Week'].max()
+        y0, y1 = trend.predict([x0, x1])
+        fig.update_layout(
+            shapes=[{
+                'type': 'line',
+                'x0': x0,
+                'y0': y0,
+                'x1': x1,
+                'y1': y1,
+                'line': {
+                    'color': 'rgba(255,255,255,0.5)',
+                    'width': 2,
+                    'dash': 'dash',
+                }
+            }]
+        )
+
+        corr = round(trend.fit()['r'], 3)
+        fig.add_annotation(
+            x=study_df['Study_Hours_per_Week'].max() * 0.9,
+            y=study_df['Total_Score'].max() * 0.9,
+            text=f"Correlation: {corr}",
+            showarrow=False,
+            font=dict(color="white", size=14),
+            bgcolor="rgba(0,0,0,0.5)",
+            bordercolor="white",
+            borderwidth=1,
+            borderpad=4
+        )
+
+    fig.update_layout(
+        **LAYOUT,
+        height=500,
+        xaxis_title="Weekly Study Hours",
+        yaxis_title="Total Score"
+    )
+    return fig
+
+
+def sleep_analysis_figure(data, sleep_display, grades, where=None):
+    where = {**(where or {}), 'Grade': list(grades)}
+    if sleep_display == "Sleep Hours Distribution":
+        # Create sleep distribution by grade from the pre-binned cube
+        sleep_grade = data.cube.counts(['Sleep_Group', 'Grade'], where=where).reset_index()
+
+        fig = px.bar(
+            sleep_grade,
+            x='Sleep_Group',
+            y='Count',
+            color='Grade',
+            title="Sleep Hours Distribution by Grade",
+            barmode='stack',
+            text_auto=True,
+            color_discrete_sequence=px.colors.qualitative.Bold
+        )
+
+    else:  # Sleep vs Performance
+        # Boxes and outliers come from the per-grade sketches rather than the raw rows
+        fig = box_figure(
+            data.sketches.summary('Sleep_Hours_per_Night', ['Grade'], where),
+            x='Grade',
+            y='Sleep_Hours_per_Night',
+            outliers=data.sketches.outliers('Sleep_Hours_per_Night', ['Grade'], where),
+            title="Sleep Hours vs Academic Performance"
+        )
+
+    fig.update_layout(**LAYOUT, height=500)
+    return fig
+
+
+def stress_impact_figure(data, visualization_type, metric, rendering, where=None):
+    if visualization_type == "Heatmap":
+        # Create stress level heatmap
+        stress_pivot = data.cube.crosstab('Stress_Level (1-10)', 'Grade', where)
+
+        fig = heatmap_figure(
+            stress_pivot,
+            colorscale='RdYlBu_r',
+            text_format='%d',
+            hide_zeros=True,
+            color_label="Students",
+            x_label="Grade",
+            y_label="Stress Level (1-10)",
+            title="😰 Student Stress vs Academic Performance"
+        )
+    else:
+        max_points, large_mode = rendering
+        df = data.frame if not where else select_rows(data.frame, data.engine.mask(where), list(data.frame.columns))
+        # Create scatter plot of stress vs performance
+        fig = scatter_figure(
+            df,
+            x='Stress_Level (1-10)',
+            y=metric,
+            max_points=max_points,
+            mode=large_mode,
+            color='Grade',
+            title=f"Stress Level vs {metric.replace('_', ' ')}",
+            color_discrete_sequence=px.colors.qualitative.Bold
+        )
+
+        fig.update_traces(marker=dict(size=12, opacity=0.7), selector=dict(mode='markers'))
+
+        # Add trendline with its 95% confidence band, skipping rows with missing values
+        trend = stress_trend(data, metric, where)
+        if trend.n > 2:
+            x_range = np.linspace(df['Stress_Level (1-10)'].min(), df['Stress_Level (1-10)'].max(), 100)
+            y_range, y_lower, y_upper = trend.confidence_band(x_range)
+
+            fig.add_trace(go.Scatter(
+                x=np.concatenate([x_range, x_range[::-1]]),
+                y=np.concatenate([y_upper, y_lower[::-1]]),
+                fill='toself',
+                fillcolor='rgba(255,255,255,0.15)',
+                line=dict(width=0),
+                hoverinfo='skip',
+                name='95% Confidence'
+            ))
+            fig.add_trace(go.Scatter(
+                x=x_range,
+                y=y_range,
+                mode='lines',
+                name='Trend Line',
+                line=dict(color='rgba(255,255,255,0.8)', width=2, dash='dash')
+            ))
+
+    fig.update_layout(**LAYOUT, height=500)
+    return fig
+
+
+def demographics_figure(data, primary_factor, secondary_factor, plot_type, normalize):
+    counts = demographic_counts(data, primary_factor, secondary_factor)
+    primary_counts, pair_counts = counts['primary'], counts['pairs']
+
+    # Create the visualization based on selections
+    if plot_type == "Bar Chart":
+        if secondary_factor == "None" or normalize:
+            if normalize and secondary_factor != "None":
+                # Create percentage stacked bar chart
+                temp_df = (pair_counts / pair_counts.groupby(level=0).transform('sum')).mul(100).reset_index(name='Percentage')
+                fig = px.bar(
+                    temp_df,
+                    x=primary_factor,
+                    y='Percentage',
+                    color=secondary_factor,
+                    text=temp_df['Percentage'].round(1).astype(str) + '%',
+                    title=f"Distribution by {primary_factor.replace('_', ' ')}",
+                    color_discrete_sequence=px.colors.qualitative.Bold
+                )
+                fig.update_traces(textposition='inside')
+                fig.update_layout(yaxis_title='Percentage (%)')
+            else:
+                # Create simple count bar chart
+                counts = primary_counts.reset_index()
+                counts.columns = [primary_factor, 'Count']
+                fig = px.bar(
+                    counts,
+                    x=primary_factor,
+                    y='Count',
+                    text='Count',
+                    title=f"Distribution by {primary_factor.replace('_', ' ')}",
+                    color=primary_factor,
+                    color_discrete_sequence=px.colors.qualitative.Bold
+                )
+                fig.update_layout(showlegend=False)
+        else:
+            # Create grouped bar chart
+            grouped = pair_counts.reset_index(name='Count')
+            fig = px.bar(
+                grouped,
+                x=primary_factor,
+                y='Count',
+                color=secondary_factor,
+                text='Count',
+                barmode='group',
+                title=f"{secondary_factor.replace('_', ' ')} Distribution by {primary_factor.replace('_', ' ')}",
+                color_discrete_sequence=px.colors.qualitative.Bold
+            )
+
+    elif plot_type == "Pie Chart":
+        if secondary_factor != "None":
+            # Create a donut chart with secondary factor as inner ring
+            fig = go.Figure()
+
+            # Add pie chart for primary factor
+            fig.add_trace(go.Pie(
+                labels=primary_counts.index,
+                values=primary_counts.values,
+                name=primary_factor.replace('_', ' '),
+                hole=0.5,
+                textinfo='label+percent',
+                marker_colors=px.colors.qualitative.Bold[:len(primary_counts)]
+            ))
+
+            # Add annotation in the center
+            fig.update_layout(
+                annotations=[dict(
+                    text=primary_factor.replace('_', ' '),
+                    x=0.5, y=0.5,
+                    font_size=15,
+                    showarrow=False
+                )]
+            )
+        else:
+            # Simple pie chart
+            pie_counts = primary_counts.reset_index()
+            pie_counts.columns = [primary_factor, 'Count']
+
+            fig = px.pie(
+                pie_counts,
+                values='Count',
+                names=primary_factor,
+                title=f"Distribution by {primary_factor.replace('_', ' ')}",
+                color_discrete_sequence=px.colors.qualitative.Bold
+            )
+            fig.update_traces(textposition='inside', textinfo='percent+label')
+
+    elif plot_type == "Grouped Bar Chart":
+        # Create grouped bar chart
+        grouped = pair_counts.reset_index(name='Count')
+
+        if normalize:
+            # Calculate percentages within each primary factor group
+            total = grouped.groupby(primary_factor, observed=True)['Count'].transform('sum')
+            grouped['Percentage'] = (grouped['Count'] / total) * 100
+
+            fig = px.bar(
+                grouped,
+                x=primary_factor,
+                y='Percentage',
+                color=secondary_factor,
+                text=grouped['Percentage'].round(1).astype(str) + '%',
+                title=f"{secondary_factor.replace('_', ' ')} Distribution by {primary_factor.replace('_', ' ')}",
+                color_discrete_sequence=px.colors.qualitative.Bold
+            )
+            fig.update_layout(yaxis_title='Percentage (%)')
+        else:
+            fig = px.bar(
+                grouped,
+                x=primary_factor,
+                y='Count',
+                color=secondary_factor,
+                text='Count',
+                title=f"{secondary_factor.replace('_', ' ')} Distribution by {primary_factor.replace('_', ' ')}",
+                color_discrete_sequence=px.colors.qualitative.Bold
+            )
+
+    fig.update_layout(**LAYOUT, height=500)
+    return fig
+
+
+def correlation_figure(data, variables, method, show_values, department, where=None):
+    # Assemble the correlation matrix from the cached per-version statistics
+    corr_df = correlation_matrix(data, variables, method, department, where)
+
+    fig = heatmap_figure(
+        corr_df,
+        colorscale='RdBu_r',
+        zmin=-1, zmax=1,
+        text_format='%.2f' if show_values else None,
+        color_label="Correlation",
+        title=f"Correlation Matrix ({method.capitalize()})"
+              f"{f' for {department}' if department != 'All' else ''}"
+    )
+
+    fig.update_layout(
+        **LAYOUT,
+        height=600,
+        xaxis_title="",
+        yaxis_title=""
+    )
+    return fig
+
+
+def progress_figure(data, department, view_type, rendering, where=None):
+    # Create visualization based on selected view type
+    if view_type == "Improvement Distribution":
+        # Create improvement distribution chart from the per-grade sketches
+        where = {'Department': department, **(where or {})}
+        fig = histogram_figure(
+            data.sketches.histogram('Improvement', HISTOGRAM_BINS, ['Grade'], where),
+            data.sketches.summary('Improvement', ['Grade'], where),
+            color='Grade',
+            histnorm='percent',
+            title=f"Score Improvement Distribution {f'for {department}' if department != 'All' else ''}",
+            x_label="Final Score - Midterm Score",
+            y_label="Percentage of Students"
+        )
+
+        # Add a vertical line at zero improvement
+        fig.add_vline(x=0, line_dash="dash", line_color="red")
+
+    else:  # Midterm vs Final Comparison
+        progress_df = progress_frame(data, department, where)
+        max_points, large_mode = rendering
+        # Create scatter plot comparing midterm to final scores
+        fig = scatter_figure(
+            progress_df,
+            x='Midterm_Score',
+            y='Final_Score',
+            max_points=max_points,
+            mode=large_mode,
+            color='Grade',
+            hover_name='Student_ID',
+            hover_data=['Department', 'Improvement'],
+            color_discrete_sequence=px.colors.qualitative.Bold,
+            opacity=0.7,
+            title=f"Midterm vs Final Performance {f'for {department}' if department != 'All' else ''}",
+            labels={"Midterm_Score": "Midterm Score", "Final_Score": "Final Score"}
+        )
+
+        # Add diagonal line (y=x) representing no change
+        max_score = max(progress_df['Midterm_Score'].max(), progress_df['Final_Score'].max())
+        fig.add_trace(
+            go.Scatter(
+                x=[0, max_score],
+                y=[0, max_score],
+                mode='lines',
+                line=dict(color='gray', dash='dash'),
+                name='No Change'
+            )
+        )
+
+    fig.update_layout(**LAYOUT, height=500)
+    return fig
+
+
+def term_grade_figure(grade_counts, view_type):
+    """Grade distribution per term from catalog.aggregate(['Grade']) counts, campuses summed"""
+    grade_counts = grade_counts.groupby(['Term', 'Grade'], sort=False, observed=True)['Count'].sum().reset_index()
+    if view_type == "Percentage":
+        grade_counts['Value'] = grade_counts['Count'] / grade_counts.groupby('Term')['Count'].transform('sum') * 100
+        y_title = 'Percentage of Students (%)'
+    else:
+        grade_counts['Value'] = grade_counts['Count']
+        y_title = 'Number of Students'
+
+    fig = px.bar(
+        grade_counts.sort_values('Grade', kind='stable'),
+        x='Grade',
+        y='Value',
+        color='Term',
+        barmode='group',
+        color_discrete_sequence=px.colors.qualitative.Bold,
+        title="Grade Distribution by Term"
+    )
+    fig.update_layout(**LAYOUT, title_font_size=18, height=500, yaxis_title=y_title, xaxis_title='Grade')
+    return fig
+
+
+CHARTS = {
+    'grade_distribution': grade_distribution_figure,
+    'study_habits': study_habits_figure,
+    'sleep_analysis': sleep_analysis_figure,
+    'stress_impact': stress_impact_figure,
+    'demographics': demographics_figure,
+    'correlation': correlation_figure,
+    'progress': progress_figure,
+}
+
+
+def build_chart(data, view, **state):
+    return CHARTS[view](data, **state)
+
+
+def cached_chart(figures, data, view, **state):
+    """Returns the view's figure for the widget state, built once per dataset version"""
+    return figures.get_or_build(view, data.version, lambda: build_chart(data, view, **state), **state)
+
+
+def default_chart_states(data):
+    """Yields (view, state) for every section's default figures, overall and per department.
+
+    The states match what the views pass to cached_chart before any widget is
+    touched, so figures built from them are served on a cold start.
+    """
+    engine = data.engine
+    departments = ['All'] + engine.options('Department')
+    rendering = (MAX_RENDERED_POINTS, SAMPLED)
+
+    for department in departments:
+        for view_type in ["Count", "Percentage"]:
+            yield 'grade_distribution', dict(
+                filters={'Department': department, 'Gender': 'All', 'Family_Income_Level': 'All'},
+                view_type=view_type)
+        for method in CORRELATION_METHODS:
+            yield 'correlation', dict(variables=DEFAULT_CORRELATION_VARIABLES, method=method,
+                                      show_values=True, department=department)
+        for view_type in PROGRESS_VIEWS:
+            yield 'progress', dict(department=department, view_type=view_type,
+                                   rendering=rendering if view_type == "Midterm vs Final Comparison" else None)
+
+    min_study, max_study = (int(v) for v in engine.value_range('Study_Hours_per_Week'))
+    yield 'study_habits', dict(study_range=(min_study, max_study), attendance_threshold=0, show_trend=True,
+                               max_points=MAX_RENDERED_POINTS, large_mode=SAMPLED)
+    for sleep_display in SLEEP_DISPLAYS:
+        yield 'sleep_analysis', dict(sleep_display=sleep_display, grades=set(engine.options('Grade')))
+    for visualization_type in STRESS_VISUALIZATIONS:
+        scatter = visualization_type == "Scatter Plot"
+        yield 'stress_impact', dict(visualization_type=visualization_type,
+                                    metric=PERFORMANCE_METRICS[0] if scatter else None,
+                                    rendering=rendering if scatter else None)
+    primary_factor = demographic_factors(data.frame)[0]
+    for plot_type in DEMOGRAPHIC_PLOT_TYPES:
+        yield 'demographics', dict(primary_factor=primary_factor, secondary_factor=SECONDARY_FACTORS[0],
+                                   plot_type=plot_type, normalize=False)
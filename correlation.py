@@ -0,0 +1,230 @@
+import copy
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from datastore import NUMERIC_COLUMNS
+from figure_cache import normalize_state
+
+# Dimensions whose per-combination partials are kept, so filtered matrices need no raw rows
+CORRELATION_DIMENSIONS = ['Department', 'Gender', 'Family_Income_Level', 'Grade']
+
+# Filtered Spearman matrices kept per dataset version
+SPEARMAN_CACHE_SIZE = 32
+
+
+def pairwise_sums(values):
+    """Returns the pairwise-complete n, sum, sum of squares and cross-product matrices.
+
+    Entry [i, j] of the sums covers column i over the rows where both columns
+    i and j are present, matching pandas' pairwise handling of missing values.
+    """
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    weights = valid.astype('float64')
+    return np.stack([
+        weights.T @ weights,
+        filled.T @ weights,
+        (filled * filled).T @ weights,
+        filled.T @ filled,
+    ])
+
+
+def _rebased_sums(sums, offset):
+    """Returns pairwise sums of values shifted by +offset per column, from the sums of the unshifted values"""
+    n, sx, sxx, sxy = np.moveaxis(sums, -3, 0)
+    d = np.asarray(offset, dtype='float64')
+    di, dj = d[:, None], d[None, :]
+    return np.stack([
+        n,
+        sx + di * n,
+        sxx + 2 * di * sx + di * di * n,
+        sxy + dj * sx + di * np.swapaxes(sx, -1, -2) + di * dj * n,
+    ], axis=-3)
+
+
+def correlation_from_sums(sums):
+    """Returns the correlation matrix of pairwise sums as pairwise_sums returns them, or summed across chunks"""
+    n, sx, sxx, sxy = sums
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = n * sxy - sx * sx.T
+        var = n * sxx - sx * sx
+        r = cov / np.sqrt(var * var.T)
+    r = np.clip(r, -1.0, 1.0)
+    np.fill_diagonal(r, np.where(np.diag(var) > 0, 1.0, np.nan))
+    return r
+
+
+def _spearman_from_values(values):
+    """Returns the Spearman matrix of the columns of values, as DataFrame.corr('spearman') does.
+
+    Columns without missing values are ranked once; a pair involving a column
+    with missing values is re-ranked over the rows where both are present.
+    """
+    ranks = np.column_stack([pd.Series(values[:, i]).rank().to_numpy() for i in range(values.shape[1])])
+    r = correlation_from_sums(pairwise_sums(ranks))
+    missing = np.isnan(values)
+    has_missing = missing.any(axis=0)
+    for i in range(values.shape[1]):
+        for j in range(i + 1, values.shape[1]):
+            if has_missing[i] or has_missing[j]:
+                pair = values[~(missing[:, i] | missing[:, j])][:, [i, j]]
+                pair_ranks = np.column_stack([pd.Series(pair[:, 0]).rank().to_numpy(),
+                                              pd.Series(pair[:, 1]).rank().to_numpy()])
+                r[i, j] = r[j, i] = correlation_from_sums(pairwise_sums(pair_ranks))[0, 1]
+    return r
+
+
+class CorrelationService:
+    """Pearson and Spearman matrices of the numeric columns without rescanning raw rows.
+
+    Pairwise sufficient statistics (non-null counts, sums, sums of squares
+    and cross-products) are kept per observed combination of the correlation
+    dimensions, so the matrix for any column subset and any filter on those
+    dimensions is assembled by summing a few cells. New or corrected rows are
+    folded in through apply_delta. Spearman ranks the matching rows, re-ranking
+    pairs with missing values over their complete rows as pandas does, and is
+    cached per filter.
+    """
+
+    def __init__(self, df, columns=NUMERIC_COLUMNS, dimensions=CORRELATION_DIMENSIONS):
+        self.columns = [c for c in columns if c in df.columns]
+        self.dimensions = [d for d in dimensions if d in df.columns]
+        self.frame = df
+        # Shifting by a fixed per-column offset keeps the raw sums well conditioned
+        self.shift = np.nan_to_num(np.nanmean(self._values(df, shifted=False), axis=0))
+        self.keys, self.counts, self.sums = self._aggregate(df)
+        self._reset_rank_cache()
+
+    def __getstate__(self):
+        # Ranks and the frame belong to one process; the owner re-attaches frame after unpickling
+        state = self.__dict__.copy()
+        del state['_lock'], state['_spearman']
+        state['frame'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset_rank_cache()
+
+    def _reset_rank_cache(self):
+        self._lock = threading.Lock()
+        self._spearman = OrderedDict()
+
+    def _values(self, df, shifted=True):
+        values = np.column_stack([df[c].to_numpy(dtype='float64', na_value=np.nan) for c in self.columns])
+        return values - self.shift if shifted else values
+
+    def _aggregate(self, df):
+        values = self._values(df)
+        groups = df.groupby(self.dimensions, observed=True, dropna=False, sort=False).indices
+        keys = [key if isinstance(key, tuple) else (key,) for key in groups]
+        counts = np.array([len(rows) for rows in groups.values()], dtype=np.int64)
+        sums = np.stack([pairwise_sums(values[rows]) for rows in groups.values()]) if groups \
+            else np.zeros((0, 4, len(self.columns), len(self.columns)))
+        return pd.DataFrame(keys, columns=self.dimensions, dtype=object), counts, sums
+
+    def apply_delta(self, frame, removed_rows=None, added_rows=None):
+        """Subtracts the old and adds the new rows' partials; frame is the updated dataset.
+
+        Only the changed rows are aggregated. The partials are replaced rather
+        than modified, so a shallow copy can be updated while readers keep
+        using the original; cached ranks belong to the old version and are dropped.
+        """
+        parts = []
+        if added_rows is not None and len(added_rows):
+            parts.append(self._aggregate(added_rows))
+        if removed_rows is not None and len(removed_rows):
+            keys, counts, sums = self._aggregate(removed_rows)
+            parts.append((keys, -counts, -sums))
+        if parts:
+            self._combine(parts)
+        self.frame = frame
+        self._reset_rank_cache()
+
+    def merge(self, other):
+        """Returns the partials of both services' rows together; neither service is modified.
+
+        The result has no frame, so it answers Pearson matrices only.
+        """
+        if other.columns != self.columns or other.dimensions != self.dimensions:
+            raise ValueError("Cannot merge correlation partials of different columns or dimensions")
+        merged = copy.copy(self)
+        # other's sums are of values shifted by other.shift; move them onto this shift
+        merged._combine([(other.keys, other.counts, _rebased_sums(other.sums, other.shift - self.shift))])
+        merged.frame = None
+        merged._reset_rank_cache()
+        return merged
+
+    def _combine(self, others):
+        keys, counts, sums = zip(*([(self.keys, self.counts, self.sums)] + others))
+        codes, uniques = pd.MultiIndex.from_frame(pd.concat(keys, ignore_index=True)).factorize()
+        merged_counts = np.zeros(len(uniques), dtype=np.int64)
+        merged_sums = np.zeros((len(uniques),) + self.sums.shape[1:])
+        np.add.at(merged_counts, codes, np.concatenate(counts))
+        np.add.at(merged_sums, codes, np.concatenate(sums))
+
+        keep = merged_counts != 0
+        self.keys = uniques.to_frame(index=False, name=self.dimensions)[keep].reset_index(drop=True).astype(object)
+        self.counts = merged_counts[keep]
+        self.sums = merged_sums[keep]
+
+    def _where_mask(self, frame, where):
+        mask = np.ones(len(frame), dtype=bool)
+        for col, selected in (where or {}).items():
+            if selected is None or (isinstance(selected, str) and selected == 'All'):
+                continue
+            if not isinstance(selected, (list, tuple, set)):
+                selected = [selected]
+            mask &= frame[col].isin(list(selected)).to_numpy()
+        return mask
+
+    def _subset(self, columns):
+        missing = [c for c in columns if c not in self.columns]
+        if missing:
+            raise KeyError(f"No correlation statistics for {missing}")
+        return [self.columns.index(c) for c in columns]
+
+    def pearson(self, columns=None, where=None):
+        """Returns the Pearson matrix of columns over the rows matching where.
+
+        where maps a correlation dimension to a value, a list of values or 'All'/None.
+        """
+        columns = list(columns or self.columns)
+        idx = self._subset(columns)
+        sums = self.sums[self._where_mask(self.keys, where)].sum(axis=0)
+        r = correlation_from_sums(sums[:, idx][:, :, idx])
+        return pd.DataFrame(r, index=columns, columns=columns)
+
+    def _spearman_matrix(self, where):
+        key = normalize_state(where or {})
+        with self._lock:
+            if key in self._spearman:
+                self._spearman.move_to_end(key)
+                return self._spearman[key]
+
+        frame = self.frame
+        mask = self._where_mask(frame, where)
+        rows = frame if mask.all() else frame[mask]
+        matrix = _spearman_from_values(self._values(rows, shifted=False))
+        with self._lock:
+            self._spearman[key] = matrix
+            while len(self._spearman) > SPEARMAN_CACHE_SIZE:
+                self._spearman.popitem(last=False)
+        return matrix
+
+    def spearman(self, columns=None, where=None):
+        """Returns the Spearman matrix of columns over the rows matching where"""
+        columns = list(columns or self.columns)
+        idx = self._subset(columns)
+        r = self._spearman_matrix(where)[np.ix_(idx, idx)]
+        return pd.DataFrame(r, index=columns, columns=columns)
+
+    def matrix(self, method, columns=None, where=None):
+        if method == 'pearson':
+            return self.pearson(columns, where)
+        if method == 'spearman':
+            return self.spearman(columns, where)
+        raise ValueError(f"Unsupported correlation method '{method}'")
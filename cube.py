@@ -0,0 +1,150 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from datastore import SCORE_COLUMNS
+
+SLEEP_BINS = [0, 4, 5, 6, 7, 8, 9, 12]
+SLEEP_LABELS = ['<4h', '4-5h', '5-6h', '6-7h', '7-8h', '8-9h', '9h+']
+
+# Low-cardinality dimensions the charts group by; Sleep_Group is derived
+CUBE_DIMENSIONS = ['Grade', 'Department', 'Gender', 'Family_Income_Level',
+                   'Internet_Access_at_Home', 'Parent_Education_Level',
+                   'Extracurricular_Activities', 'Stress_Level (1-10)', 'Sleep_Group']
+
+CUBE_MEASURES = SCORE_COLUMNS
+
+
+def sleep_groups(sleep_hours):
+    """Bins nightly sleep hours into the dashboard's sleep groups"""
+    return pd.cut(sleep_hours, bins=SLEEP_BINS, labels=SLEEP_LABELS,
+                  include_lowest=True).rename('Sleep_Group')
+
+
+def _measure_columns(measure):
+    return f"{measure}__n", f"{measure}__sum", f"{measure}__sumsq"
+
+
+class AggregateCube:
+    """Student counts and score moments pre-aggregated over the chart dimensions.
+
+    One cell per observed combination of dimension values holds the student
+    count and, for every measure, its non-null count, sum and sum of squares.
+    Chart queries group and sum cells, so their cost depends on the number of
+    observed combinations rather than the number of students.
+    """
+
+    def __init__(self, df, dimensions=CUBE_DIMENSIONS, measures=CUBE_MEASURES):
+        self.dimensions = [d for d in dimensions if d in df.columns or d == 'Sleep_Group']
+        self.measures = [m for m in measures if m in df.columns]
+        self.cells = self._aggregate(df)
+
+    def _aggregate(self, df):
+        keys = [sleep_groups(df['Sleep_Hours_per_Night']) if dim == 'Sleep_Group' else df[dim]
+                for dim in self.dimensions]
+        values = {'count': np.ones(len(df), dtype=np.int64)}
+        for measure in self.measures:
+            x = df[measure].to_numpy(dtype='float64', na_value=np.nan)
+            valid = ~np.isnan(x)
+            x = np.where(valid, x, 0.0)
+            n_col, sum_col, sumsq_col = _measure_columns(measure)
+            values[n_col] = valid.astype(np.int64)
+            values[sum_col] = x
+            values[sumsq_col] = x * x
+        frame = pd.DataFrame(values, index=df.index)
+        cells = frame.groupby(keys, observed=True, dropna=False, sort=False).sum()
+        return cells.reset_index()
+
+    def apply_delta(self, removed_rows=None, added_rows=None):
+        """Subtracts the old and adds the new rows' contributions to the cells.
+
+        Only the changed rows are aggregated; merging them costs a group-by
+        over the cells, independent of the dataset size. self.cells is
+        replaced, not modified, so shallow copies stay consistent.
+        """
+        parts = []
+        if added_rows is not None and len(added_rows):
+            parts.append(self._aggregate(added_rows))
+        if removed_rows is not None and len(removed_rows):
+            removed = self._aggregate(removed_rows)
+            value_cols = removed.columns.difference(self.dimensions)
+            removed[value_cols] = -removed[value_cols]
+            parts.append(removed)
+        if parts:
+            self._combine(parts)
+
+    def merge(self, other):
+        """Returns a cube of both cubes' rows together; neither cube is modified"""
+        if other.dimensions != self.dimensions or other.measures != self.measures:
+            raise ValueError("Cannot merge cubes with different dimensions or measures")
+        merged = copy.copy(self)
+        merged._combine([other.cells.copy(deep=False)])
+        return merged
+
+    def _combine(self, others):
+        parts = [self.cells.copy(deep=False)] + others
+        for dim in self.dimensions:
+            if isinstance(parts[0][dim].dtype, pd.CategoricalDtype):
+                categories = parts[0][dim].cat.categories
+                for part in parts[1:]:
+                    categories = categories.union(part[dim].cat.categories)
+                categories = categories.sort_values() if dim != 'Sleep_Group' else pd.Index(SLEEP_LABELS)
+                for part in parts:
+                    part[dim] = part[dim].cat.set_categories(categories)
+
+        cells = pd.concat(parts, ignore_index=True)
+        cells = cells.groupby(self.dimensions, observed=True, dropna=False, sort=False).sum().reset_index()
+        self.cells = cells[cells['count'] != 0].reset_index(drop=True)
+
+    def covers(self, columns):
+        """Returns True if every column is a cube dimension"""
+        return all(col in self.dimensions for col in columns)
+
+    def _where_mask(self, where):
+        mask = np.ones(len(self.cells), dtype=bool)
+        for col, selected in (where or {}).items():
+            if selected is None or (isinstance(selected, str) and selected == 'All'):
+                continue
+            if isinstance(selected, (list, tuple, set)):
+                mask &= self.cells[col].isin(list(selected)).to_numpy()
+            else:
+                mask &= (self.cells[col] == selected).to_numpy(dtype=bool, na_value=False)
+        return mask
+
+    def slice(self, by, where=None):
+        """Returns the summed cells grouped by the given dimensions.
+
+        where maps a dimension to a value, a list of values or 'All'/None.
+        Cells with a missing value in any of the by dimensions are dropped,
+        matching groupby/value_counts on the raw rows.
+        """
+        cells = self.cells[self._where_mask(where)]
+        return cells.groupby(list(by), observed=True).sum(numeric_only=True)
+
+    def counts(self, by, where=None):
+        """Returns student counts per combination of the by dimensions"""
+        counts = self.slice(by, where)['count']
+        return counts[counts > 0].rename('Count')
+
+    def total(self, where=None):
+        """Returns the number of students matching where"""
+        return int(self.cells.loc[self._where_mask(where), 'count'].sum())
+
+    def totals(self, where=None):
+        """Returns the summed count and measure moments of the cells matching where"""
+        return self.cells.loc[self._where_mask(where)].drop(columns=self.dimensions).sum()
+
+    def crosstab(self, row, col, where=None):
+        """Returns a row x col contingency table of student counts"""
+        return self.counts([row, col], where).unstack(fill_value=0)
+
+    def stats(self, measure, by, where=None):
+        """Returns count, mean and sample std of a measure per group"""
+        n_col, sum_col, sumsq_col = _measure_columns(measure)
+        sliced = self.slice(by, where)
+        n = sliced[n_col]
+        mean = sliced[sum_col] / n.where(n > 0)
+        var = (sliced[sumsq_col] - n * mean ** 2) / (n - 1).where(n > 1)
+        stats = pd.DataFrame({'count': n, 'mean': mean, 'std': np.sqrt(var.clip(lower=0))})
+        return stats[sliced['count'] > 0]
@@ -0,0 +1,231 @@
+import copy
+import glob
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from associations import AssociationService
+from correlation import CorrelationService
+from cube import AggregateCube
+from datastore import (DATA_PATH, CACHE_DIR, SCHEMA, load_dataset, read_columnar, read_csv_typed, read_csv_tail,
+                       tail_signature, align_categories, coerce_schema, file_fingerprint)
+from filter_engine import FilterEngine
+from shared_cache import content_key
+from sketches import QuantileSketches
+
+# New or corrected grade rows dropped here by the SIS are upserted on the next refresh
+DELTA_DIR = "deltas"
+
+# Bump when the pickled layout of the filter engine, cube, correlation partials, association counts or sketches changes
+DERIVED_FORMAT_VERSION = 5
+
+
+class DeferredColumns:
+    """Columns left out of a loaded frame, read from its columnar cache by Student_ID on request.
+
+    Rows upserted since the cache was built carry their own values, kept
+    here so deferred columns stay current without reloading.
+    """
+
+    def __init__(self, data_path, columns, overrides=None):
+        self.data_path = data_path
+        self.columns = list(columns)
+        self.overrides = overrides
+
+    def upserted(self, delta):
+        """Returns a copy that also holds the deferred values of the delta rows"""
+        rows = delta.set_index('Student_ID')[[col for col in self.columns if col in delta.columns]]
+        overrides = rows if self.overrides is None else pd.concat([self.overrides, rows])
+        return DeferredColumns(self.data_path, self.columns, overrides[~overrides.index.duplicated(keep='last')])
+
+    def read(self, columns, ids):
+        """Returns the columns of the students ids, in their order"""
+        values = read_columnar(self.data_path, ['Student_ID'] + list(columns)).set_index('Student_ID')
+        if self.overrides is not None:
+            values, overrides = align_categories(values, self.overrides.reindex(columns=columns))
+            values = pd.concat([values, overrides])
+        values = values[~values.index.duplicated(keep='last')]
+        return values.reindex(pd.Index(ids)).reset_index(drop=True)
+
+
+class DatasetSnapshot:
+    """An immutable view of the dataset together with the structures derived from it"""
+
+    def __init__(self, frame, version, engine, cube, correlations, associations, sketches, deferred=None):
+        self.frame = frame
+        self.version = version
+        self.engine = engine
+        self.cube = cube
+        self.correlations = correlations
+        self.associations = associations
+        self.sketches = sketches
+        self.deferred = deferred
+        self._lock = threading.Lock()
+        self._widened = {}
+
+    def with_columns(self, columns):
+        """Returns a snapshot whose frame also has the given deferred columns, e.g. PII_COLUMNS.
+
+        The columns are read once per snapshot; the derived structures are
+        shared, so they do not cover the added columns.
+        """
+        missing = [col for col in columns if col not in self.frame.columns]
+        if not missing:
+            return self
+        if self.deferred is None:
+            raise KeyError(f"Columns not loaded: {', '.join(missing)}")
+        with self._lock:
+            key = tuple(missing)
+            if key not in self._widened:
+                values = self.deferred.read(missing, self.frame['Student_ID']).set_axis(self.frame.index)
+                frame = pd.concat([self.frame, values], axis=1)
+                frame = frame[[col for col in SCHEMA if col in frame.columns]
+                              + [col for col in frame.columns if col not in SCHEMA]]
+                frame.attrs = self.frame.attrs
+                self._widened[key] = DatasetSnapshot(frame, self.version, self.engine, self.cube,
+                                                     self.correlations, self.associations, self.sketches,
+                                                     self.deferred)
+            return self._widened[key]
+
+
+class StudentDataset:
+    """The shared student dataset, refreshed incrementally as the SIS adds rows.
+
+    Rows are keyed on Student_ID. New or corrected rows arrive either appended
+    to the source CSV (picked up from the last consumed byte offset; any
+    other change to the CSV, told apart by its size and mtime, reloads it) or as
+    delta CSV files dropped into delta_dir. They are upserted into the frame
+    and folded into the filter indexes, the aggregate cube, the correlation
+    partials, the association counts and the quantile sketches, so a refresh
+    costs roughly the size of the delta instead of a full reload.
+
+    PII_COLUMNS are not loaded; views that show them read them on request
+    through DatasetSnapshot.with_columns.
+
+    Readers use ``current``, which is swapped atomically after each refresh.
+    With a shared_cache backend, the structures derived from a loaded version
+    are computed by one process and reused by every other one.
+    """
+
+    def __init__(self, csv_path=DATA_PATH, cache_dir=CACHE_DIR, delta_dir=None, progress=None,
+                 shared_cache=None):
+        self.csv_path = csv_path
+        self.cache_dir = cache_dir
+        self.delta_dir = delta_dir
+        self.progress = progress
+        self.shared_cache = shared_cache
+        self._lock = threading.Lock()
+        self._reload()
+
+    def _reload(self):
+        # A rebuilt frame has none of the delta files applied yet
+        self._applied_deltas = set()
+        frame = load_dataset(self.csv_path, self.cache_dir, progress=self.progress)
+        self._fingerprint = frame.attrs['source']
+        self._offset = self._fingerprint['size']
+        self._signature = tail_signature(self.csv_path, self._offset)
+        self._ids = pd.Index(frame['Student_ID'])
+        version = frame.attrs['version']
+
+        def derive():
+            return (FilterEngine(frame), AggregateCube(frame), CorrelationService(frame), AssociationService(frame),
+                    QuantileSketches(frame))
+
+        if self.shared_cache is None:
+            engine, cube, correlations, associations, sketches = derive()
+        else:
+            key = content_key('derived', DERIVED_FORMAT_VERSION, version)
+            engine, cube, correlations, associations, sketches = self.shared_cache.get_or_compute(key, derive)
+            correlations.frame = frame
+        deferred = DeferredColumns(frame.attrs['data_path'], [col for col in SCHEMA if col not in frame.columns])
+        self.current = DatasetSnapshot(frame, version, engine, cube, correlations, associations, sketches, deferred)
+
+    def refresh(self):
+        """Picks up rows appended to the CSV and new delta files; returns the number of rows upserted"""
+        with self._lock:
+            upserted = 0
+            fingerprint = file_fingerprint(self.csv_path)
+            if fingerprint != self._fingerprint:
+                if (fingerprint['size'] <= self._fingerprint['size']
+                        or tail_signature(self.csv_path, self._offset) != self._signature):
+                    # Modified without growing (e.g. a same-length correction anywhere in the file) or
+                    # rewritten before the consumed offset: nothing to diff against, and every delta applies again
+                    self._reload()
+                    upserted = len(self.current.frame)
+                else:
+                    delta, offset = read_csv_tail(self.csv_path, self._offset)
+                    if delta is not None:
+                        upserted += self._upsert(delta)
+                        self._offset = offset
+                        self._signature = tail_signature(self.csv_path, offset)
+                    self._fingerprint = fingerprint
+
+            if self.delta_dir is not None:
+                for path in sorted(glob.glob(os.path.join(self.delta_dir, '*.csv'))):
+                    if path not in self._applied_deltas:
+                        upserted += self._upsert(read_csv_typed(path))
+                        self._applied_deltas.add(path)
+            return upserted
+
+    def upsert(self, delta):
+        """Inserts or replaces rows by Student_ID; returns the number of rows upserted"""
+        with self._lock:
+            return self._upsert(coerce_schema(delta.copy()))
+
+    def _upsert(self, delta):
+        if len(delta) == 0:
+            return 0
+        snapshot = self.current
+        delta = delta.drop_duplicates('Student_ID', keep='last').reset_index(drop=True)
+        deferred = snapshot.deferred.upserted(delta) if snapshot.deferred is not None else None
+        # Hashed before projecting, so a change to deferred columns alone is a new version too
+        digest = pd.util.hash_pandas_object(delta, index=False).to_numpy().tobytes()
+        frame, delta = align_categories(snapshot.frame, delta[snapshot.frame.columns])
+
+        positions = self._ids.get_indexer(delta['Student_ID'])
+        is_update = positions >= 0
+        updates, inserts = delta[is_update], delta[~is_update]
+        updated_positions = positions[is_update]
+        old_rows = frame.iloc[updated_positions]
+
+        if len(updates):
+            # Write into copies so readers of the previous snapshot are unaffected
+            frame = frame.copy(deep=False)
+            for col in frame.columns:
+                values = frame[col].copy()
+                values.iloc[updated_positions] = updates[col].array
+                frame[col] = values
+        n_before = len(frame)
+        if len(inserts):
+            frame = pd.concat([frame, inserts], ignore_index=True)
+            self._ids = self._ids.append(pd.Index(inserts['Student_ID']))
+
+        added_positions = np.concatenate([updated_positions,
+                                          np.arange(n_before, n_before + len(inserts))])
+        added_rows = pd.concat([updates, inserts], ignore_index=True)
+
+        engine = copy.copy(snapshot.engine)
+        engine.apply_delta(len(frame), updated_positions, old_rows, added_positions, added_rows)
+        cube = copy.copy(snapshot.cube)
+        cube.apply_delta(removed_rows=old_rows, added_rows=added_rows)
+        correlations = copy.copy(snapshot.correlations)
+        correlations.apply_delta(frame, removed_rows=old_rows, added_rows=added_rows)
+        associations = copy.copy(snapshot.associations)
+        associations.apply_delta(frame, removed_rows=old_rows, added_rows=added_rows)
+        sketches = copy.copy(snapshot.sketches)
+        sketches.apply_delta(removed_rows=old_rows, added_rows=added_rows)
+
+        version = hashlib.sha256(snapshot.version.encode() + digest).hexdigest()
+        frame.attrs['version'] = version
+        self.current = DatasetSnapshot(frame, version, engine, cube, correlations, associations, sketches, deferred)
+        return len(delta)
+
+
+def open_snapshot(csv_path=DATA_PATH, cache_dir=CACHE_DIR, delta_dir=DELTA_DIR, shared_cache=None):
+    """Loads the dataset the way the dashboard does, so versions and cache keys match"""
+    dataset = StudentDataset(csv_path, cache_dir, delta_dir=delta_dir, shared_cache=shared_cache)
+    dataset.refresh()
+    return dataset.current
@@ -0,0 +1,500 @@
+import contextlib
+import hashlib
+import io
+import json
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+
+DATA_PATH = "Students_Grading_Dataset.csv"
+CACHE_DIR = ".cache"
+
+# Bump whenever SCHEMA or the cache layout changes so stale files are rebuilt
+CACHE_FORMAT_VERSION = 4
+
+# Rows parsed per chunk when streaming a CSV into the cache; bounds peak memory
+CHUNK_ROWS = 100_000
+
+SCORE_COLUMNS = ['Midterm_Score', 'Final_Score', 'Assignments_Avg', 'Quizzes_Avg',
+                 'Participation_Score', 'Projects_Score', 'Total_Score']
+
+NUMERIC_COLUMNS = ['Attendance (%)', 'Midterm_Score', 'Final_Score', 'Assignments_Avg',
+                   'Quizzes_Avg', 'Participation_Score', 'Projects_Score', 'Total_Score',
+                   'Study_Hours_per_Week', 'Stress_Level (1-10)', 'Sleep_Hours_per_Night']
+
+CATEGORICAL_COLUMNS = ['First_Name', 'Last_Name', 'Gender', 'Department', 'Grade',
+                       'Extracurricular_Activities', 'Internet_Access_at_Home',
+                       'Parent_Education_Level', 'Family_Income_Level']
+
+# Personal data; only read from the cache when a view asks for these columns
+PII_COLUMNS = ['First_Name', 'Last_Name', 'Email']
+
+# Distinct values recorded per record batch and column for predicate pushdown;
+# batches of columns with more are always read
+BATCH_VALUE_LIMIT = 256
+
+# Explicit column types of the columnar cache, in CSV column order. Unique
+# text stays in Arrow-backed strings, everything else is downcast or
+# dictionary-encoded so a student row costs ~100 bytes instead of ~250.
+SCHEMA = {
+    'Student_ID': 'string[pyarrow]',
+    'First_Name': 'category',
+    'Last_Name': 'category',
+    'Email': 'string[pyarrow]',
+    'Gender': 'category',
+    'Age': 'Int8',
+    'Department': 'category',
+    'Attendance (%)': 'float32',
+    'Midterm_Score': 'float32',
+    'Final_Score': 'float32',
+    'Assignments_Avg': 'float32',
+    'Quizzes_Avg': 'float32',
+    'Participation_Score': 'float32',
+    'Projects_Score': 'float32',
+    'Total_Score': 'float32',
+    'Grade': 'category',
+    'Study_Hours_per_Week': 'float32',
+    'Extracurricular_Activities': 'category',
+    'Internet_Access_at_Home': 'category',
+    'Parent_Education_Level': 'category',
+    'Family_Income_Level': 'category',
+    'Stress_Level (1-10)': 'Int8',
+    'Sleep_Hours_per_Night': 'float32',
+}
+
+
+def file_fingerprint(path):
+    """Returns the cheap (size, mtime) identity of a file"""
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def file_hash(path, block_size=1 << 20):
+    """Returns the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def coerce_schema(df):
+    """Casts a raw frame to SCHEMA, coercing unparseable numbers to NaN"""
+    for col, dtype in SCHEMA.items():
+        if col not in df.columns:
+            continue
+        if dtype == 'float32':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+        elif dtype == 'Int8':
+            df[col] = pd.to_numeric(df[col], errors='coerce').round().astype('Int8')
+        elif df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def _text_dtypes():
+    return {col: dtype for col, dtype in SCHEMA.items()
+            if dtype in ('string[pyarrow]', 'category')}
+
+
+def read_csv_typed(csv_path=DATA_PATH):
+    """Parses the CSV export straight into the compact SCHEMA types"""
+    df = pd.read_csv(csv_path, dtype=_text_dtypes())
+    return coerce_schema(df)
+
+
+def read_csv_tail(csv_path, offset):
+    """Parses the complete rows appended to a CSV after byte offset.
+
+    Returns the typed rows and the offset just past the last complete line,
+    so a row that is still being written is picked up by the next call.
+    """
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        f.seek(offset)
+        tail = f.read()
+    end = tail.rfind(b'\n') + 1
+    if end == 0:
+        return None, offset
+    df = pd.read_csv(io.BytesIO(header + tail[:end]), dtype=_text_dtypes())
+    return coerce_schema(df), offset + end
+
+
+def tail_signature(path, offset, size=4096):
+    """Returns a hash of the bytes just before offset, used to detect in-place rewrites"""
+    with open(path, 'rb') as f:
+        f.seek(max(offset - size, 0))
+        return hashlib.sha256(f.read(min(offset, size))).hexdigest()
+
+
+def align_categories(left, right):
+    """Gives the categorical columns shared by two frames the same sorted categories.
+
+    Returns new frames; a column is only recoded when its categories change.
+    """
+    left, right = left.copy(deep=False), right.copy(deep=False)
+    for col in left.columns.intersection(right.columns):
+        if not isinstance(left[col].dtype, pd.CategoricalDtype):
+            continue
+        right_values = right[col].cat.categories if isinstance(right[col].dtype, pd.CategoricalDtype) \
+            else pd.Index(right[col].dropna().unique())
+        categories = left[col].cat.categories.union(right_values).sort_values()
+        if not left[col].cat.categories.equals(categories):
+            left[col] = left[col].cat.set_categories(categories)
+        if not isinstance(right[col].dtype, pd.CategoricalDtype) or not right[col].cat.categories.equals(categories):
+            right[col] = right[col].astype(pd.CategoricalDtype(categories))
+    return left, right
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Holds an exclusive advisory lock on path, shared by every process on the host.
+
+    Without fcntl (Windows) this is a no-op; cache files are still replaced
+    atomically, so concurrent writers only duplicate work.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def cache_paths(csv_path, cache_dir=CACHE_DIR):
+    """Returns the (data, metadata) paths of the columnar cache for a CSV"""
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return (os.path.join(cache_dir, f"{stem}.arrow"),
+            os.path.join(cache_dir, f"{stem}.meta.json"))
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path, meta):
+    tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def write_columnar(df, path):
+    """Writes a frame as an uncompressed Arrow IPC file so it can be memory-mapped"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+
+
+def default_columns():
+    """The columns loaded when none are asked for: everything but PII_COLUMNS"""
+    return [col for col in SCHEMA if col not in PII_COLUMNS]
+
+
+def normalize_where(where):
+    """Returns {column: list of values or (low, high) range} without the 'All' and None entries.
+
+    Accepts the filter dicts the views build: a value, a list of values, 'All'
+    or None per column, or an inclusive (low, high) tuple with either side None.
+    """
+    predicates = {}
+    for col, selected in (where or {}).items():
+        if selected is None or (isinstance(selected, str) and selected == 'All'):
+            continue
+        if isinstance(selected, tuple):
+            predicates[col] = selected
+        elif isinstance(selected, (list, set, frozenset, pd.Index)):
+            predicates[col] = list(selected)
+        else:
+            predicates[col] = [selected]
+    return predicates
+
+
+def _batch_statistics(chunk):
+    """Returns the values and ranges of one record batch, as stored in the cache metadata"""
+    values, ranges = {}, {}
+    for col, dtype in SCHEMA.items():
+        if dtype == 'category':
+            present = chunk[col].dropna().unique()
+            if len(present) <= BATCH_VALUE_LIMIT:
+                values[col] = sorted(str(v) for v in present)
+        elif dtype in ('float32', 'Int8'):
+            series = chunk[col].dropna()
+            ranges[col] = [float(series.min()), float(series.max())] if len(series) else None
+    return {'rows': len(chunk), 'values': values, 'ranges': ranges}
+
+
+def _batch_may_match(stats, predicates):
+    for col, selected in predicates.items():
+        if isinstance(selected, tuple):
+            if col not in stats['ranges']:
+                continue
+            if stats['ranges'][col] is None:
+                return False
+            low, high = selected
+            batch_min, batch_max = stats['ranges'][col]
+            if (low is not None and batch_max < low) or (high is not None and batch_min > high):
+                return False
+        elif col in stats['values'] and not set(stats['values'][col]) & {str(v) for v in selected}:
+            return False
+    return True
+
+
+def _predicate_expression(predicates):
+    expression = None
+    for col, selected in predicates.items():
+        if isinstance(selected, tuple):
+            low, high = selected
+            term = pc.field(col).is_valid()
+            if low is not None:
+                term &= pc.field(col) >= low
+            if high is not None:
+                term &= pc.field(col) <= high
+        else:
+            term = pc.field(col).isin(selected)
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def _to_pandas(table):
+    df = table.to_pandas(split_blocks=True)
+    # Streamed files carry categories in first-seen order; charts expect them sorted
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            categories = df[col].cat.categories
+            if not categories.is_monotonic_increasing:
+                df[col] = df[col].cat.set_categories(categories.sort_values())
+    return df
+
+
+def _matching_batches(path, columns, predicates, batches):
+    """Opens an Arrow IPC file; returns a function reading batch i, the indexes that can match and the schema"""
+    reader = ipc.open_file(pa.memory_map(path))
+    selected = [i for i in range(reader.num_record_batches)
+                if batches is None or _batch_may_match(batches[i], predicates)]
+    # Read the filtered columns too, then drop the ones that were not asked for
+    names = list(dict.fromkeys(list(columns) + list(predicates)))
+    schema = pa.schema([reader.schema.field(name) for name in names], metadata=reader.schema.metadata)
+    return (lambda i: reader.get_batch(i).select(names)), selected, schema
+
+
+def read_columnar(path, columns=None, where=None, batches=None):
+    """Reads an Arrow IPC file through a memory map instead of parsing it.
+
+    Only the given columns are read, and with a where filter (see
+    normalize_where) only the matching rows are converted to pandas. batches
+    is the per-batch statistics list of the cache metadata; with it, record
+    batches that cannot match where are skipped without being touched.
+    """
+    predicates = normalize_where(where)
+    if not predicates:
+        return _to_pandas(feather.read_table(path, columns=columns, memory_map=True))
+    columns = list(columns) if columns is not None else ipc.open_file(pa.memory_map(path)).schema.names
+    read_batch, selected, schema = _matching_batches(path, columns, predicates, batches)
+    table = pa.Table.from_batches([read_batch(i) for i in selected], schema=schema)
+    return _to_pandas(table.filter(_predicate_expression(predicates)).select(columns))
+
+
+def scan_columnar(path, columns=None, where=None, batches=None):
+    """Yields an Arrow IPC file one record batch at a time, projected and filtered like read_columnar.
+
+    Memory is bounded by a single batch (at most CHUNK_ROWS rows) of the
+    requested columns, whatever the file size. Batches with no matching row
+    are skipped; category order may differ from one frame to the next.
+    """
+    predicates = normalize_where(where)
+    columns = list(columns) if columns is not None else ipc.open_file(pa.memory_map(path)).schema.names
+    read_batch, selected, schema = _matching_batches(path, columns, predicates, batches)
+    for i in selected:
+        table = pa.Table.from_batches([read_batch(i)], schema=schema)
+        if predicates:
+            table = table.filter(_predicate_expression(predicates))
+        if table.num_rows:
+            yield _to_pandas(table.select(columns))
+
+
+class _HashingReader(io.RawIOBase):
+    """Wraps a binary file, hashing and counting every byte read through it"""
+
+    def __init__(self, f):
+        self._f = f
+        self.digest = hashlib.sha256()
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self._f.readinto(buffer)
+        self.digest.update(memoryview(buffer)[:n])
+        self.bytes_read += n
+        return n
+
+
+def _ipc_schema(schema):
+    # Fix dictionary indices at int32 so categories can grow between chunks
+    fields = [pa.field(f.name, pa.dictionary(pa.int32(), f.type.value_type))
+              if pa.types.is_dictionary(f.type) else f for f in schema]
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+def ingest_csv(csv_path, data_path, chunk_rows=CHUNK_ROWS, progress=None):
+    """Streams a CSV into an Arrow IPC file one chunk at a time.
+
+    Each chunk is parsed, coerced to SCHEMA and written as a record batch, so
+    peak memory is bounded by chunk_rows rather than by the file size. Category
+    dictionaries only grow between chunks and are written as dictionary deltas.
+    progress, if given, is called as progress(chunk, bytes_read, total_bytes)
+    after every chunk. Returns the CSV's SHA-256, its row count, the number
+    of non-empty values per numeric column that could not be parsed and the
+    values and ranges of each batch, used to skip batches in read_columnar.
+    """
+    total_bytes = os.path.getsize(csv_path)
+    numeric_columns = [col for col, dtype in SCHEMA.items() if dtype in ('float32', 'Int8')]
+    categories = {}
+    invalid = dict.fromkeys(numeric_columns, 0)
+    batches = []
+    rows = 0
+    writer = None
+    tmp_path = f"{data_path}.{os.getpid()}.tmp"
+
+    try:
+        with open(csv_path, 'rb') as f:
+            reader = _HashingReader(f)
+            stream = io.BufferedReader(reader)
+            for chunk in pd.read_csv(stream, dtype=_text_dtypes(), chunksize=chunk_rows):
+                missing = [col for col in SCHEMA if col not in chunk.columns]
+                if missing:
+                    raise ValueError(f"{csv_path} is missing columns: {', '.join(missing)}")
+
+                raw_nulls = chunk[numeric_columns].isna().sum()
+                chunk = coerce_schema(chunk[list(SCHEMA)])
+                for col, n in (chunk[numeric_columns].isna().sum() - raw_nulls).items():
+                    invalid[col] += int(n)
+
+                for col, dtype in SCHEMA.items():
+                    if dtype == 'category':
+                        known = categories.setdefault(col, [])
+                        seen = set(known)
+                        known.extend(v for v in chunk[col].cat.categories if v not in seen)
+                        chunk[col] = chunk[col].cat.set_categories(known)
+
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    schema = _ipc_schema(table.schema)
+                    options = ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+                    writer = ipc.new_file(tmp_path, schema, options=options)
+                # One record batch per chunk, matching the statistics kept for it
+                writer.write_table(table.cast(schema).combine_chunks())
+                batches.append(_batch_statistics(chunk))
+                rows += len(chunk)
+                if progress is not None:
+                    progress(chunk, reader.bytes_read, total_bytes)
+            # Hash whatever the parser did not need to read
+            while stream.read(1 << 20):
+                pass
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        write_columnar(coerce_schema(pd.DataFrame({col: [] for col in SCHEMA})), data_path)
+    else:
+        os.replace(tmp_path, data_path)
+    return reader.digest.hexdigest(), rows, invalid, batches
+
+
+def bytes_per_row(df):
+    """Returns the in-memory footprint of a frame divided by its row count"""
+    if len(df) == 0:
+        return 0.0
+    return df.memory_usage(deep=True).sum() / len(df)
+
+
+def _fresh_meta(csv_path, data_path, meta_path, fingerprint):
+    meta = _read_meta(meta_path)
+    if (meta is None or not os.path.exists(data_path)
+            or meta.get('format') != CACHE_FORMAT_VERSION):
+        return None
+    fresh = meta['source'] == fingerprint
+    if not fresh and meta['source']['size'] == fingerprint['size']:
+        fresh = meta['sha256'] == file_hash(csv_path)
+        if fresh:
+            meta['source'] = fingerprint
+            _write_meta(meta_path, meta)
+    return meta if fresh else None
+
+
+def _rebuild_cache(csv_path, data_path, meta_path, fingerprint, progress):
+    os.makedirs(os.path.dirname(data_path) or '.', exist_ok=True)
+    sha256, rows, invalid, batches = ingest_csv(csv_path, data_path, progress=progress)
+    meta = {
+        'format': CACHE_FORMAT_VERSION,
+        'source': fingerprint,
+        'sha256': sha256,
+        'rows': rows,
+        'invalid_values': invalid,
+        'batches': batches,
+    }
+    _write_meta(meta_path, meta)
+    return meta
+
+
+def ensure_columnar(csv_path=DATA_PATH, cache_dir=CACHE_DIR, progress=None):
+    """Brings the columnar cache of a CSV up to date without reading it; returns its data path and metadata.
+
+    The cache is reused while the CSV's size and mtime match; if only the mtime
+    moved (e.g. a re-copied export) the content hash decides. A rebuild streams
+    the CSV through ingest_csv, reporting each chunk to progress.
+    """
+    data_path, meta_path = cache_paths(csv_path, cache_dir)
+    fingerprint = file_fingerprint(csv_path)
+    meta = _fresh_meta(csv_path, data_path, meta_path, fingerprint)
+    if meta is not None:
+        return data_path, meta
+
+    # Replicas starting together parse the CSV once; the others wait and reuse the cache
+    with file_lock(data_path + '.lock'):
+        meta = _fresh_meta(csv_path, data_path, meta_path, fingerprint)
+        if meta is None:
+            meta = _rebuild_cache(csv_path, data_path, meta_path, fingerprint, progress)
+        return data_path, meta
+
+
+def load_dataset(csv_path=DATA_PATH, cache_dir=CACHE_DIR, progress=None, columns=None, where=None):
+    """Loads the dataset from its columnar cache, rebuilding it when the CSV changed.
+
+    Only columns are read (default_columns() when None, so PII stays on disk)
+    and, with a where filter, only the record batches and rows matching it.
+    The version is the CSV's hash, extended by the projection and filter when
+    they differ from the default.
+    """
+    data_path, meta = ensure_columnar(csv_path, cache_dir, progress)
+    columns = default_columns() if columns is None else list(columns)
+    where = normalize_where(where)
+    df = read_columnar(data_path, columns, where, meta['batches'])
+    df.attrs['version'] = meta['sha256']
+    if columns != default_columns() or where:
+        projection = json.dumps([columns, sorted((col, list(v)) for col, v in where.items())], default=str)
+        df.attrs['version'] = hashlib.sha256((meta['sha256'] + projection).encode()).hexdigest()
+    df.attrs['data_path'] = data_path
+    df.attrs['source'] = dict(meta['source'])
+    return df
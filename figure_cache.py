@@ -0,0 +1,118 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_state(value):
+    """Turns widget state into a hashable, order-insensitive cache key component"""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), normalize_state(v)) for k, v in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(normalize_state(v) for v in value))
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_state(v) for v in value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class FigureStore:
+    """Built figures persisted as Plotly JSON in a shared cache backend.
+
+    With the SQLite backend every process on the host reads and fills the
+    same store. Keys embed the dataset version, so figures of an older
+    version are never served; they age out through the backend's eviction.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    @staticmethod
+    def _key(key):
+        return 'figure:' + hashlib.sha256(repr(key).encode()).hexdigest()
+
+    def get(self, key):
+        payload = self.cache.get(self._key(key))
+        if payload is None:
+            return None
+        import plotly.io as pio
+
+        return pio.from_json(payload, skip_invalid=True)
+
+    def put(self, key, figure):
+        import plotly.io as pio
+
+        self.cache.set(self._key(key), pio.to_json(figure))
+
+
+class FigureCache:
+    """A bounded, thread-safe LRU cache of built figures shared by all sessions.
+
+    Keys combine the view name, the dataset version and the normalized widget
+    state that determines the figure, so a rerun that only touches unrelated
+    widgets is served the figure built for an earlier rerun or session.
+    With a store, misses are looked up there before building and new figures
+    are written through, so figures precomputed by the warm-up worker or built
+    by another process are reused.
+    Cached figures are shared and must not be modified after they are built.
+    """
+
+    def __init__(self, max_entries=256, store=None):
+        self.max_entries = max_entries
+        self.store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(view, version, **state):
+        return (view, version, normalize_state(state))
+
+    def get_or_build(self, view, version, build, **state):
+        """Returns the cached figure for the state, building and storing it on a miss"""
+        key = self.key(view, version, **state)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        figure = self.store.get(key) if self.store is not None else None
+        from_store = figure is not None
+        if not from_store:
+            figure = build()
+            if self.store is not None:
+                self.store.put(key, figure)
+        with self._lock:
+            if from_store:
+                self.store_hits += 1
+            else:
+                self.misses += 1
+            self._entries[key] = figure
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return figure
+
+    def stats(self):
+        """Returns the hit/miss/eviction counters and the current size"""
+        with self._lock:
+            lookups = self.hits + self.store_hits + self.misses
+            return {
+                'hits': self.hits,
+                'store_hits': self.store_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'hit_rate': (self.hits + self.store_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+
+# Numeric columns the dashboard filters by range
+RANGE_COLUMNS = ['Study_Hours_per_Week', 'Attendance (%)']
+
+
+def _set_bits(bitmap, positions):
+    bitmap = bitmap.copy()
+    np.bitwise_or.at(bitmap, positions >> 3, (128 >> (positions & 7)).astype(np.uint8))
+    return bitmap
+
+
+def _clear_bits(bitmap, positions):
+    bitmap = bitmap.copy()
+    np.bitwise_and.at(bitmap, positions >> 3, ~(128 >> (positions & 7)).astype(np.uint8))
+    return bitmap
+
+
+def _group_positions(positions, values):
+    codes, uniques = pd.factorize(values)
+    for code, value in enumerate(uniques):
+        yield value, positions[codes == code]
+
+
+class FilterEngine:
+    """Resolves widget filters against precomputed indexes of one loaded dataset.
+
+    Every categorical column gets a packed row bitmap per value and every range
+    column a sorted index, so a combination of filters costs a few bitmap ANDs
+    and binary searches instead of one full-column comparison per widget.
+    """
+
+    def __init__(self, df, range_columns=RANGE_COLUMNS):
+        self.n_rows = len(df)
+        self.bitmaps = {}
+        self.sorted_indexes = {}
+
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                self.bitmaps[col] = self._build_bitmaps(df[col])
+        for col in range_columns:
+            if col in df.columns:
+                self.sorted_indexes[col] = self._build_sorted_index(df[col])
+
+    @staticmethod
+    def _build_bitmaps(series):
+        codes = series.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+        return {
+            value: np.packbits(codes == code)
+            for code, value in enumerate(series.cat.categories)
+            if counts[code] > 0
+        }
+
+    @staticmethod
+    def _build_sorted_index(series):
+        values = series.to_numpy(dtype='float64', na_value=np.nan)
+        order = np.argsort(values, kind='stable')
+        sorted_values = values[order]
+        # NaNs sort last and never satisfy a range predicate
+        n_valid = len(values) - int(np.isnan(values).sum())
+        return order[:n_valid], sorted_values[:n_valid]
+
+    def apply_delta(self, n_rows, removed_positions, removed_rows, added_positions, added_rows):
+        """Updates the indexes for changed rows without rescanning the dataset.
+
+        removed_rows holds the previous values at removed_positions (rows that
+        were corrected), added_rows the new values at added_positions (corrected
+        and appended rows); n_rows is the new row count. Indexes are replaced
+        rather than modified, so a shallow copy of an engine can be updated
+        while readers keep using the original.
+        """
+        removed_positions = np.asarray(removed_positions, dtype=np.int64)
+        added_positions = np.asarray(added_positions, dtype=np.int64)
+        n_bytes = (n_rows + 7) // 8
+
+        bitmaps = {}
+        for col, value_bitmaps in self.bitmaps.items():
+            value_bitmaps = dict(value_bitmaps)
+            if n_rows > self.n_rows:
+                for value, bitmap in value_bitmaps.items():
+                    value_bitmaps[value] = np.pad(bitmap, (0, n_bytes - len(bitmap)))
+            touched = set()
+            for value, positions in _group_positions(removed_positions, removed_rows[col].to_numpy()):
+                value_bitmaps[value] = _clear_bits(value_bitmaps[value], positions)
+                touched.add(value)
+            for value, positions in _group_positions(added_positions, added_rows[col].to_numpy()):
+                bitmap = value_bitmaps.get(value, np.zeros(n_bytes, dtype=np.uint8))
+                value_bitmaps[value] = _set_bits(bitmap, positions)
+                touched.add(value)
+            for value in touched:
+                if not value_bitmaps[value].any():
+                    del value_bitmaps[value]
+            bitmaps[col] = value_bitmaps
+
+        sorted_indexes = {}
+        for col, (order, sorted_values) in self.sorted_indexes.items():
+            if len(removed_positions):
+                keep = ~np.isin(order, removed_positions)
+                order, sorted_values = order[keep], sorted_values[keep]
+            values = added_rows[col].to_numpy(dtype='float64', na_value=np.nan)
+            valid = ~np.isnan(values)
+            values, positions = values[valid], added_positions[valid]
+            insert_at = np.searchsorted(sorted_values, values, side='right')
+            sorted_indexes[col] = (np.insert(order, insert_at, positions),
+                                   np.insert(sorted_values, insert_at, values))
+
+        self.n_rows = n_rows
+        self.bitmaps = bitmaps
+        self.sorted_indexes = sorted_indexes
+
+    def options(self, col):
+        """Returns the sorted values present in a categorical column"""
+        return sorted(self.bitmaps[col])
+
+    def value_range(self, col):
+        """Returns the (min, max) of a range column, ignoring missing values"""
+        _, sorted_values = self.sorted_indexes[col]
+        if len(sorted_values) == 0:
+            return np.nan, np.nan
+        return sorted_values[0], sorted_values[-1]
+
+    def _category_bitmap(self, col, selected):
+        if isinstance(selected, (list, tuple, set)):
+            bitmap = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+            for value in selected:
+                if value in self.bitmaps[col]:
+                    np.bitwise_or(bitmap, self.bitmaps[col][value], out=bitmap)
+            return bitmap
+        if selected in self.bitmaps[col]:
+            return self.bitmaps[col][selected]
+        return np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+
+    def _range_bitmap(self, col, bounds):
+        order, sorted_values = self.sorted_indexes[col]
+        low, high = bounds
+        start = 0 if low is None else np.searchsorted(sorted_values, low, side='left')
+        stop = len(sorted_values) if high is None else np.searchsorted(sorted_values, high, side='right')
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[order[start:stop]] = True
+        return np.packbits(mask)
+
+    def _is_noop(self, col, selected):
+        if selected is None or (isinstance(selected, str) and selected == 'All'):
+            return True
+        # A range is always applied: even a full one drops rows with missing values
+        return col in self.bitmaps and isinstance(selected, (list, tuple, set)) \
+            and set(self.bitmaps[col]).issubset(selected)
+
+    def bitmap(self, filters):
+        """Returns the packed bitmap of rows matching every filter, or None if nothing is filtered.
+
+        filters maps a column to a category value, a list of values, 'All'/None
+        (no filter), or a (low, high) inclusive range where either bound may be None.
+        """
+        result = None
+        for col, selected in filters.items():
+            if self._is_noop(col, selected):
+                continue
+            if col in self.bitmaps:
+                bitmap = self._category_bitmap(col, selected)
+            elif col in self.sorted_indexes:
+                bitmap = self._range_bitmap(col, selected)
+            else:
+                raise KeyError(f"No index for filter column '{col}'")
+            result = bitmap.copy() if result is None else np.bitwise_and(result, bitmap, out=result)
+        return result
+
+    def mask(self, filters):
+        """Returns a boolean row mask for the filters, or None if nothing is filtered"""
+        bitmap = self.bitmap(filters)
+        if bitmap is None:
+            return None
+        return np.unpackbits(bitmap, count=self.n_rows).view(bool)
+
+    def rows(self, filters):
+        """Returns the positions of rows matching the filters"""
+        bitmap = self.bitmap(filters)
+        if bitmap is None:
+            return np.arange(self.n_rows)
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.n_rows))
@@ -0,0 +1,48 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from profiling import stage
+
+# Threads shared by every session for independent panel computations
+PANEL_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+
+
+def panel_pool(max_workers=PANEL_WORKERS):
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='panel')
+
+
+class PanelScheduler:
+    """Computes a section's independent panels concurrently and renders each as soon as it is ready.
+
+    submit() starts a computation on the pool straight away; run() then
+    renders the results on the calling (script) thread in completion order,
+    so a fast panel is drawn while slower ones are still computing.
+    Computations must not call Streamlit. Renders should write into a
+    placeholder created beforehand, which keeps the page layout independent
+    of the completion order.
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+        self._pending = {}
+
+    def submit(self, name, compute, render):
+        def timed():
+            with stage(name):
+                return compute()
+
+        # Run in a copy of this context so the worker's stage lands in the rerun's profile
+        future = self.executor.submit(contextvars.copy_context().run, timed)
+        self._pending[future] = (name, render)
+        return future
+
+    def run(self):
+        """Renders every submitted panel as its computation finishes"""
+        try:
+            for future in as_completed(self._pending):
+                name, render = self._pending[future]
+                with stage(f"{name}_render"):
+                    render(future.result())
+        finally:
+            self._pending.clear()
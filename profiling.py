@@ -0,0 +1,271 @@
+"""Per-rerun timing of the dashboard's stages, with a structured log and a local metrics endpoint.
+
+Each rerun gets a RerunProfile; code inside it marks stages with
+``with stage('figure'):`` and every stage is recorded under the current
+section with its wall time and, while memory tracing is on, the bytes it
+allocated and its peak. Finished reruns are written as JSON lines to the
+file named by DASHBOARD_PROFILE_LOG and folded into a per-process registry
+of recent timings, which DASHBOARD_METRICS_PORT serves over HTTP:
+
+    DASHBOARD_PROFILE_LOG=profile.jsonl DASHBOARD_METRICS_PORT=9108 streamlit run app.py
+    curl localhost:9108/metrics
+    python profiling.py profile.jsonl      # p50/p95 per section and stage
+"""
+import argparse
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Path of the JSON-lines stage log ("-" for stderr); unset disables it
+PROFILE_LOG_ENV = 'DASHBOARD_PROFILE_LOG'
+# Local port serving /metrics (Prometheus text) and /metrics.json; unset disables it
+METRICS_PORT_ENV = 'DASHBOARD_METRICS_PORT'
+
+# Recent timings kept per (section, stage) for the percentiles
+METRICS_WINDOW = 1000
+QUANTILES = (0.5, 0.95, 0.99)
+
+logger = logging.getLogger('dashboard.profile')
+
+_current = contextvars.ContextVar('rerun_profile', default=None)
+
+# tracemalloc is process-wide: started for the first open rerun tracing memory,
+# stopped after the last one closes unless it was already running
+_tracing_lock = threading.Lock()
+_tracing_reruns = 0
+_started_tracing = False
+
+
+def _acquire_tracing():
+    global _tracing_reruns, _started_tracing
+    with _tracing_lock:
+        if _tracing_reruns == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracing_reruns += 1
+
+
+def _release_tracing():
+    global _tracing_reruns, _started_tracing
+    with _tracing_lock:
+        _tracing_reruns -= 1
+        if _tracing_reruns == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+class RerunProfile:
+    """Stage timings of one rerun.
+
+    Stages are flat: a stage must not be entered inside another one, though
+    stages may run concurrently on panel threads. Memory is measured with
+    tracemalloc, which covers every thread of the process, so figures of
+    concurrent stages and sessions overlap. A profile tracing memory keeps
+    tracemalloc running until it is closed.
+    """
+
+    def __init__(self, session=None, trace_memory=False):
+        self.rerun = uuid.uuid4().hex[:12]
+        self.session = session
+        self.trace_memory = trace_memory
+        self.started = time.time()
+        self.records = []
+        self.section_name = 'app'
+        self.closed = False
+        if trace_memory:
+            _acquire_tracing()
+
+    def close(self):
+        """Releases memory tracing; later calls do nothing"""
+        if not self.closed:
+            self.closed = True
+            if self.trace_memory:
+                _release_tracing()
+
+    @contextlib.contextmanager
+    def section(self, name):
+        previous, self.section_name = self.section_name, name
+        try:
+            yield
+        finally:
+            self.section_name = previous
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {'section': self.section_name, 'stage': name, 'seconds': time.perf_counter() - start}
+            # Skipped rather than recorded as zero if tracing was stopped elsewhere meanwhile
+            if tracing and tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                record['alloc_bytes'] = current - before
+                record['peak_bytes'] = peak - before
+            self.records.append(record)
+
+    def total_seconds(self):
+        return sum(r['seconds'] for r in self.records)
+
+    def to_rows(self):
+        """Returns one dict per stage, tagged with the rerun, session and start time"""
+        return [{'ts': self.started, 'rerun': self.rerun, 'session': self.session, **r} for r in self.records]
+
+
+def start_rerun(session=None, trace_memory=False):
+    """Starts profiling a rerun on the current thread; returns its profile.
+
+    The profile must be closed, by finish_rerun or its close(), even when the
+    rerun stops early, so memory tracing ends with the last rerun using it.
+    """
+    profile = RerunProfile(session, trace_memory)
+    _current.set(profile)
+    return profile
+
+
+def current_profile():
+    return _current.get()
+
+
+def stage(name):
+    """Times a stage of the current rerun; does nothing outside a profiled rerun"""
+    profile = _current.get()
+    return profile.stage(name) if profile is not None else contextlib.nullcontext()
+
+
+def section(name):
+    profile = _current.get()
+    return profile.section(name) if profile is not None else contextlib.nullcontext()
+
+
+class MetricsRegistry:
+    """The last METRICS_WINDOW timings of every (section, stage), for percentiles"""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._counts = {}
+
+    def observe(self, section_name, stage_name, seconds):
+        key = (section_name, stage_name)
+        with self._lock:
+            self._timings.setdefault(key, deque(maxlen=self.window)).append(seconds)
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def observe_rerun(self, profile):
+        for r in profile.records:
+            self.observe(r['section'], r['stage'], r['seconds'])
+
+    def summary(self):
+        """Returns count, percentiles and max of the recent timings per (section, stage)"""
+        with self._lock:
+            items = [(key, np.array(timings), self._counts[key]) for key, timings in self._timings.items()]
+        rows = []
+        for (section_name, stage_name), timings, count in sorted(items):
+            row = {'section': section_name, 'stage': stage_name, 'count': count, 'max': float(timings.max())}
+            for q, value in zip(QUANTILES, np.quantile(timings, QUANTILES)):
+                row[f"p{round(q * 100)}"] = float(value)
+            rows.append(row)
+        return rows
+
+    def prometheus(self):
+        """Renders the summary in the Prometheus text format"""
+        lines = ["# HELP dashboard_stage_seconds Wall time of a dashboard stage per rerun",
+                 "# TYPE dashboard_stage_seconds summary"]
+        for row in self.summary():
+            labels = f'section="{row["section"]}",stage="{row["stage"]}"'
+            for q in QUANTILES:
+                lines.append(f'dashboard_stage_seconds{{{labels},quantile="{q}"}} {row[f"p{round(q * 100)}"]:.6f}')
+            lines.append(f'dashboard_stage_seconds_count{{{labels}}} {row["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = MetricsRegistry()
+
+
+def _configure_log(path):
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler() if path == '-' else logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def finish_rerun(profile, registry=METRICS):
+    """Records a finished rerun in the registry and, when configured, the stage log"""
+    _current.set(None)
+    profile.close()
+    registry.observe_rerun(profile)
+    path = os.environ.get(PROFILE_LOG_ENV)
+    if path:
+        _configure_log(path)
+        for row in profile.to_rows():
+            logger.info(json.dumps(row))
+
+
+def serve_metrics(port, registry=METRICS, host='127.0.0.1'):
+    """Serves the registry on a background thread; returns the server"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = registry.prometheus(), 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                body, content_type = json.dumps(registry.summary()), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            payload = body.encode()
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def summarize_log(path):
+    """Returns p50/p95/p99, max and count per (section, stage) from a stage log"""
+    registry = MetricsRegistry(window=None)
+    with open(path) as f:
+        for line in f:
+            row = json.loads(line)
+            registry.observe(row['section'], row['stage'], row['seconds'])
+    return registry.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarizes a stage log written through DASHBOARD_PROFILE_LOG")
+    parser.add_argument('log', help="JSON-lines stage log")
+    args = parser.parse_args()
+    print(f"{'section':<22} {'stage':<18} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for row in summarize_log(args.log):
+        print(f"{row['section']:<22} {row['stage']:<18} {row['count']:>7} {row['p50'] * 1000:9.1f} "
+              f"{row['p95'] * 1000:9.1f} {row['p99'] * 1000:9.1f} {row['max'] * 1000:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
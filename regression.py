@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+
+def _as_float(values):
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype='float64', na_value=np.nan)
+    return np.asarray(values, dtype='float64')
+
+
+class RegressionStats:
+    """Mergeable sufficient statistics for a simple linear regression of y on x.
+
+    Holds the pair count, the means and the centered sums of squares and
+    cross-products, which are numerically stable and combine exactly across
+    chunks (Chan et al.), so a fit over many chunks or cached aggregates
+    equals the fit over the concatenated rows. Pairs with a missing x or y
+    are skipped.
+    """
+
+    def __init__(self, n=0, mean_x=0.0, mean_y=0.0, sxx=0.0, syy=0.0, sxy=0.0):
+        self.n = int(n)
+        self.mean_x = float(mean_x)
+        self.mean_y = float(mean_y)
+        self.sxx = float(sxx)
+        self.syy = float(syy)
+        self.sxy = float(sxy)
+
+    @classmethod
+    def from_arrays(cls, x, y):
+        x, y = _as_float(x), _as_float(y)
+        valid = ~(np.isnan(x) | np.isnan(y))
+        x, y = x[valid], y[valid]
+        if len(x) == 0:
+            return cls()
+        mean_x, mean_y = x.mean(), y.mean()
+        dx, dy = x - mean_x, y - mean_y
+        return cls(len(x), mean_x, mean_y, dx @ dx, dy @ dy, dx @ dy)
+
+    @classmethod
+    def from_sums(cls, n, sum_x, sum_y, sum_xx, sum_yy, sum_xy):
+        """Builds the statistics from raw sums, e.g. stored in a pre-aggregated cube"""
+        if n == 0:
+            return cls()
+        return cls(n, sum_x / n, sum_y / n,
+                   sum_xx - sum_x * sum_x / n,
+                   sum_yy - sum_y * sum_y / n,
+                   sum_xy - sum_x * sum_y / n)
+
+    def merge(self, other):
+        """Returns the statistics of the union of both samples"""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            return other
+        n = self.n + other.n
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        weight = self.n * other.n / n
+        return RegressionStats(
+            n,
+            self.mean_x + dx * other.n / n,
+            self.mean_y + dy * other.n / n,
+            self.sxx + other.sxx + dx * dx * weight,
+            self.syy + other.syy + dy * dy * weight,
+            self.sxy + other.sxy + dx * dy * weight,
+        )
+
+    __add__ = merge
+
+    def fit(self):
+        """Returns slope, intercept, r, r², their standard errors and the residual standard error.
+
+        Values that are undefined for the sample (fewer than two or three
+        pairs, or a constant x or y) are NaN.
+        """
+        n = self.n
+        slope = self.sxy / self.sxx if self.sxx > 0 else np.nan
+        intercept = self.mean_y - slope * self.mean_x
+        r = self.sxy / np.sqrt(self.sxx * self.syy) if self.sxx > 0 and self.syy > 0 else np.nan
+        if n > 2 and self.sxx > 0:
+            sse = max(self.syy - slope * self.sxy, 0.0)
+            residual_se = np.sqrt(sse / (n - 2))
+            slope_se = residual_se / np.sqrt(self.sxx)
+            intercept_se = residual_se * np.sqrt(1 / n + self.mean_x ** 2 / self.sxx)
+        else:
+            residual_se = slope_se = intercept_se = np.nan
+        return {
+            'n': n,
+            'slope': slope,
+            'intercept': intercept,
+            'r': r,
+            'r2': r * r,
+            'slope_se': slope_se,
+            'intercept_se': intercept_se,
+            'residual_se': residual_se,
+        }
+
+    def predict(self, x):
+        fit = self.fit()
+        return fit['intercept'] + fit['slope'] * _as_float(x)
+
+    def confidence_band(self, x, level=0.95):
+        """Returns the fitted line and the lower/upper confidence band of the mean response at x"""
+        from scipy.stats import t
+
+        fit = self.fit()
+        x = _as_float(x)
+        fitted = fit['intercept'] + fit['slope'] * x
+        if self.n <= 2 or self.sxx <= 0:
+            return fitted, np.full_like(fitted, np.nan), np.full_like(fitted, np.nan)
+        half_width = t.ppf((1 + level) / 2, self.n - 2) * fit['residual_se'] * \
+            np.sqrt(1 / self.n + (x - self.mean_x) ** 2 / self.sxx)
+        return fitted, fitted - half_width, fitted + half_width
+
+
+def regression_by_group(x, y, groups):
+    """Returns {group: RegressionStats} for every group, in one vectorized pass per statistic.
+
+    Groups with a missing key are skipped, like groupby's default.
+    """
+    x, y = _as_float(x), _as_float(y)
+    if not isinstance(groups, (pd.Series, pd.Index)):
+        groups = np.asarray(groups)
+    codes, uniques = pd.factorize(groups, sort=True)
+    valid = (codes >= 0) & ~(np.isnan(x) | np.isnan(y))
+    codes, x, y = codes[valid], x[valid], y[valid]
+    size = len(uniques)
+
+    n = np.bincount(codes, minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = np.bincount(codes, weights=x, minlength=size) / n
+        mean_y = np.bincount(codes, weights=y, minlength=size) / n
+    dx, dy = x - mean_x[codes], y - mean_y[codes]
+    sxx = np.bincount(codes, weights=dx * dx, minlength=size)
+    syy = np.bincount(codes, weights=dy * dy, minlength=size)
+    sxy = np.bincount(codes, weights=dx * dy, minlength=size)
+    return {
+        group: RegressionStats(n[i], mean_x[i], mean_y[i], sxx[i], syy[i], sxy[i])
+        for i, group in enumerate(uniques) if n[i] > 0
+    }
+
+
+def regression_table(stats_by_group):
+    """Returns one row of fit results per group"""
+    return pd.DataFrame({group: stats.fit() for group, stats in stats_by_group.items()}).T
@@ -0,0 +1,220 @@
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+# Traces with more points than this are drawn with WebGL instead of SVG
+WEBGL_THRESHOLD = 2000
+
+# Default cap on the number of raw points shipped to the browser per chart
+MAX_RENDERED_POINTS = 10000
+
+# Bins per histogram drawn from a sketch
+HISTOGRAM_BINS = 40
+
+SAMPLED = "Sampled points"
+DENSITY = "Density"
+LARGE_PLOT_MODES = [SAMPLED, DENSITY]
+
+
+def _tukey_outliers(values):
+    q1, q3 = np.nanpercentile(values, [25, 75])
+    iqr = q3 - q1
+    return (values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)
+
+
+def sample_rows(x, y, max_points, bins=64, seed=0):
+    """Returns positions of at most max_points rows that preserve the 2D point density.
+
+    Points outside the Tukey fences of either axis are always kept (up to a
+    tenth of the budget, or more when the other points cannot fill the rest),
+    every occupied cell of a bins x bins grid keeps at least one point so
+    sparse regions stay visible, and the remaining budget is drawn uniformly
+    so dense regions stay proportionally dense. Sampling is seeded, so the
+    same data always yields the same points.
+    """
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    rows = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    if len(rows) <= max_points:
+        return rows
+
+    rng = np.random.default_rng(seed)
+    x, y = x[rows], y[rows]
+    outlier = _tukey_outliers(x) | _tukey_outliers(y)
+    kept, rest, x, y = rows[outlier], rows[~outlier], x[~outlier], y[~outlier]
+    # Budget the other rows cannot use goes to the outliers
+    outlier_budget = max(max_points // 10, max_points - len(rest))
+    if len(kept) > outlier_budget:
+        kept = rng.choice(kept, outlier_budget, replace=False)
+    budget = min(max_points - len(kept), len(rest))
+
+    x_bin = np.clip(((x - x.min()) / (np.ptp(x) or 1) * bins).astype(np.int64), 0, bins - 1)
+    y_bin = np.clip(((y - y.min()) / (np.ptp(y) or 1) * bins).astype(np.int64), 0, bins - 1)
+    shuffled = rng.permutation(len(rest))
+    _, first = np.unique((x_bin * bins + y_bin)[shuffled], return_index=True)
+    per_cell = shuffled[first]
+    if len(per_cell) >= budget:
+        chosen = rng.choice(per_cell, budget, replace=False)
+    else:
+        others = np.setdiff1d(shuffled, per_cell, assume_unique=True)
+        chosen = np.concatenate([per_cell, rng.choice(others, budget - len(per_cell), replace=False)])
+    return np.sort(np.concatenate([kept, rest[chosen]]))
+
+
+def density_figure(df, x, y, bins=60, title=None):
+    """Draws a 2D histogram binned on the server, so no raw points are shipped"""
+    values = df[[x, y]].astype('float64').dropna()
+    counts, x_edges, y_edges = np.histogram2d(values[x], values[y], bins=bins)
+    fig = go.Figure(go.Heatmap(
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        z=np.where(counts.T > 0, counts.T, np.nan),
+        colorscale='Viridis',
+        colorbar=dict(title='Students'),
+        hovertemplate=f"{x}: %{{x:.1f}}<br>{y}: %{{y:.1f}}<br>Students: %{{z}}<extra></extra>",
+    ))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig
+
+
+def scatter_figure(df, x, y, max_points=MAX_RENDERED_POINTS, mode=SAMPLED, title=None, **px_kwargs):
+    """Builds px.scatter, switching to WebGL and downsampling or binning large inputs.
+
+    Below max_points every row is drawn. Above it, mode SAMPLED draws the rows
+    picked by sample_rows (with their hover details) and DENSITY draws a
+    server-side 2D histogram instead of points.
+    """
+    n = len(df)
+    if n > max_points and mode == DENSITY:
+        return density_figure(df, x, y, title=f"{title} (density of {n:,} students)" if title else None)
+    if n > max_points:
+        df = df.iloc[sample_rows(df[x], df[y], max_points)]
+        if title:
+            title = f"{title} (showing {len(df):,} of {n:,})"
+    return px.scatter(
+        df, x=x, y=y, title=title,
+        render_mode='webgl' if len(df) > WEBGL_THRESHOLD else 'svg',
+        **px_kwargs
+    )
+
+
+def box_figure(stats, x, y, outliers=None, title=None, colors=px.colors.qualitative.Bold):
+    """Draws one notched box per x category from precomputed box statistics.
+
+    stats has a row per category with the columns of sketches.BOX_STATISTICS.
+    outliers, when given, holds the values beyond the fences with their
+    student counts and is drawn as one marker per distinct value, so no raw
+    values are shipped to the browser.
+    """
+    fig = go.Figure()
+    for i, row in enumerate(stats.to_dict('records')):
+        category, color = row[x], colors[i % len(colors)]
+        fig.add_trace(go.Box(
+            x=[category], q1=[row['q1']], median=[row['median']], q3=[row['q3']],
+            lowerfence=[row['lowerfence']], upperfence=[row['upperfence']], mean=[row['mean']],
+            notchspan=[row['notchspan']], notched=True, name=str(category),
+            marker_color=color, boxpoints=False, legendgroup=str(category),
+        ))
+        if outliers is not None:
+            points = outliers[outliers[x] == category]
+            fig.add_trace(go.Scatter(
+                x=np.full(len(points), str(category)), y=points['value'], customdata=points['count'],
+                mode='markers', marker=dict(size=6, opacity=0.6, color=color), name=str(category),
+                legendgroup=str(category), showlegend=False,
+                hovertemplate=f"{y}: %{{y}}<br>Students: %{{customdata}}<extra>{category}</extra>",
+            ))
+    students = int(stats['count'].sum())
+    fig.update_layout(title=f"{title} ({students:,} students)" if title else None, xaxis_title=x, yaxis_title=y)
+    return fig
+
+
+def histogram_figure(hist, stats, color, title=None, x_label=None, y_label=None, histnorm=None,
+                     colors=px.colors.qualitative.Bold):
+    """Draws binned counts as stacked bars per color group, with a marginal box per group above them.
+
+    hist has (color, start, end, count) rows and stats the box statistics per
+    color group, both computed on the server, as sketches.QuantileSketches
+    returns them. With histnorm='percent' each group's bars sum to 100, as in
+    px.histogram.
+    """
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.25, 0.75], vertical_spacing=0.02)
+    boxes = {row[color]: row for row in stats.to_dict('records')}
+    for i, (group, bins) in enumerate(hist.groupby(color, observed=True, sort=True)):
+        trace_color, name = colors[i % len(colors)], str(group)
+        heights = bins['count'] / bins['count'].sum() * 100 if histnorm == 'percent' else bins['count']
+        fig.add_trace(go.Bar(
+            x=(bins['start'] + bins['end']) / 2, y=heights, width=bins['end'] - bins['start'],
+            customdata=np.column_stack([bins['start'], bins['end']]), name=name,
+            marker_color=trace_color, legendgroup=name,
+            hovertemplate=f"%{{customdata[0]:.2f}} to %{{customdata[1]:.2f}}: %{{y:.2f}}<extra>{name}</extra>",
+        ), row=2, col=1)
+        if group in boxes:
+            box = boxes[group]
+            fig.add_trace(go.Box(
+                y=[name], q1=[box['q1']], median=[box['median']], q3=[box['q3']],
+                lowerfence=[box['lowerfence']], upperfence=[box['upperfence']], orientation='h',
+                name=name, marker_color=trace_color, legendgroup=name, showlegend=False,
+            ), row=1, col=1)
+    fig.update_layout(title=title, barmode='relative', bargap=0)
+    fig.update_xaxes(title_text=x_label, row=2, col=1)
+    fig.update_yaxes(title_text=y_label, row=2, col=1)
+    fig.update_yaxes(showticklabels=False, row=1, col=1)
+    return fig
+
+
+def contrast_text_colors(z, colorscale, zmin, zmax):
+    """Returns 'white' or 'black' per cell, whichever reads better on the cell's colorscale color"""
+    scale = px.colors.get_colorscale(colorscale)
+    positions = np.array([p for p, _ in scale])
+    rgb, _ = px.colors.convert_colors_to_same_type([c for _, c in scale], 'tuple')
+    rgb = np.array(rgb)
+    t = np.clip((z - zmin) / ((zmax - zmin) or 1), 0, 1)
+    # Relative luminance of the interpolated cell colors, one channel at a time
+    luminance = sum(weight * np.interp(t, positions, rgb[:, c])
+                    for c, weight in enumerate((0.299, 0.587, 0.114)))
+    return np.where(luminance < 0.55, 'white', 'black')
+
+
+def heatmap_figure(matrix, colorscale, title=None, zmin=None, zmax=None, text_format=None,
+                   hide_zeros=False, color_label=None, x_label=None, y_label=None):
+    """Draws a DataFrame as a heatmap with optional printf-style cell labels (e.g. '%d', '%.2f').
+
+    Cell labels are batched into text traces with contrast colors computed
+    up front, instead of one layout annotation per cell, so building the
+    figure stays fast for large (100 x 100 and beyond) matrices.
+    """
+    z = matrix.to_numpy(dtype='float64')
+    zmin = np.nanmin(z) if zmin is None else zmin
+    zmax = np.nanmax(z) if zmax is None else zmax
+    x = [str(c) for c in matrix.columns]
+    y = [str(i) for i in matrix.index]
+
+    fig = go.Figure(go.Heatmap(
+        z=z, x=x, y=y, zmin=zmin, zmax=zmax, colorscale=colorscale,
+        colorbar=dict(title=color_label),
+        hovertemplate=f"{x_label or 'x'}: %{{x}}<br>{y_label or 'y'}: %{{y}}<br>"
+                      f"{color_label or 'value'}: %{{z}}<extra></extra>",
+    ))
+
+    if text_format is not None:
+        shown = ~np.isnan(z)
+        if hide_zeros:
+            shown &= z != 0
+        rows, cols = np.nonzero(shown)
+        values = z[rows, cols]
+        labels = np.char.mod(text_format, values)
+        colors = contrast_text_colors(values, colorscale, zmin, zmax)
+        x, y = np.asarray(x, dtype=object), np.asarray(y, dtype=object)
+        # One text trace per contrast color: Plotly validates per-point color arrays slowly
+        for color in np.unique(colors):
+            cells = colors == color
+            fig.add_trace(go.Scatter(
+                x=x[cols[cells]], y=y[rows[cells]], mode='text', text=labels[cells],
+                textfont=dict(color=color, size=11), hoverinfo='skip', showlegend=False,
+            ))
+
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title=y_label)
+    fig.update_xaxes(type='category', showgrid=False)
+    fig.update_yaxes(type='category', autorange='reversed', showgrid=False)
+    return fig
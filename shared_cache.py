@@ -0,0 +1,245 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from datastore import CACHE_DIR, file_lock
+from figure_cache import normalize_state
+
+# Aggregates and figures shared by every dashboard process on the host
+SHARED_CACHE_PATH = os.path.join(CACHE_DIR, 'shared.sqlite')
+SHARED_CACHE_MAX_BYTES = 1 << 30
+SHARED_CACHE_TTL = 7 * 24 * 3600
+
+# Hits refresh an entry's last-access time only when it is older than this, so
+# reads rarely take SQLite's write lock; eviction order is this coarse too
+ACCESS_RESOLUTION = 60
+
+# Selects the backend: "sqlite" (default), "sqlite:<path>" or "memory"
+CACHE_BACKEND_ENV = 'DASHBOARD_CACHE'
+
+
+def content_key(*parts):
+    """Returns a stable hash of the parts, e.g. a kind, a dataset version and widget state.
+
+    Parts are normalized like figure cache keys, so equal state in a different
+    order or container type maps to the same key in every process.
+    """
+    return hashlib.sha256(repr(normalize_state(parts)).encode()).hexdigest()
+
+
+class CacheBackend:
+    """Key-value store for pickled values with a time-to-live and a size bound.
+
+    get_or_compute holds a per-key lock while computing, so concurrent callers
+    (threads or, for shared backends, processes) compute a value only once.
+    """
+
+    # Whether values stored by one process are seen by the others
+    shared = False
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+    def lock(self, key):
+        raise NotImplementedError
+
+    def get_or_compute(self, key, compute, ttl=None):
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        with self.lock(key):
+            value = self.get(key, missing)
+            if value is missing:
+                value = compute()
+                self.set(key, value, ttl)
+            return value
+
+
+class MemoryCache(CacheBackend):
+    """A per-process backend: an LRU dict bounded by entry count"""
+
+    def __init__(self, max_entries=1024, default_ttl=SHARED_CACHE_TTL):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires is not None and expires < time.time():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl if ttl else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'entries': len(self._entries)}
+
+    def lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+
+class SQLiteCache(CacheBackend):
+    """A backend shared by all processes on the host, stored in one SQLite file.
+
+    SQLite's write-ahead log lets readers proceed while another process
+    writes; reads run in deferred transactions and only write back an access
+    time once it is ACCESS_RESOLUTION seconds stale. Expired entries are
+    dropped on access, and once the stored values exceed max_bytes the least
+    recently used entries are evicted. Per-key compute locks are advisory file
+    locks next to the database.
+    """
+
+    shared = True
+
+    def __init__(self, path=SHARED_CACHE_PATH, max_bytes=SHARED_CACHE_MAX_BYTES, default_ttl=SHARED_CACHE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connection() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires REAL,
+                accessed REAL NOT NULL
+            )""")
+            db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def _connection(self, write=True):
+        # One connection per thread and process; a forked worker opens its own
+        if getattr(self._local, 'pid', None) != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db, self._local.pid = db, os.getpid()
+        return _Transaction(self._local.db, write)
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._connection(write=False) as db:
+            row = db.execute("SELECT value, expires, accessed FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return default
+        blob, expires, accessed = row
+        if expires is not None and expires < now:
+            # Another process may have stored a fresh value since the read
+            with self._connection() as db:
+                db.execute("DELETE FROM entries WHERE key = ? AND expires < ?", (key, now))
+            return default
+        if accessed < now - ACCESS_RESOLUTION:
+            with self._connection() as db:
+                db.execute("UPDATE entries SET accessed = ? WHERE key = ? AND accessed < ?",
+                           (now, key, now - ACCESS_RESOLUTION))
+        return pickle.loads(blob)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._connection() as db:
+            db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                       (key, blob, len(blob), now + ttl if ttl else None, now))
+            db.execute("DELETE FROM entries WHERE expires IS NOT NULL AND expires < ?", (now,))
+            self._evict(db)
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess, victims = total - self.max_bytes, []
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        db.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def delete(self, key):
+        with self._connection() as db:
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._connection() as db:
+            db.execute("DELETE FROM entries")
+
+    def stats(self):
+        with self._connection(write=False) as db:
+            entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {'backend': 'sqlite', 'path': self.path, 'entries': entries, 'bytes': size}
+
+    def lock(self, key):
+        return file_lock(os.path.join(os.path.dirname(self.path) or '.', 'locks', f"{content_key(key)}.lock"))
+
+
+class _Transaction:
+    """Runs the block in one transaction.
+
+    Write transactions begin immediately, so concurrent writers queue on
+    SQLite's lock; read-only ones are deferred and never take it.
+    """
+
+    def __init__(self, db, write=True):
+        self.db = db
+        self.write = write
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE" if self.write else "BEGIN DEFERRED")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("COMMIT" if exc_type is None else "ROLLBACK")
+
+
+def open_cache(spec=None):
+    """Opens the backend named by spec or the DASHBOARD_CACHE environment variable"""
+    spec = spec or os.environ.get(CACHE_BACKEND_ENV, 'sqlite')
+    if spec == 'memory':
+        return MemoryCache()
+    if spec == 'sqlite':
+        return SQLiteCache()
+    if spec.startswith('sqlite:'):
+        return SQLiteCache(spec[len('sqlite:'):])
+    raise ValueError(f"Unknown cache backend '{spec}'")
@@ -0,0 +1,184 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+# Bucket width per sketched column, in the column's units. Quantiles, extrema
+# and means read from a sketch are within half a bucket of the exact values.
+SKETCH_RESOLUTIONS = {'Sleep_Hours_per_Night': 0.05, 'Improvement': 0.1}
+
+# The dashboard's department and grade filters plus the batch report's dimensions
+SKETCH_DIMENSIONS = ['Department', 'Gender', 'Family_Income_Level', 'Grade']
+
+# Box statistics summary() returns per group
+BOX_STATISTICS = ['count', 'mean', 'min', 'q1', 'median', 'q3', 'max', 'lowerfence', 'upperfence', 'notchspan']
+
+
+def column_values(df, column):
+    """A sketched column as float64, deriving Improvement (final minus midterm score)"""
+    if column == 'Improvement' and column not in df.columns:
+        return (df['Final_Score'].to_numpy(dtype='float64', na_value=np.nan)
+                - df['Midterm_Score'].to_numpy(dtype='float64', na_value=np.nan))
+    return df[column].to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _has_column(df, column):
+    return column in df.columns or (column == 'Improvement' and {'Final_Score', 'Midterm_Score'} <= set(df.columns))
+
+
+def weighted_quantiles(values, counts, qs):
+    """Quantiles of values repeated counts times, interpolated linearly as pandas does"""
+    cumulative = np.cumsum(counts)
+    positions = (cumulative[-1] - 1) * np.asarray(qs, dtype='float64')
+    below = values[np.searchsorted(cumulative, np.floor(positions), side='right')]
+    above = values[np.searchsorted(cumulative, np.ceil(positions), side='right')]
+    return below + (above - below) * (positions - np.floor(positions))
+
+
+def box_statistics(values, counts):
+    """Quartiles, Tukey fences and notch half-width of sorted values with their counts"""
+    n = counts.sum()
+    q1, median, q3 = weighted_quantiles(values, counts, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {
+        'count': int(n), 'mean': (values * counts).sum() / n,
+        'min': values[0], 'q1': q1, 'median': median, 'q3': q3, 'max': values[-1],
+        'lowerfence': inside.min(), 'upperfence': inside.max(),
+        'notchspan': 1.57 * iqr / np.sqrt(n),
+    }
+
+
+class QuantileSketches:
+    """Fixed-width histograms of numeric columns per group, read as quantile sketches.
+
+    Every non-missing value is counted in the bucket of width
+    SKETCH_RESOLUTIONS[column] centred on the nearest multiple of that width,
+    once per combination of dimension values. Bucket counts are exact, so
+    sketches merge and take deltas (removed rows included) by adding counts,
+    and their size depends on the number of occupied buckets rather than the
+    number of students. Quantiles, box statistics and histograms read from
+    them are within error_bound(column) of those of the raw values.
+    """
+
+    def __init__(self, df, dimensions=SKETCH_DIMENSIONS, resolutions=SKETCH_RESOLUTIONS):
+        self.dimensions = [d for d in dimensions if d in df.columns]
+        self.resolutions = {col: width for col, width in resolutions.items() if _has_column(df, col)}
+        self.buckets = self._aggregate(df)
+
+    def _aggregate(self, df):
+        buckets = {}
+        for column, width in self.resolutions.items():
+            values = column_values(df, column)
+            valid = ~np.isnan(values)
+            keys = df.loc[valid, self.dimensions].assign(bucket=np.round(values[valid] / width).astype(np.int64))
+            counts = keys.groupby(self.dimensions + ['bucket'], observed=True, dropna=False, sort=False).size()
+            buckets[column] = counts.rename('count').reset_index()
+        return buckets
+
+    def apply_delta(self, removed_rows=None, added_rows=None):
+        """Subtracts the old and adds the new rows' bucket counts.
+
+        self.buckets is replaced, not modified, so shallow copies stay consistent.
+        """
+        parts = []
+        if added_rows is not None and len(added_rows):
+            parts.append(self._aggregate(added_rows))
+        if removed_rows is not None and len(removed_rows):
+            removed = self._aggregate(removed_rows)
+            parts.append({column: frame.assign(count=-frame['count']) for column, frame in removed.items()})
+        if parts:
+            self._combine(parts)
+
+    def merge(self, other):
+        """Returns the sketches of both sets of rows together; neither is modified"""
+        if other.dimensions != self.dimensions or other.resolutions != self.resolutions:
+            raise ValueError("Cannot merge sketches with different dimensions or resolutions")
+        merged = copy.copy(self)
+        merged._combine([other.buckets])
+        return merged
+
+    def _combine(self, others):
+        buckets = {}
+        for column, frame in self.buckets.items():
+            parts = [frame.copy(deep=False)] + [other[column].copy(deep=False) for other in others]
+            for dim in self.dimensions:
+                if isinstance(parts[0][dim].dtype, pd.CategoricalDtype):
+                    categories = parts[0][dim].cat.categories
+                    for part in parts[1:]:
+                        categories = categories.union(part[dim].cat.categories)
+                    for part in parts:
+                        part[dim] = part[dim].cat.set_categories(categories.sort_values())
+            combined = pd.concat(parts, ignore_index=True)
+            combined = combined.groupby(self.dimensions + ['bucket'], observed=True, dropna=False,
+                                        sort=False)['count'].sum().reset_index()
+            buckets[column] = combined[combined['count'] != 0].reset_index(drop=True)
+        self.buckets = buckets
+
+    def error_bound(self, column):
+        """The largest difference between a value read from the sketch and the exact one"""
+        return self.resolutions[column] / 2
+
+    def distribution(self, column, by=(), where=None):
+        """Returns student counts per by group and bucket value, sorted by value within each group.
+
+        where maps a dimension to a value, a list of values or 'All'/None.
+        Rows with a missing value in any of the by dimensions are dropped.
+        """
+        frame = self.buckets[column]
+        mask = np.ones(len(frame), dtype=bool)
+        for col, selected in (where or {}).items():
+            if selected is None or (isinstance(selected, str) and selected == 'All'):
+                continue
+            if isinstance(selected, (list, tuple, set)):
+                mask &= frame[col].isin(list(selected)).to_numpy()
+            else:
+                mask &= (frame[col] == selected).to_numpy(dtype=bool, na_value=False)
+        counts = frame[mask].groupby(list(by) + ['bucket'], observed=True)['count'].sum()
+        counts = counts[counts > 0].reset_index()
+        counts['value'] = counts.pop('bucket') * self.resolutions[column]
+        return counts
+
+    def _groups(self, column, by, where):
+        counts = self.distribution(column, by, where)
+        if not by:
+            yield (), counts
+            return
+        for key, group in counts.groupby(list(by), observed=True, sort=True):
+            yield key, group
+
+    def summary(self, column, by=(), where=None):
+        """Returns BOX_STATISTICS per by group (one row when by is empty)"""
+        rows = []
+        for key, group in self._groups(column, by, where):
+            if len(group):
+                rows.append({**dict(zip(by, key)),
+                             **box_statistics(group['value'].to_numpy(), group['count'].to_numpy())})
+        return pd.DataFrame(rows, columns=list(by) + BOX_STATISTICS)
+
+    def outliers(self, column, by=(), where=None):
+        """Returns the bucket values outside each group's Tukey fences with their student counts"""
+        parts = []
+        for key, group in self._groups(column, by, where):
+            if len(group):
+                stats = box_statistics(group['value'].to_numpy(), group['count'].to_numpy())
+                parts.append(group[(group['value'] < stats['lowerfence']) | (group['value'] > stats['upperfence'])])
+        if not parts:
+            return pd.DataFrame(columns=list(by) + ['count', 'value'])
+        return pd.concat(parts, ignore_index=True)
+
+    def histogram(self, column, bins, by=(), where=None):
+        """Returns student counts in about `bins` equal-width bins spanning the selected values.
+
+        Bin edges fall on bucket edges, so the counts are exact for those edges.
+        """
+        counts = self.distribution(column, by, where)
+        width = self.resolutions[column]
+        if len(counts) == 0:
+            return pd.DataFrame(columns=list(by) + ['start', 'end', 'count'])
+        buckets = np.round(counts['value'].to_numpy() / width).astype(np.int64)
+        low = buckets.min()
+        per_bin = max(int(np.ceil((buckets.max() - low + 1) / bins)), 1)
+        counts['start'] = ((buckets - low) // per_bin * per_bin + low - 0.5) * width
+        counts['end'] = counts['start'] + per_bin * width
+        return counts.groupby(list(by) + ['start', 'end'], observed=True)['count'].sum().reset_index()
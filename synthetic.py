@@ -0,0 +1,105 @@
+"""Generates synthetic student datasets with the schema and distributions of the real export.
+
+A profile of every column (category frequencies, numeric quantiles, decimal
+places and the share of missing cells) is fitted from the bundled CSV, and
+rows are sampled from it in chunks, so arbitrarily large files are written in
+bounded memory:
+
+    python synthetic.py --rows 1000000 --out students_1m.csv
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from datastore import DATA_PATH, CHUNK_ROWS, SCHEMA, read_csv_typed
+
+# Points of the empirical CDF kept per numeric column
+PROFILE_QUANTILES = 201
+
+# Generated columns that are unique per student rather than sampled
+ID_COLUMNS = ['Student_ID', 'Email']
+
+
+def _decimals(values, max_decimals=4):
+    for decimals in range(max_decimals + 1):
+        scaled = values * 10 ** decimals
+        if np.allclose(scaled, np.round(scaled), atol=1e-3):
+            return decimals
+    return max_decimals
+
+
+def fit_profile(csv_path=DATA_PATH):
+    """Returns {column: distribution} describing each non-ID column of a CSV export"""
+    df = read_csv_typed(csv_path)
+    profile = {}
+    for col in df.columns:
+        if col in ID_COLUMNS:
+            continue
+        series = df[col]
+        missing = float(series.isna().mean())
+        if SCHEMA.get(col) in ('category', 'Int8'):
+            freq = series.value_counts(normalize=True, dropna=True)
+            freq = freq[freq > 0]
+            profile[col] = {'kind': 'categorical', 'values': np.asarray(freq.index, dtype=object),
+                            'weights': freq.to_numpy(dtype='float64') / freq.sum(), 'missing': missing}
+        else:
+            values = series.dropna().to_numpy(dtype='float64')
+            profile[col] = {'kind': 'numeric', 'missing': missing, 'decimals': _decimals(values),
+                            'quantiles': np.quantile(values, np.linspace(0, 1, PROFILE_QUANTILES))}
+    return profile
+
+
+def _sample(rng, spec, n):
+    if spec['kind'] == 'categorical':
+        values = spec['values'][rng.choice(len(spec['values']), size=n, p=spec['weights'])]
+        values[rng.random(n) < spec['missing']] = None
+        return values
+    # Inverse-CDF sampling through the interpolated quantiles
+    grid = np.linspace(0, 1, len(spec['quantiles']))
+    values = np.round(np.interp(rng.random(n), grid, spec['quantiles']), spec['decimals'])
+    values[rng.random(n) < spec['missing']] = np.nan
+    return values
+
+
+def generate_students(n_rows, profile=None, seed=0, chunk_rows=CHUNK_ROWS):
+    """Yields frames of synthetic students, chunk_rows at a time, in the CSV's column order"""
+    profile = profile or fit_profile()
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_rows, chunk_rows):
+        ids = pd.Series(np.arange(start, min(start + chunk_rows, n_rows)))
+        chunk = {}
+        for col in SCHEMA:
+            if col == 'Student_ID':
+                chunk[col] = 'S' + (ids + 1000).astype(str)
+            elif col == 'Email':
+                chunk[col] = 'student' + ids.astype(str) + '@university.com'
+            else:
+                chunk[col] = _sample(rng, profile[col], len(ids))
+        yield pd.DataFrame(chunk)
+
+
+def write_synthetic_csv(path, n_rows, seed=0, profile=None, chunk_rows=CHUNK_ROWS):
+    """Writes n_rows synthetic students to path; the file only appears once complete"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    partial = path + '.partial'
+    with open(partial, 'w', newline='') as f:
+        for i, chunk in enumerate(generate_students(n_rows, profile, seed, chunk_rows)):
+            chunk.to_csv(f, header=i == 0, index=False)
+    os.replace(partial, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, required=True, help="number of students")
+    parser.add_argument('--out', required=True, help="CSV file to write")
+    parser.add_argument('--seed', type=int, default=0, help="random seed (default: %(default)s)")
+    parser.add_argument('--profile-csv', default=DATA_PATH, help="CSV to fit distributions on (default: %(default)s)")
+    args = parser.parse_args()
+    write_synthetic_csv(args.out, args.rows, args.seed, fit_profile(args.profile_csv))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+RAW_PAGE_SIZES = [25, 50, 100, 250]
+
+# Sort permutations and search results kept per dataset version
+SORT_CACHE_SIZE = 16
+SEARCH_CACHE_SIZE = 32
+
+
+def _cached(cache, lock, size, key, compute):
+    with lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+    value = compute()
+    with lock:
+        cache[key] = value
+        while len(cache) > size:
+            cache.popitem(last=False)
+    return value
+
+
+def parse_range(text):
+    """Parses a numeric search, "12.5" or an inclusive "10..20" with either side optional"""
+    low, sep, high = text.partition('..')
+    try:
+        if not sep:
+            return float(low), float(low)
+        return (float(low) if low.strip() else None), (float(high) if high.strip() else None)
+    except ValueError:
+        raise ValueError(f"'{text}' is not a number or a range like 10..20") from None
+
+
+class RawTableView:
+    """A sortable, searchable window onto one snapshot's rows, computed server side.
+
+    Only the rows of the requested page are materialized. Sort permutations
+    come from the filter engine's sorted indexes where it has one and are
+    otherwise computed once per column; category searches resolve to the
+    engine's value bitmaps. Permutations, search results and describe() are
+    cached for the snapshot, so paging through a sorted, searched table only
+    slices arrays.
+    """
+
+    def __init__(self, snapshot):
+        self.frame = snapshot.frame
+        self.engine = snapshot.engine
+        self._lock = threading.Lock()
+        self._sorts = OrderedDict()
+        self._searches = OrderedDict()
+        self._describe = None
+
+    def describe(self):
+        """Returns frame.describe(), computed once per snapshot"""
+        with self._lock:
+            if self._describe is None:
+                self._describe = self.frame.describe()
+            return self._describe
+
+    def _sort_order(self, column):
+        """Row positions in ascending order of column, missing values last"""
+        if column in self.engine.sorted_indexes:
+            order, _ = self.engine.sorted_indexes[column]
+        else:
+            series = self.frame[column]
+            keys = series.cat.codes.to_numpy() if isinstance(series.dtype, pd.CategoricalDtype) \
+                else series.to_numpy(dtype='float64', na_value=np.nan) if pd.api.types.is_numeric_dtype(series) \
+                else series.fillna('').to_numpy(dtype=object)
+            order = np.argsort(keys, kind='stable')
+            valid = series.notna().to_numpy()[order]
+            order = order[valid]
+        missing = np.ones(len(self.frame), dtype=bool)
+        missing[order] = False
+        return order, np.flatnonzero(missing)
+
+    def sort_order(self, column, ascending=True):
+        """Returns every row position sorted by column; missing values always come last"""
+        order, missing = _cached(self._sorts, self._lock, SORT_CACHE_SIZE, column,
+                                 lambda: self._sort_order(column))
+        return np.concatenate([order if ascending else order[::-1], missing])
+
+    def _search_mask(self, column, text):
+        series = self.frame[column]
+        if isinstance(series.dtype, pd.CategoricalDtype) and column in self.engine.bitmaps:
+            needle = text.casefold()
+            values = [value for value in self.engine.bitmaps[column] if needle in str(value).casefold()]
+            mask = self.engine.mask({column: values})
+            return np.ones(len(self.frame), dtype=bool) if mask is None else mask
+        if pd.api.types.is_numeric_dtype(series):
+            low, high = parse_range(text)
+            if column in self.engine.sorted_indexes:
+                return self.engine.mask({column: (low, high)})
+            values = series.to_numpy(dtype='float64', na_value=np.nan)
+            mask = ~np.isnan(values)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+            return mask
+        return series.str.contains(text, case=False, regex=False).fillna(False).to_numpy(dtype=bool)
+
+    def search(self, column, text):
+        """Returns a boolean mask of the rows whose column matches text, or None for an empty search.
+
+        Text columns match case-insensitive substrings, numeric columns a
+        number or an inclusive range such as 10..20.
+        """
+        text = (text or '').strip()
+        if not column or not text:
+            return None
+        return _cached(self._searches, self._lock, SEARCH_CACHE_SIZE, (column, text),
+                       lambda: self._search_mask(column, text))
+
+    def rows(self, search=None, sort=None, ascending=True):
+        """Returns the positions of the matching rows in display order"""
+        mask = self.search(*search) if search else None
+        if sort:
+            order = self.sort_order(sort, ascending)
+            return order if mask is None else order[mask[order]]
+        return np.arange(len(self.frame)) if mask is None else np.flatnonzero(mask)
+
+    def page(self, rows, page, page_size, columns=None):
+        """Returns the page'th window (0-based) of rows, keeping the original row labels"""
+        window = rows[page * page_size:(page + 1) * page_size]
+        frame = self.frame if columns is None else self.frame[columns]
+        return frame.take(window)
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from datastore import read_csv_typed  # noqa: E402
+
+DATA_CSV = os.path.join(ROOT, 'Students_Grading_Dataset.csv')
+
+
+@pytest.fixture(scope='session')
+def students():
+    """The bundled export, typed as the dashboard loads it"""
+    return read_csv_typed(DATA_CSV)
@@ -0,0 +1,70 @@
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import api
+from api import AggregateApi, serve_api
+from conftest import DATA_CSV
+from dataset import StudentDataset
+from shared_cache import open_cache
+
+
+@pytest.fixture(scope='module')
+def server(tmp_path_factory):
+    dataset = StudentDataset(DATA_CSV, str(tmp_path_factory.mktemp('cache')))
+    aggregate_api = AggregateApi(dataset, open_cache('memory'))
+    httpd = serve_api(aggregate_api, port=0)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield aggregate_api, f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_grades_match_the_cube(server):
+    aggregate_api, base = server
+    status, body = _get(f'{base}/grades?department=Business')
+    assert status == 200
+    expected = aggregate_api.dataset.current.cube.total({'Department': 'Business'})
+    assert sum(row['Count'] for row in body['data']) == expected
+
+
+def test_unexpected_error_is_a_json_500(server, monkeypatch, caplog):
+    _, base = server
+
+    def broken(snapshot, params):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(api.ENDPOINTS, '/version', broken)
+    with caplog.at_level(logging.ERROR, logger='dashboard.api'):
+        status, body = _get(f'{base}/version')
+    assert status == 500
+    assert body == {'error': "Internal server error"}
+    assert any(record.exc_info and 'boom' in str(record.exc_info[1]) for record in caplog.records)
+
+
+def test_refresh_failure_is_logged_with_traceback(server, monkeypatch, caplog):
+    aggregate_api, _ = server
+    failed = threading.Event()
+
+    def refresh():
+        failed.set()
+        raise OSError("export locked")
+
+    monkeypatch.setattr(aggregate_api.dataset, 'refresh', refresh)
+    with caplog.at_level(logging.ERROR, logger='dashboard.api'):
+        aggregate_api.refresh_periodically(interval=0.01)
+        assert failed.wait(5)
+        time.sleep(0.1)
+    assert any(record.exc_info and 'export locked' in str(record.exc_info[1]) for record in caplog.records)
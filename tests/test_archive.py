@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from archive import ArchiveEngine
+from conftest import DATA_CSV
+from correlation import CORRELATION_DIMENSIONS
+from datastore import NUMERIC_COLUMNS
+from regression import RegressionStats
+
+
+@pytest.fixture(scope='module')
+def archive(tmp_path_factory):
+    """An engine over the bundled export split into two terms, and the rows it covers"""
+    directory = tmp_path_factory.mktemp('archive')
+    raw = pd.read_csv(DATA_CSV)
+    paths = []
+    for i, part in enumerate(np.array_split(np.arange(len(raw)), 2)):
+        paths.append(str(directory / f'term{i}.csv'))
+        raw.iloc[part].to_csv(paths[-1], index=False)
+    engine = ArchiveEngine.from_csvs(paths, str(directory / 'cache'))
+    return engine, engine.summary()
+
+
+@pytest.mark.parametrize('where', [None, {'Department': 'Business'}])
+def test_header_and_grades_match_pandas(students, archive, where):
+    _, summary = archive
+    rows = students if where is None else students[students['Department'] == where['Department']]
+    header = summary.header(where)
+    assert header['students'] == len(rows)
+    assert header['avg_score'] == pytest.approx(rows['Total_Score'].mean())
+    assert header['avg_attendance'] == pytest.approx(rows['Attendance (%)'].mean())
+    grades = summary.grade_summary(where)
+    counts = rows['Grade'].value_counts()
+    assert dict(zip(grades['Grade'], grades['Count'])) == {grade: counts[grade] for grade in grades['Grade']}
+
+
+def test_sleep_and_progress_match_pandas(students, archive):
+    _, summary = archive
+    sleep = summary.sleep_stats().set_index('Grade')
+    expected = students.groupby('Grade', observed=True)['Sleep_Hours_per_Night'].agg(['mean', 'median', 'min', 'max'])
+    np.testing.assert_allclose(sleep[['Average', 'Median', 'Min', 'Max']], expected.round(2), atol=0.006)
+    improvement = students['Final_Score'] - students['Midterm_Score']
+    progress = summary.progress_summary()
+    assert progress['avg_improvement'] == pytest.approx(improvement.mean(), rel=1e-6)
+    assert progress['improved_pct'] == pytest.approx((improvement > 0).mean() * 100)
+    assert progress['max_improvement'] == pytest.approx(improvement.max())
+
+
+def test_stress_trend_matches_one_pass(students, archive):
+    _, summary = archive
+    expected = RegressionStats.from_arrays(students['Stress_Level (1-10)'], students['Total_Score']).fit()
+    fit = summary.stress_trend('Total_Score').fit()
+    assert fit['slope'] == pytest.approx(expected['slope'])
+    assert fit['r'] == pytest.approx(expected['r'])
+
+
+@pytest.mark.parametrize('where', [None, {'Department': 'Business'}])
+def test_correlations_match_pandas(students, archive, where):
+    engine, summary = archive
+    rows = students if where is None else students[students['Department'] == where['Department']]
+    columns = [col for col in NUMERIC_COLUMNS if col in students.columns]
+    expected = rows[columns].astype('float64')
+    pd.testing.assert_frame_equal(summary.correlation(columns, where), expected.corr(), atol=1e-9)
+    # Missing attendance and assignment values make pandas rank each pair over its complete rows
+    pd.testing.assert_frame_equal(engine.spearman(columns, where), expected.corr('spearman'), atol=1e-12)
+
+
+def test_merged_summary_matches_single_partition(students, archive, tmp_path):
+    _, summary = archive
+    path = tmp_path / 'whole.csv'
+    pd.read_csv(DATA_CSV).to_csv(path, index=False)
+    whole = ArchiveEngine.from_csvs([str(path)], str(tmp_path / 'cache')).summary()
+    assert whole.students == summary.students
+    dimensions = [dim for dim in CORRELATION_DIMENSIONS if dim != 'Grade']
+    pd.testing.assert_series_equal(whole.cube.counts(dimensions), summary.cube.counts(dimensions))
+    np.testing.assert_allclose(whole.correlation(['Total_Score', 'Final_Score']),
+                               summary.correlation(['Total_Score', 'Final_Score']), atol=1e-12)
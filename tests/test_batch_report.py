@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from associations import AssociationService
+from batch_report import report_combinations, report_content
+from correlation import CorrelationService
+from cube import AggregateCube
+from dataset import DatasetSnapshot
+from filter_engine import FilterEngine
+from sketches import QuantileSketches
+
+
+def _snapshot(frame, version='test'):
+    frame = frame.reset_index(drop=True)
+    return DatasetSnapshot(frame, version, FilterEngine(frame), AggregateCube(frame), CorrelationService(frame),
+                           AssociationService(frame), QuantileSketches(frame))
+
+
+@pytest.fixture(scope='module')
+def snapshot(students):
+    return _snapshot(students)
+
+
+def test_combinations_cover_every_student(snapshot):
+    combinations = list(report_combinations(snapshot))
+    assert sum(snapshot.cube.total(where) for where in combinations) == len(snapshot.frame)
+
+
+@pytest.mark.parametrize('index', [0, 7, -1])
+def test_filtered_report_matches_subset(snapshot, index):
+    where = list(report_combinations(snapshot))[index]
+    subset = _snapshot(snapshot.frame[snapshot.engine.mask(where)], 'subset')
+    figures, tables = report_content(snapshot, where)
+    expected_figures, expected_tables = report_content(subset)
+
+    assert tables.keys() == expected_tables.keys()
+    for name, table in tables.items():
+        pd.testing.assert_frame_equal(table, expected_tables[name], check_dtype=False, check_categorical=False,
+                                      atol=1e-9, obj=name)
+    for name, fig in figures.items():
+        assert [trace.type for trace in fig.data] == [trace.type for trace in expected_figures[name].data], name
+        for trace, expected in zip(fig.data, expected_figures[name].data):
+            for attr in ('x', 'y', 'z'):
+                _assert_values_equal(getattr(trace, attr, None), getattr(expected, attr, None), f"{name}.{attr}")
+
+
+def _assert_values_equal(actual, expected, label):
+    if actual is None or expected is None:
+        assert actual is None and expected is None, label
+        return
+    actual, expected = np.asarray(actual), np.asarray(expected)
+    if actual.dtype.kind in 'biuf' and expected.dtype.kind in 'biuf':
+        np.testing.assert_allclose(actual, expected, atol=1e-9, err_msg=label)
+    else:
+        np.testing.assert_array_equal(actual.astype(str), expected.astype(str), err_msg=label)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlation import CorrelationService
+
+
+def _expected(df, columns, method, where=None):
+    rows = df if where is None else df[df['Department'] == where['Department']]
+    return rows[columns].astype('float64').corr(method)
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman'])
+@pytest.mark.parametrize('where', [None, {'Department': 'Business'}])
+def test_matrix_matches_pandas(students, method, where):
+    service = CorrelationService(students)
+    result = service.matrix(method, where=where)
+    pd.testing.assert_frame_equal(result, _expected(students, service.columns, method, where), atol=1e-9)
+
+
+def test_spearman_reranks_pairs_with_missing_values(students):
+    # The bundled data has missing attendance and assignment averages
+    assert students['Attendance (%)'].isna().any() and students['Assignments_Avg'].isna().any()
+    columns = ['Attendance (%)', 'Assignments_Avg', 'Total_Score']
+    result = CorrelationService(students).spearman(columns)
+    pd.testing.assert_frame_equal(result, _expected(students, columns, 'spearman'), atol=1e-12)
+
+
+def test_apply_delta_matches_rebuild(students):
+    frame = students.iloc[:4000].reset_index(drop=True)
+    service = CorrelationService(frame)
+    old_rows = frame.iloc[:100]
+    updated = old_rows.assign(Total_Score=old_rows['Total_Score'] + 5)
+    added = students.iloc[4000:]
+    new_frame = pd.concat([updated, frame.iloc[100:], added], ignore_index=True)
+    service.apply_delta(new_frame, removed_rows=old_rows, added_rows=pd.concat([updated, added]))
+    for where in [None, {'Department': 'Engineering'}]:
+        pd.testing.assert_frame_equal(service.pearson(where=where),
+                                      _expected(new_frame, service.columns, 'pearson', where), atol=1e-9)
+
+
+def test_merge_matches_whole(students):
+    half = len(students) // 2
+    merged = CorrelationService(students.iloc[:half]).merge(CorrelationService(students.iloc[half:]))
+    expected = CorrelationService(students).pearson(where={'Gender': 'Female'})
+    np.testing.assert_allclose(merged.pearson(where={'Gender': 'Female'}), expected, atol=1e-9)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube import AggregateCube, sleep_groups
+
+WHERES = [None, {'Department': 'Business'}, {'Gender': ['Female', 'Male'], 'Grade': 'A'}]
+
+
+def _rows(df, where):
+    mask = pd.Series(True, index=df.index)
+    for col, selected in (where or {}).items():
+        mask &= df[col].isin(selected if isinstance(selected, list) else [selected])
+    return df[mask]
+
+
+@pytest.mark.parametrize('where', WHERES)
+def test_counts_match_groupby(students, where):
+    cube = AggregateCube(students)
+    rows = _rows(students, where)
+    expected = rows.groupby(['Grade', 'Family_Income_Level'], observed=True).size()
+    pd.testing.assert_series_equal(cube.counts(['Grade', 'Family_Income_Level'], where),
+                                   expected[expected > 0].rename('Count'))
+    assert cube.total(where) == len(rows)
+
+
+def test_sleep_groups_match_cut(students):
+    cube = AggregateCube(students)
+    expected = sleep_groups(students['Sleep_Hours_per_Night']).value_counts()
+    counts = cube.counts(['Sleep_Group'])
+    assert counts.to_dict() == expected[expected > 0].to_dict()
+
+
+@pytest.mark.parametrize('where', WHERES)
+def test_stats_match_groupby(students, where):
+    stats = AggregateCube(students).stats('Total_Score', ['Department'], where)
+    grouped = _rows(students, where).groupby('Department', observed=True)['Total_Score']
+    np.testing.assert_array_equal(stats['count'], grouped.count())
+    np.testing.assert_allclose(stats['mean'], grouped.mean(), rtol=1e-6)
+    np.testing.assert_allclose(stats['std'], grouped.std(), rtol=1e-4)
+
+
+def test_apply_delta_and_merge_match_rebuild(students):
+    frame = students.iloc[:4000]
+    cube = AggregateCube(frame)
+    old_rows = frame.iloc[:100]
+    grade = pd.Series(frame['Grade'].iloc[200], index=old_rows.index, dtype=frame['Grade'].dtype)
+    updated = old_rows.assign(Total_Score=np.float32(50), Grade=grade)
+    added = students.iloc[4000:]
+    cube.apply_delta(removed_rows=old_rows, added_rows=pd.concat([updated, added]))
+    new_frame = pd.concat([updated, frame.iloc[100:], added])
+    rebuilt = AggregateCube(new_frame)
+    merged = AggregateCube(new_frame.iloc[:2500]).merge(AggregateCube(new_frame.iloc[2500:]))
+    for candidate in [cube, merged]:
+        pd.testing.assert_series_equal(candidate.counts(['Grade', 'Department']),
+                                       rebuilt.counts(['Grade', 'Department']))
+        pd.testing.assert_frame_equal(candidate.stats('Total_Score', ['Grade']),
+                                      rebuilt.stats('Total_Score', ['Grade']), rtol=1e-6)
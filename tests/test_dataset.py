@@ -0,0 +1,98 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATA_CSV
+from dataset import StudentDataset
+
+
+@pytest.fixture
+def export(tmp_path):
+    """A copy of the bundled export with an empty delta directory and cache"""
+    csv_path = tmp_path / 'students.csv'
+    shutil.copy(DATA_CSV, csv_path)
+    (tmp_path / 'deltas').mkdir()
+    return str(csv_path), str(tmp_path / 'cache'), str(tmp_path / 'deltas')
+
+
+def _write_delta(raw, delta_dir, name):
+    """Writes a delta correcting 50 students' final scores and adding 20 new students"""
+    updates = raw.iloc[:50].assign(Final_Score=1.5)
+    inserts = raw.iloc[50:70].assign(Student_ID=[f'NEW{i:04d}' for i in range(20)])
+    delta = pd.concat([updates, inserts], ignore_index=True)
+    delta.to_csv(os.path.join(delta_dir, name), index=False)
+    return delta
+
+
+def _expected_frame(raw, delta, columns):
+    rows = pd.concat([raw, delta]).drop_duplicates('Student_ID', keep='last')
+    return rows.set_index('Student_ID').sort_index()[columns]
+
+
+def test_delta_upsert_matches_rebuild(students, export):
+    csv_path, cache_dir, delta_dir = export
+    raw = pd.read_csv(csv_path)
+    dataset = StudentDataset(csv_path, cache_dir, delta_dir=delta_dir)
+    delta = _write_delta(raw, delta_dir, '001.csv')
+    assert dataset.refresh() == len(delta)
+
+    data = dataset.current
+    frame = data.frame.set_index('Student_ID').sort_index()
+    expected = _expected_frame(raw, delta, ['Final_Score', 'Total_Score', 'Department'])
+    assert frame.index.equals(expected.index)
+    np.testing.assert_allclose(frame['Final_Score'], expected['Final_Score'], rtol=1e-6)
+
+    # The derived structures equal those built from the upserted rows
+    grouped = data.frame.groupby('Department', observed=True)['Final_Score']
+    stats = data.cube.stats('Final_Score', ['Department'])
+    np.testing.assert_allclose(stats['mean'], grouped.mean(), rtol=1e-6)
+    np.testing.assert_array_equal(stats['count'], grouped.count())
+    mask = data.engine.mask({'Department': 'Business', 'Grade': ['A', 'B']})
+    expected_mask = (data.frame['Department'] == 'Business') & data.frame['Grade'].isin(['A', 'B'])
+    np.testing.assert_array_equal(mask, expected_mask.to_numpy())
+    pd.testing.assert_frame_equal(data.correlations.pearson(),
+                                  data.frame[data.correlations.columns].astype('float64').corr(), atol=1e-9)
+
+
+def test_rewrite_reapplies_deltas(export):
+    csv_path, cache_dir, delta_dir = export
+    raw = pd.read_csv(csv_path)
+    dataset = StudentDataset(csv_path, cache_dir, delta_dir=delta_dir)
+    delta = _write_delta(raw, delta_dir, '001.csv')
+    dataset.refresh()
+
+    # The SIS rewrites the export in place, e.g. with one student removed
+    raw.iloc[1:].to_csv(csv_path, index=False)
+    dataset.refresh()
+
+    frame = dataset.current.frame.set_index('Student_ID').sort_index()
+    expected = _expected_frame(raw.iloc[1:], delta, ['Final_Score'])
+    assert frame.index.equals(expected.index)
+    np.testing.assert_allclose(frame['Final_Score'], expected['Final_Score'], rtol=1e-6)
+
+
+def test_same_length_correction_is_picked_up(export):
+    csv_path, cache_dir, delta_dir = export
+    dataset = StudentDataset(csv_path, cache_dir, delta_dir=delta_dir)
+
+    # The SIS corrects the first student's final score in place, well before the last 4 KiB
+    with open(csv_path, 'rb') as f:
+        lines = f.read().split(b'\n')
+    column = lines[0].decode().split(',').index('Final_Score')
+    fields = lines[1].split(b',')
+    old = fields[column]
+    fields[column] = old[:-1] + (b'1' if old[-1:] != b'1' else b'2')
+    lines[1] = b','.join(fields)
+    stat = os.stat(csv_path)
+    with open(csv_path, 'wb') as f:
+        f.write(b'\n'.join(lines))
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert os.path.getsize(csv_path) == stat.st_size
+    assert dataset.refresh() == len(dataset.current.frame)
+    first = dataset.current.frame.set_index('Student_ID').loc[fields[0].decode(), 'Final_Score']
+    assert first == pytest.approx(float(fields[column]))
+    assert dataset.refresh() == 0
@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+from conftest import DATA_CSV
+from datastore import ingest_csv, read_columnar, read_csv_typed, scan_columnar
+
+COLUMNS = ['Student_ID', 'Department', 'Grade', 'Total_Score', 'Attendance (%)']
+WHERES = [
+    {'Department': 'Business'},
+    {'Total_Score': (80, None), 'Grade': ['A', 'B']},
+    {'Attendance (%)': (None, 70), 'Gender': 'Female', 'Department': 'All'},
+    {'Total_Score': (1000, None)},
+]
+
+
+@pytest.fixture(scope='module')
+def columnar(tmp_path_factory):
+    """The export sorted by total score and ingested in small batches, so range filters skip batches"""
+    directory = tmp_path_factory.mktemp('columnar')
+    csv_path = directory / 'students.csv'
+    pd.read_csv(DATA_CSV).sort_values('Total_Score').to_csv(csv_path, index=False)
+    data_path = str(directory / 'students.arrow')
+    _, rows, _, batches = ingest_csv(str(csv_path), data_path, chunk_rows=500)
+    assert len(batches) == (rows + 499) // 500
+    return data_path, batches, read_csv_typed(str(csv_path))
+
+
+def _expected(frame, where):
+    mask = pd.Series(True, index=frame.index)
+    for col, selected in where.items():
+        if isinstance(selected, tuple):
+            low, high = selected
+            values = frame[col].astype('float64')
+            mask &= values.notna() & (low is None or values >= low) & (high is None or values <= high)
+        elif selected != 'All':
+            mask &= frame[col].isin(selected if isinstance(selected, list) else [selected])
+    return frame.loc[mask, COLUMNS].reset_index(drop=True)
+
+
+def _comparable(frame):
+    return frame.astype({col: object for col in ['Department', 'Grade']}).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('where', WHERES)
+def test_filtered_read_matches_pandas(columnar, where):
+    data_path, batches, frame = columnar
+    result = read_columnar(data_path, COLUMNS, where, batches)
+    assert list(result.columns) == COLUMNS
+    pd.testing.assert_frame_equal(_comparable(result), _comparable(_expected(frame, where)), check_dtype=False)
+
+
+@pytest.mark.parametrize('where', WHERES)
+def test_scan_matches_read(columnar, where):
+    data_path, batches, _ = columnar
+    parts = list(scan_columnar(data_path, COLUMNS, where, batches))
+    expected = read_columnar(data_path, COLUMNS, where, batches)
+    scanned = pd.concat([_comparable(part) for part in parts], ignore_index=True) if parts \
+        else _comparable(expected.iloc[:0])
+    pd.testing.assert_frame_equal(scanned, _comparable(expected), check_dtype=False)
+
+
+def test_range_filter_skips_batches(columnar):
+    data_path, batches, frame = columnar
+    parts = list(scan_columnar(data_path, COLUMNS, {'Total_Score': (95, None)}, batches))
+    assert 0 < len(parts) < len(batches)
+    assert sum(len(part) for part in parts) == (frame['Total_Score'] >= 95).sum()
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_engine import FilterEngine
+
+FILTERS = [
+    {'Department': 'Business'},
+    {'Department': ['Business', 'Engineering'], 'Gender': 'Female'},
+    {'Attendance (%)': (60, 90)},
+    {'Study_Hours_per_Week': (None, 12), 'Grade': ['A', 'B'], 'Family_Income_Level': 'All'},
+    {'Department': 'No such department'},
+]
+
+
+def _expected_mask(df, filters):
+    mask = pd.Series(True, index=df.index)
+    for col, selected in filters.items():
+        if selected is None or (isinstance(selected, str) and selected == 'All'):
+            continue
+        if isinstance(selected, tuple):
+            low, high = selected
+            values = df[col].astype('float64')
+            mask &= values.notna() & (low is None or values >= low) & (high is None or values <= high)
+        else:
+            mask &= df[col].isin(selected if isinstance(selected, list) else [selected])
+    return mask.to_numpy()
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_mask_matches_pandas(students, filters):
+    # Attendance has missing values, which no range matches
+    assert students['Attendance (%)'].isna().any()
+    np.testing.assert_array_equal(FilterEngine(students).mask(filters), _expected_mask(students, filters))
+
+
+def test_unfiltered_is_none(students):
+    engine = FilterEngine(students)
+    assert engine.mask({'Department': 'All', 'Gender': None}) is None
+    assert engine.options('Grade') == sorted(students['Grade'].dropna().unique())
+
+
+def test_apply_delta_matches_rebuild(students):
+    frame = students.iloc[:4000].reset_index(drop=True)
+    engine = FilterEngine(frame)
+    updated_positions = np.arange(0, 200, 2)
+    old_rows = frame.iloc[updated_positions]
+    updates = old_rows.assign(Department=frame['Department'].iloc[-1], **{'Attendance (%)': np.float32(99.5)})
+    inserts = students.iloc[4000:]
+
+    new_frame = frame.copy()
+    new_frame.iloc[updated_positions] = updates.to_numpy()
+    new_frame = pd.concat([new_frame, inserts], ignore_index=True)
+    engine.apply_delta(len(new_frame), updated_positions, old_rows,
+                       np.concatenate([updated_positions, np.arange(4000, len(new_frame))]),
+                       pd.concat([updates, inserts], ignore_index=True))
+    rebuilt = FilterEngine(new_frame)
+    for filters in FILTERS:
+        np.testing.assert_array_equal(engine.mask(filters), rebuilt.mask(filters))
+        np.testing.assert_array_equal(engine.mask(filters), _expected_mask(new_frame, filters))
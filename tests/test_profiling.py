@@ -0,0 +1,49 @@
+import threading
+import tracemalloc
+
+from profiling import MetricsRegistry, finish_rerun, stage, start_rerun
+
+
+def test_untraced_rerun_keeps_tracing_for_concurrent_rerun():
+    entered, release = threading.Event(), threading.Event()
+    records = []
+
+    def traced():
+        profile = start_rerun('traced', trace_memory=True)
+        with stage('build'):
+            entered.set()
+            release.wait(5)
+            buffer = bytearray(1 << 20)
+        records.extend(profile.records)
+        del buffer
+        finish_rerun(profile, MetricsRegistry())
+
+    thread = threading.Thread(target=traced)
+    thread.start()
+    entered.wait(5)
+    # Another session reruns with memory tracing off while the traced stage runs
+    finish_rerun(start_rerun('untraced', trace_memory=False), MetricsRegistry())
+    assert tracemalloc.is_tracing()
+    release.set()
+    thread.join()
+
+    assert records[0]['alloc_bytes'] >= 1 << 20
+    assert records[0]['peak_bytes'] >= records[0]['alloc_bytes']
+    assert not tracemalloc.is_tracing()
+
+
+def test_closed_profiles_release_tracing_once():
+    first, second = start_rerun('a', trace_memory=True), start_rerun('b', trace_memory=True)
+    first.close()
+    first.close()
+    assert tracemalloc.is_tracing()
+    finish_rerun(second, MetricsRegistry())
+    assert not tracemalloc.is_tracing()
+
+
+def test_stage_skips_memory_when_tracing_stopped():
+    profile = start_rerun('a', trace_memory=True)
+    with stage('build'):
+        tracemalloc.stop()
+    profile.close()
+    assert 'alloc_bytes' not in profile.records[0] and profile.records[0]['seconds'] >= 0
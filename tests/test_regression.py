@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from scipy.stats import linregress
+
+from analytics import cube_stress_trend
+from cube import AggregateCube
+from regression import RegressionStats, regression_by_group
+
+
+def _expected(x, y):
+    valid = ~(np.isnan(x) | np.isnan(y))
+    return linregress(x[valid], y[valid])
+
+
+@pytest.fixture
+def pairs(students):
+    return (students['Study_Hours_per_Week'].to_numpy(dtype='float64', na_value=np.nan),
+            students['Total_Score'].to_numpy(dtype='float64', na_value=np.nan))
+
+
+def test_fit_matches_linregress_with_missing_values(pairs):
+    x, y = pairs
+    x = x.copy()
+    x[::7] = np.nan
+    fit = RegressionStats.from_arrays(x, y).fit()
+    expected = _expected(x, y)
+    assert fit['n'] == (~(np.isnan(x) | np.isnan(y))).sum()
+    assert fit['slope'] == pytest.approx(expected.slope)
+    assert fit['intercept'] == pytest.approx(expected.intercept)
+    assert fit['r'] == pytest.approx(expected.rvalue)
+    assert fit['slope_se'] == pytest.approx(expected.stderr)
+    assert fit['intercept_se'] == pytest.approx(expected.intercept_stderr)
+
+
+def test_merge_and_sums_match_one_pass(pairs):
+    x, y = pairs
+    whole = RegressionStats.from_arrays(x, y).fit()
+    merged = RegressionStats()
+    for chunk in np.array_split(np.arange(len(x)), 7):
+        merged = merged.merge(RegressionStats.from_arrays(x[chunk], y[chunk]))
+    from_sums = RegressionStats.from_sums(len(x), x.sum(), y.sum(), x @ x, y @ y, x @ y)
+    for stats in [merged, from_sums]:
+        for key, value in stats.fit().items():
+            assert value == pytest.approx(whole[key], rel=1e-9), key
+
+
+def test_regression_by_group_matches_each_group(students, pairs):
+    x, y = pairs
+    by_grade = regression_by_group(x, y, students['Grade'])
+    assert set(by_grade) == set(students['Grade'].dropna().unique())
+    for grade, stats in by_grade.items():
+        rows = (students['Grade'] == grade).to_numpy()
+        expected = _expected(x[rows], y[rows])
+        assert stats.fit()['slope'] == pytest.approx(expected.slope)
+        assert stats.fit()['r'] == pytest.approx(expected.rvalue)
+
+
+@pytest.mark.parametrize('where', [None, {'Department': 'Engineering', 'Gender': 'Female'}])
+def test_cube_stress_trend_matches_linregress(students, where):
+    frame = students.copy()
+    frame.loc[frame.index[::9], 'Final_Score'] = np.nan
+    if where:
+        rows = frame[np.logical_and.reduce([frame[col] == value for col, value in where.items()])]
+    else:
+        rows = frame
+    fit = cube_stress_trend(AggregateCube(frame), 'Final_Score', where).fit()
+    x = rows['Stress_Level (1-10)'].to_numpy(dtype='float64', na_value=np.nan)
+    y = rows['Final_Score'].to_numpy(dtype='float64', na_value=np.nan)
+    expected = _expected(x, y)
+    assert fit['n'] == (~(np.isnan(x) | np.isnan(y))).sum()
+    assert fit['slope'] == pytest.approx(expected.slope)
+    assert fit['intercept'] == pytest.approx(expected.intercept)
+    assert fit['r'] == pytest.approx(expected.rvalue)
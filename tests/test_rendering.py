@@ -0,0 +1,32 @@
+import numpy as np
+
+from rendering import sample_rows
+
+
+def test_sample_rows_keeps_all_rows_within_budget():
+    x = np.arange(100, dtype='float64')
+    assert np.array_equal(sample_rows(x, x, 1000), np.arange(100))
+
+
+def test_sample_rows_caps_and_deduplicates():
+    rng = np.random.default_rng(1)
+    x, y = rng.normal(size=20000), rng.normal(size=20000)
+    rows = sample_rows(x, y, 5000)
+    assert len(rows) == 5000
+    assert len(np.unique(rows)) == len(rows)
+    assert np.array_equal(rows, sample_rows(x, y, 5000))
+
+
+def test_sample_rows_with_many_outliers():
+    # 70% of y is constant, so every other row lies outside the Tukey fences
+    rng = np.random.default_rng(0)
+    n = 10500
+    x = rng.normal(size=n)
+    y = np.where(rng.random(n) < 0.7, 5.0, rng.normal(size=n) * 10)
+    rows = sample_rows(x, y, 10000)
+    assert len(rows) == 10000
+    assert len(np.unique(rows)) == len(rows)
+    # Every row inside the fences fits in the budget, so the outliers get the rest
+    q1, q3 = np.percentile(x, [25, 75])
+    inside = (y == 5.0) & (x >= q1 - 1.5 * (q3 - q1)) & (x <= q3 + 1.5 * (q3 - q1))
+    assert np.isin(np.flatnonzero(inside), rows).all()
@@ -0,0 +1,50 @@
+import sqlite3
+import threading
+import time
+
+import shared_cache
+from shared_cache import SQLiteCache
+
+
+def _read_while_locked(cache, *calls):
+    """Runs the calls while another connection holds SQLite's write lock; returns their results or None"""
+    writer = sqlite3.connect(cache.path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    results = []
+    thread = threading.Thread(target=lambda: results.extend(call() for call in calls))
+    try:
+        thread.start()
+        thread.join(timeout=5)
+        return None if thread.is_alive() else results
+    finally:
+        writer.execute("ROLLBACK")
+        thread.join()
+        writer.close()
+
+
+def test_hits_do_not_wait_for_writers(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite'))
+    cache.set('key', {'value': 1})
+    results = _read_while_locked(cache, lambda: cache.get('key'), lambda: cache.get('missing', 'default'),
+                                 lambda: cache.get_or_compute('key', lambda: 2), lambda: cache.stats()['entries'])
+    assert results == [{'value': 1}, 'default', {'value': 1}, 1]
+
+
+def test_stale_access_time_is_refreshed(tmp_path, monkeypatch):
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite'))
+    cache.set('old', 1)
+    cache.set('new', 2)
+    accessed = lambda key: sqlite3.connect(cache.path).execute(
+        "SELECT accessed FROM entries WHERE key = ?", (key,)).fetchone()[0]
+    before = accessed('old')
+    assert cache.get('old') == 1 and accessed('old') == before
+    now = time.time() + shared_cache.ACCESS_RESOLUTION + 1
+    monkeypatch.setattr(shared_cache.time, 'time', lambda: now)
+    assert cache.get('old') == 1 and accessed('old') == now
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite'))
+    cache.set('key', 1, ttl=-1)
+    assert cache.get('key', 'missing') == 'missing'
+    assert cache.stats()['entries'] == 0
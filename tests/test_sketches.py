@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sketches import QuantileSketches, column_values
+
+
+@pytest.fixture
+def noisy(students):
+    """The export with sleep hours at full precision, so no value falls on a bucket centre"""
+    rng = np.random.default_rng(0)
+    noise = rng.uniform(-0.05, 0.05, len(students)).astype('float32')
+    return students.assign(Sleep_Hours_per_Night=students['Sleep_Hours_per_Night'] + noise)
+
+
+@pytest.mark.parametrize('column', ['Sleep_Hours_per_Night', 'Improvement'])
+@pytest.mark.parametrize('where', [None, {'Department': 'Business'}])
+def test_summary_within_error_bound(noisy, column, where):
+    sketches = QuantileSketches(noisy)
+    bound = sketches.error_bound(column) + 1e-6
+    rows = noisy if where is None else noisy[noisy['Department'] == where['Department']]
+    values = pd.Series(column_values(rows, column), index=rows.index)
+    summary = sketches.summary(column, ['Grade'], where).set_index('Grade')
+    for grade, group in values.groupby(rows['Grade'], observed=True):
+        group = group.dropna()
+        stats = summary.loc[grade]
+        assert stats['count'] == len(group)
+        expected = np.quantile(group, [0, 0.25, 0.5, 0.75, 1])
+        estimated = stats[['min', 'q1', 'median', 'q3', 'max']].to_numpy(dtype='float64')
+        assert np.abs(estimated - expected).max() <= bound
+        assert abs(stats['mean'] - group.mean()) <= bound
+
+
+def test_histogram_counts_every_value(noisy):
+    sketches = QuantileSketches(noisy)
+    histogram = sketches.histogram('Improvement', 40, ['Grade'], {'Department': 'Engineering'})
+    rows = noisy[noisy['Department'] == 'Engineering']
+    expected = pd.Series(column_values(rows, 'Improvement'), index=rows.index).groupby(rows['Grade'], observed=True)
+    assert histogram.groupby('Grade', observed=True)['count'].sum().to_dict() == expected.count().to_dict()
+    widths = (histogram['end'] - histogram['start']).round(9)
+    assert widths.nunique() == 1 and len(histogram.groupby(['start', 'end'])) <= 40
+
+
+def test_apply_delta_and_merge_match_rebuild(noisy):
+    frame = noisy.iloc[:4000]
+    sketches = QuantileSketches(frame)
+    old_rows = frame.iloc[:100]
+    updated = old_rows.assign(Sleep_Hours_per_Night=np.float32(11.5), Final_Score=old_rows['Final_Score'] - 10)
+    added = noisy.iloc[4000:]
+    sketches.apply_delta(removed_rows=old_rows, added_rows=pd.concat([updated, added]))
+    new_frame = pd.concat([updated, frame.iloc[100:], added])
+    rebuilt = QuantileSketches(new_frame)
+    merged = QuantileSketches(new_frame.iloc[:2500]).merge(QuantileSketches(new_frame.iloc[2500:]))
+    for column in rebuilt.buckets:
+        expected = rebuilt.summary(column, ['Department', 'Grade'])
+        for candidate in [sketches, merged]:
+            pd.testing.assert_frame_equal(candidate.summary(column, ['Department', 'Grade']), expected,
+                                          check_categorical=False)
@@ -0,0 +1,12 @@
+import pytest
+
+from warmup import open_shared_cache, warm_up
+
+
+def test_memory_backend_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="not shared"):
+        warm_up(cache_dir=str(tmp_path), cache_spec='memory', workers=1)
+
+
+def test_sqlite_backend_is_accepted(tmp_path):
+    assert open_shared_cache(f"sqlite:{tmp_path / 'cache.sqlite'}").shared
@@ -0,0 +1,103 @@
+"""Precomputes the dashboard's default figures before the Streamlit server takes traffic.
+
+Every section's default and per-department figures are built in parallel
+across a process pool and written to the shared cache, together with the
+dataset's filter indexes, aggregate cube and correlation partials, so the
+first visitor of each section is served precomputed results:
+
+    python warmup.py --workers 4 && streamlit run app.py
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from charts import cached_chart, default_chart_states
+from dataset import DELTA_DIR, open_snapshot
+from datastore import DATA_PATH, CACHE_DIR
+from figure_cache import FigureCache, FigureStore
+from shared_cache import open_cache
+
+# Per-worker state, set up once by _init_worker
+_snapshot = None
+_figures = None
+
+
+def _init_worker(csv_path, cache_dir, delta_dir, cache_spec):
+    global _snapshot, _figures
+    # The columnar cache and the derived structures are already stored, so this only reads
+    shared_cache = open_cache(cache_spec)
+    _snapshot = open_snapshot(csv_path, cache_dir, delta_dir, shared_cache)
+    _figures = FigureCache(store=FigureStore(shared_cache))
+
+
+def _build(task):
+    view, state = task
+    start = time.perf_counter()
+    cached_chart(_figures, _snapshot, view, **state)
+    return view, _snapshot.version, time.perf_counter() - start
+
+
+def open_shared_cache(cache_spec=None):
+    """Opens the cache backend, refusing one whose entries other processes would not see"""
+    shared_cache = open_cache(cache_spec)
+    if not shared_cache.shared:
+        # Workers would each fill their own copy, discarded when the pool exits
+        raise ValueError(f"The {shared_cache.stats()['backend']} cache backend is not shared between "
+                         f"processes, so there is nothing to warm up")
+    return shared_cache
+
+
+def warm_up(csv_path=DATA_PATH, cache_dir=CACHE_DIR, delta_dir=DELTA_DIR, cache_spec=None, workers=None):
+    """Builds every default figure into the shared cache; returns a summary of the run"""
+    start = time.perf_counter()
+    shared_cache = open_shared_cache(cache_spec)
+    # Parse the CSV and derive the indexes once here rather than once per worker
+    snapshot = open_snapshot(csv_path, cache_dir, delta_dir, shared_cache)
+    load_seconds = time.perf_counter() - start
+    tasks = list(default_chart_states(snapshot))
+
+    per_view = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(csv_path, cache_dir, delta_dir, cache_spec)) as pool:
+        for view, version, seconds in pool.map(_build, tasks):
+            if version != snapshot.version:
+                raise RuntimeError("The dataset changed while warming up; run the warm-up again")
+            count, total = per_view.get(view, (0, 0.0))
+            per_view[view] = (count + 1, total + seconds)
+
+    return {
+        'version': snapshot.version,
+        'rows': len(snapshot.frame),
+        'figures': len(tasks),
+        'load_seconds': load_seconds,
+        'total_seconds': time.perf_counter() - start,
+        'per_view': per_view,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=DATA_PATH, help="source CSV (default: %(default)s)")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="columnar cache directory (default: %(default)s)")
+    parser.add_argument('--delta-dir', default=DELTA_DIR, help="delta CSV directory (default: %(default)s)")
+    parser.add_argument('--cache', default=None,
+                        help="shared cache backend: sqlite or sqlite:<path> (default: $DASHBOARD_CACHE or sqlite)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    try:
+        open_shared_cache(args.cache)
+    except ValueError as e:
+        parser.error(str(e))
+
+    summary = warm_up(args.csv, args.cache_dir, args.delta_dir, args.cache, args.workers)
+    print(f"Warmed {summary['figures']} figures for {summary['rows']:,} students "
+          f"(version {summary['version'][:12]}) in {summary['total_seconds']:.1f}s, "
+          f"load {summary['load_seconds']:.1f}s")
+    for view, (count, seconds) in sorted(summary['per_view'].items()):
+        print(f"  {view:<20} {count:>4} figures  {seconds:6.2f}s build time")
+
+
+if __name__ == "__main__":
+    main()